@@ -1,29 +1,21 @@
-from dotenv import load_dotenv
-import os
 import streamlit as st
 import requests
-import json
+from utils import api_client
 from utils.state_manager import reset_chat_session, load_chat_session
 
-# API 엔드포인트 기본 URL
-load_dotenv()
-API_BASE_URL = os.environ.get("API_BASE_URL")
-
 
 def fetch_chat_sessions():
-    """API를 통해 모든 채팅 세션 목록을 가져옵니다."""
+    """API를 통해 모든 채팅 세션 목록을 가져옵니다. (TTL 캐시, 변경 시 무효화)"""
     try:
-        response = requests.get(f"{API_BASE_URL}/chats/")
-        if response.status_code == 200:
-            sessions = response.json()
-            # (id, topic, created_at) 튜플 리스트로 반환
-            return [
-                (s["id"], s["topic"], s["created_at"])
-                for s in sessions
-            ]
-        else:
-            st.error(f"채팅 이력 조회 실패: {response.status_code}")
-            return []
+        sessions = api_client.list_chat_sessions()
+        # (id, topic, created_at) 튜플 리스트로 반환
+        return [
+            (s["id"], s["topic"], s["created_at"])
+            for s in sessions
+        ]
+    except requests.HTTPError as e:
+        st.error(f"채팅 이력 조회 실패: {e.response.status_code}")
+        return []
     except requests.RequestException as e:
         st.error(f"API 호출 오류: {str(e)}")
         return []
@@ -32,7 +24,7 @@ def fetch_chat_sessions():
 def fetch_chat_session(session_id: int):
     """API를 통해 특정 채팅 세션의 모든 메시지를 가져옵니다."""
     try:
-        response = requests.get(f"{API_BASE_URL}/chats/{session_id}")
+        response = api_client.get_chat_session(session_id)
         if response.status_code == 200:
             session_data = response.json()
             topic = session_data["topic"]
@@ -53,7 +45,7 @@ def fetch_chat_session(session_id: int):
 def delete_chat_session(session_id: int):
     """API를 통해 특정 채팅 세션을 삭제합니다."""
     try:
-        response = requests.delete(f"{API_BASE_URL}/chats/{session_id}")
+        response = api_client.delete_chat_session(session_id)
         if response.status_code == 200:
             st.success("채팅 이력이 삭제되었습니다.")
             return True
@@ -68,6 +60,8 @@ def delete_chat_session(session_id: int):
 def delete_all_chat_sessions():
     """API를 통해 모든 채팅 세션을 삭제합니다."""
     try:
+        # 캐시된 목록이 오래되었을 수 있으므로 최신 목록 기준으로 삭제
+        api_client.invalidate_chat_sessions()
         sessions = fetch_chat_sessions()
         if not sessions:
             st.info("삭제할 채팅 이력이 없습니다.")
@@ -75,7 +69,7 @@ def delete_all_chat_sessions():
 
         success = True
         for session_id, _, _ in sessions:
-            response = requests.delete(f"{API_BASE_URL}/chats/{session_id}")
+            response = api_client.delete_chat_session(session_id)
             if response.status_code != 200:
                 success = False
 
@@ -93,6 +87,7 @@ def render_history_ui():
     col1, col2 = st.columns(2)
     with col1:
         if st.button("새로고침", use_container_width=True):
+            api_client.invalidate_chat_sessions()
             st.rerun()
     with col2:
         if st.button("전체 삭제", type="primary", use_container_width=True):
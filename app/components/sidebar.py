@@ -1,12 +1,7 @@
 import streamlit as st
 import requests
-import os
-from dotenv import load_dotenv
 from components.history import render_history_ui
-
-# API 엔드포인트 기본 URL
-load_dotenv()
-API_BASE_URL = os.environ.get("API_BASE_URL")
+from utils import api_client
 
 
 def handle_pdf_upload():
@@ -16,17 +11,16 @@ def handle_pdf_upload():
     """
     if st.session_state.pdf_uploader is not None:
         file = st.session_state.pdf_uploader
-        files = {"file": (file.name, file, file.type)}
 
         with st.spinner(f"'{file.name}' 업로드 및 처리 중... (파일 크기에 따라 시간이 걸릴 수 있습니다)"):
             try:
-                response = requests.post(
-                    f"{API_BASE_URL}/documents/upload",
-                    files=files
-                )
-                if response.status_code == 200:
+                # 성공하면 api_client가 문서 목록 캐시를 무효화하므로 이어지는 rerun에서 새 목록이 표시됨
+                response = api_client.upload_document(file)
+                if response.status_code == 200 and response.json().get("duplicate"):
+                    # 같은 내용의 PDF가 이미 인덱싱되어 있어 파싱/재구축을 생략함
+                    st.info(response.json().get("detail"))
+                elif response.status_code == 200:
                     st.success(f"'{file.name}'이(가) 성공적으로 처리되어 Vector DB에 반영되었습니다.")
-                    # st.rerun() # 업로드 후 목록 자동 갱신
                 else:
                     st.error(f"파일 처리 실패: {response.json().get('detail', response.text)}")
             except requests.RequestException as e:
@@ -44,21 +38,22 @@ def display_processed_files():
     st.markdown("---")
     st.subheader("처리된 문서 목록")
     try:
-        response = requests.get(f"{API_BASE_URL}/documents/")
-        if response.status_code == 200:
-            files = response.json()
-            if not files:
-                st.info("아직 처리된 문서가 없습니다. PDF를 업로드하세요.")
-            else:
-                st.caption(f"총 {len(files)}개의 문서가 RAG에 사용됩니다:")
-                # 스크롤 가능한 영역에 파일 목록 표시
-                container = st.container(height=200, border=False)
-                for f in files:
-                    container.markdown(f"- 📄 `{f}`")
-        else:
-            st.error("처리된 문서 목록을 불러오는 데 실패했습니다.")
+        files = api_client.list_processed_files()
+    except requests.HTTPError:
+        st.error("처리된 문서 목록을 불러오는 데 실패했습니다.")
+        return
     except requests.RequestException:
         st.error("API 서버에 연결할 수 없습니다.")
+        return
+
+    if not files:
+        st.info("아직 처리된 문서가 없습니다. PDF를 업로드하세요.")
+    else:
+        st.caption(f"총 {len(files)}개의 문서가 RAG에 사용됩니다:")
+        # 스크롤 가능한 영역에 파일 목록 표시
+        container = st.container(height=200, border=False)
+        for f in files:
+            container.markdown(f"- 📄 `{f}`")
 
 
 def render_sidebar():
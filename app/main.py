@@ -1,47 +1,38 @@
-import os
-from dotenv import load_dotenv
-import json
 import requests
 import streamlit as st
 
 # 사이드바 및 세션 관리자 import
 from components.sidebar import render_sidebar
+from utils import api_client
 from utils.state_manager import init_session_state, reset_chat_session
+from utils.streaming import SSEReader, ThrottledRenderer
 
-# API 기본 URL 로드
-load_dotenv()
-API_BASE_URL = os.environ.get("API_BASE_URL")
 
+# 진행 단계 이벤트(stage)를 사용자에게 보여줄 문구
+STAGE_LABELS = {
+    "classified": "질문 의도를 분석했습니다.",
+    "query_transformed": "검색용 질문을 준비했습니다.",
+    "retrieved": "관련 문서 {count}개를 찾았습니다.",
+    "reranked": "관련성 높은 문서 {count}개를 선별했습니다.",
+    "generating": "답변을 작성하고 있습니다...",
+}
 
-def process_streaming_response(chunk):
+
+def handle_stream_event(event_type: str, data, status=None):
     """
-    API의 스트리밍 응답 청크(줄)를 파싱합니다.
+    SSE 이벤트 하나를 처리하고, 답변 토큰이면 그 내용을 반환합니다.
+    진행 단계(stage) 이벤트는 status placeholder에 표시합니다.
     """
-    if not chunk:
-        return None
-
-    line = chunk.decode("utf-8")
-
-    if not line.startswith("data: "):
-        return None
-
-    data_str = line[6:]  # 'data: ' 부분 제거
-
-    try:
-        event_data = json.loads(data_str)
-        event_type = event_data.get("type")
-
-        if event_type == "update":
-            return event_data.get("data", {}).get("content")
-        elif event_type == "end":
-            return None  # 스트림 종료 신호
-        elif event_type == "error":
-            st.error(f"스트리밍 중 오류 발생: {event_data.get('data')}")
-            return None
-
-    except json.JSONDecodeError:
-        print(f"JSON 파싱 오류: {data_str}")
-        return None
+    if event_type == "update":
+        return (data or {}).get("content")
+    elif event_type == "stage":
+        stage = data or {}
+        label = STAGE_LABELS.get(stage.get("stage"))
+        if status is not None and label:
+            status.caption(label.format(count=stage.get("count", 0)))
+    elif event_type == "error":
+        st.error(f"스트리밍 중 오류 발생: {data}")
+    # "end"는 스트림 종료 신호 (연결이 닫히면 SSEReader가 종료됨)
     return None
 
 
@@ -72,33 +63,44 @@ def handle_chat_input(prompt: str):
 
     # 4. 스트리밍 응답 처리
     with st.chat_message("assistant"):
+        status = st.empty()
         placeholder = st.empty()
-        full_response = ""
+        renderer = ThrottledRenderer(placeholder)
         with st.spinner("응답 생성 중..."):
             try:
-                with requests.post(
-                        f"{API_BASE_URL}/chat/stream",
-                        json=data,
-                        stream=True,
-                        headers={"Content-Type": "application/json"},
-                        timeout=300  # 5분 타임아웃
-                ) as response:
+                with api_client.stream_chat(data, timeout=300) as response:  # 5분 타임아웃
+                    if response.status_code in (429, 503):
+                        # 서버 승인 제어에 의해 거절됨 (혼잡 또는 같은 세션의 요청이 처리 중)
+                        retry_after = response.headers.get("Retry-After")
+                        wait = f"{retry_after}초 후" if retry_after else "잠시 후"
+                        detail = response.json().get("detail", response.text)
+                        st.warning(f"{detail} ({wait} 다시 시도하세요.)")
+                        return
                     if response.status_code != 200:
                         st.error(f"API 오류: {response.status_code} - {response.text}")
                         return
 
-                    for chunk in response.iter_lines():
-                        content = process_streaming_response(chunk)
-                        if content:
-                            full_response += content
-                            placeholder.markdown(full_response + "▌")
-
-                placeholder.markdown(full_response)
+                    # 수신/파싱은 백그라운드 스레드에서, 그리기는 제한된 빈도로
+                    reader = SSEReader(response.iter_content(chunk_size=None)).start()
+                    for event in reader.events(timeout=renderer.min_interval):
+                        if event is not None:
+                            content = handle_stream_event(*event, status=status)
+                            if content:
+                                renderer.append(content)
+                                continue
+                        renderer.maybe_render()
+                    if reader.error is not None:
+                        raise reader.error
+
+                status.empty()
+                renderer.finish()
 
             except requests.RequestException as e:
                 st.error(f"API 요청 오류: {str(e)}")
                 return
 
+        full_response = renderer.text
+
     # 5. 전체 AI 응답을 세션 상태에 추가
     # (B/E가 이미 DB에 저장했으므로, 이것은 순전히 현재 UI 표시용)
     if full_response:
@@ -0,0 +1,104 @@
+import os
+import requests
+import streamlit as st
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+# API 엔드포인트 기본 URL
+load_dotenv()
+API_BASE_URL = os.environ.get("API_BASE_URL")
+
+# 목록 조회 결과를 재사용할 시간(초)
+# Streamlit은 버튼 클릭/입력마다 스크립트 전체를 다시 실행하므로, 캐시가 없으면 rerun마다 목록 API가 호출됩니다.
+# 목록을 바꾸는 동작(업로드, 삭제, 새 채팅) 후에는 invalidate_*()로 즉시 무효화합니다.
+LIST_CACHE_TTL = int(os.environ.get("API_LIST_CACHE_TTL", 30))
+# 일반 API 호출 타임아웃(초) (업로드/스트리밍은 호출하는 쪽에서 따로 지정)
+DEFAULT_TIMEOUT = 10
+
+
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """
+    모든 rerun/브라우저 탭이 공유하는 HTTP 세션입니다.
+    Keep-Alive 연결을 재사용하여 호출마다 TCP 연결을 새로 맺지 않습니다.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def request(method: str, path: str, **kwargs) -> requests.Response:
+    """공유 세션으로 API를 호출합니다. path는 API_BASE_URL 기준 경로입니다."""
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    return get_http_session().request(method, f"{API_BASE_URL}{path}", **kwargs)
+
+
+# --- 목록 조회 (캐시) ---
+# 캐시 함수는 UI 요소를 그리지 않고, 실패 시 예외를 그대로 올립니다. (예외는 캐시되지 않음)
+
+@st.cache_data(ttl=LIST_CACHE_TTL, show_spinner=False)
+def list_chat_sessions() -> list:
+    """모든 채팅 세션 목록 (GET /chats/)"""
+    response = request("GET", "/chats/")
+    response.raise_for_status()
+    return response.json()
+
+
+@st.cache_data(ttl=LIST_CACHE_TTL, show_spinner=False)
+def list_processed_files() -> list:
+    """처리 완료된 문서 목록 (GET /documents/)"""
+    response = request("GET", "/documents/")
+    response.raise_for_status()
+    return response.json()
+
+
+def invalidate_chat_sessions():
+    """채팅 세션이 생성/삭제된 후 호출합니다."""
+    list_chat_sessions.clear()
+
+
+def invalidate_processed_files():
+    """문서가 업로드(처리)된 후 호출합니다."""
+    list_processed_files.clear()
+
+
+# --- 변경 / 단건 조회 ---
+
+def get_chat_session(session_id: int) -> requests.Response:
+    return request("GET", f"/chats/{session_id}")
+
+
+def create_chat_session(topic: str) -> requests.Response:
+    response = request("POST", "/chats/", json={"topic": topic})
+    if response.ok:
+        invalidate_chat_sessions()
+    return response
+
+
+def delete_chat_session(session_id: int) -> requests.Response:
+    response = request("DELETE", f"/chats/{session_id}")
+    # 일부만 실패했더라도 목록이 바뀌었을 수 있으므로 항상 무효화
+    invalidate_chat_sessions()
+    return response
+
+
+def upload_document(file) -> requests.Response:
+    files = {"file": (file.name, file, file.type)}
+    # 파싱과 Vector DB 재구축까지 끝나야 응답하므로 타임아웃 없이 기다림
+    response = request("POST", "/documents/upload", files=files, timeout=None)
+    if response.ok:
+        invalidate_processed_files()
+    return response
+
+
+def stream_chat(data: dict, timeout: int = 300) -> requests.Response:
+    """채팅 스트리밍 요청 (with 문으로 사용)"""
+    return request(
+        "POST", "/chat/stream",
+        json=data,
+        stream=True,
+        headers={"Content-Type": "application/json"},
+        timeout=timeout,
+    )
@@ -1,11 +1,6 @@
 import streamlit as st
 import requests
-import os
-from dotenv import load_dotenv
-
-# API 엔드포인트 기본 URL
-load_dotenv()
-API_BASE_URL = os.environ.get("API_BASE_URL")
+from utils import api_client
 
 
 def init_session_state():
@@ -32,10 +27,9 @@ def reset_chat_session():
 
     try:
         # 백엔드에 새 세션 생성을 요청 (기본 주제)
-        response = requests.post(
-            f"{API_BASE_URL}/chats/",
-            json={"topic": "새 채팅"}  # 첫 질문을 topic으로 하려했으나, 새 채팅 시점엔 알 수 없음
-        )
+        # 첫 질문을 topic으로 하려했으나, 새 채팅 시점엔 알 수 없음
+        # (성공하면 api_client가 채팅 이력 목록 캐시를 무효화)
+        response = api_client.create_chat_session("새 채팅")
         if response.status_code == 200 or response.status_code == 201:
             new_session = response.json()
             st.session_state.current_chat_id = new_session["id"]
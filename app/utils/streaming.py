@@ -0,0 +1,156 @@
+import json
+import time
+import queue
+import logging
+import threading
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# --- 스트리밍 답변 수신 / 렌더링 ---
+# 토큰마다 placeholder.markdown(전체 답변)을 호출하면 답변이 길어질수록 매번 전체 문자열을 다시 보내고 그리므로
+# 전체 비용이 답변 길이의 제곱에 비례하고 브라우저 렌더링이 끊깁니다.
+#   1. SSEReader: 백그라운드 스레드에서 응답 바이트를 읽어 이벤트 단위로 잘라 JSON을 파싱하고 큐에 넣습니다.
+#   2. ThrottledRenderer: UI 스레드는 큐에서 꺼낸 토큰을 버퍼에 모았다가 일정 간격으로만 다시 그립니다.
+#      답변이 길어질수록 간격을 늘려, 다시 그리는 총 문자 수가 답변 길이에 거의 비례하도록 합니다.
+
+SSEEvent = Tuple[str, object]  # (이벤트 타입, 데이터)
+
+_EVENT_SEPARATORS = (b"\r\n\r\n", b"\n\n")
+
+
+class SSEDecoder:
+    """
+    임의의 위치에서 잘린 바이트 조각을 받아 완성된 SSE 이벤트만 반환하는 증분 디코더입니다.
+    (이벤트 경계인 빈 줄이 올 때까지 버퍼에 보관하고, 주석(':' 시작) 라인은 무시)
+    """
+
+    def __init__(self):
+        self._buffer = b""
+
+    def feed(self, chunk: bytes) -> List[SSEEvent]:
+        self._buffer += chunk
+        events = []
+        while True:
+            cut = self._find_separator()
+            if cut is None:
+                break
+            end, size = cut
+            raw, self._buffer = self._buffer[:end], self._buffer[end + size:]
+            event = self._parse(raw)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def _find_separator(self) -> Optional[Tuple[int, int]]:
+        found = [(self._buffer.find(sep), len(sep)) for sep in _EVENT_SEPARATORS]
+        found = [item for item in found if item[0] >= 0]
+        return min(found) if found else None
+
+    @staticmethod
+    def _parse(raw: bytes) -> Optional[SSEEvent]:
+        data_lines = [
+            line[5:].lstrip(b" ")
+            for line in raw.splitlines()
+            if line.startswith(b"data:")
+        ]
+        if not data_lines:
+            return None  # 하트비트 등 주석만 있는 이벤트
+        payload = b"\n".join(data_lines)
+        try:
+            event = json.loads(payload)
+        except json.JSONDecodeError:
+            logger.warning("SSE 이벤트 JSON 파싱 오류: %r", payload[:200])
+            return None
+        return event.get("type"), event.get("data")
+
+
+_DONE = object()
+
+
+class SSEReader:
+    """
+    응답 바이트 스트림을 백그라운드 스레드에서 읽고 디코딩하여 이벤트 큐로 전달합니다.
+    UI 스레드는 events()로 이벤트를 꺼내며, 네트워크 대기나 JSON 파싱으로 멈추지 않습니다.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = chunks
+        self._queue: "queue.Queue" = queue.Queue()
+        self.error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="sse-reader", daemon=True)
+
+    def start(self) -> "SSEReader":
+        self._thread.start()
+        return self
+
+    def _run(self):
+        decoder = SSEDecoder()
+        try:
+            for chunk in self._chunks:
+                for event in decoder.feed(chunk):
+                    self._queue.put(event)
+        except Exception as e:
+            # 연결 끊김 등 (UI 스레드에서 error로 확인)
+            self.error = e
+        finally:
+            self._queue.put(_DONE)
+
+    def events(self, timeout: float) -> Iterator[Optional[SSEEvent]]:
+        """
+        이벤트를 순서대로 반환합니다. timeout 동안 새 이벤트가 없으면 None을 반환하여
+        호출하는 쪽이 버퍼에 모아 둔 토큰을 그릴 기회를 줍니다.
+        """
+        while True:
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                yield None
+                continue
+            if item is _DONE:
+                return
+            yield item
+
+
+class ThrottledRenderer:
+    """
+    토큰을 모았다가 제한된 빈도로만 placeholder를 다시 그립니다.
+
+    - min_interval: 다시 그리는 최소 간격(초)
+    - chars_per_step: 답변이 이 글자 수만큼 길어질 때마다 간격을 min_interval씩 늘림
+    - cursor: 작성 중임을 표시하는 문자
+    """
+
+    def __init__(self, placeholder, min_interval: float = 0.08, chars_per_step: int = 2000, cursor: str = "▌"):
+        self.placeholder = placeholder
+        self.min_interval = min_interval
+        self.chars_per_step = chars_per_step
+        self.cursor = cursor
+        self.text = ""
+        self.renders = 0
+        self._pending = False
+        self._last_render = 0.0
+
+    @property
+    def interval(self) -> float:
+        return self.min_interval * (1 + len(self.text) // self.chars_per_step)
+
+    def append(self, content: str):
+        self.text += content
+        self._pending = True
+        self.maybe_render()
+
+    def maybe_render(self):
+        """마지막으로 그린 후 interval이 지났고 새 토큰이 있으면 다시 그립니다."""
+        if self._pending and time.monotonic() - self._last_render >= self.interval:
+            self._render(self.text + self.cursor)
+
+    def finish(self):
+        """커서 없이 최종 답변을 그립니다."""
+        self._render(self.text)
+
+    def _render(self, text: str):
+        self.placeholder.markdown(text)
+        self.renders += 1
+        self._pending = False
+        self._last_render = time.monotonic()
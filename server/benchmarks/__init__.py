@@ -0,0 +1,11 @@
+"""
+오프라인 성능 측정(벤치마크) 도구 모음
+
+Azure OpenAI 계정 없이도 검색/Rerank/청크 분할 변경의 효과를 측정할 수 있도록
+합성 모집요강 코퍼스와 결정적(deterministic) 로컬 LLM/임베딩 대체 구현을 제공합니다.
+
+사용법 (server 디렉터리에서):
+    python -m benchmarks.run_rag --universities 20 --concurrency 1,4,16
+    python -m benchmarks.embedding_backends --backends stub,local
+    python -m benchmarks.index_formats --dimensions 3072,1024,256
+"""
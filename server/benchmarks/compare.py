@@ -0,0 +1,51 @@
+"""
+벤치마크 결과 비교 보고서
+
+run_rag / loadtest.run_load 등이 저장한 결과 JSON 두 개를 받아
+공통 숫자 지표의 기준값(baseline), 비교값(candidate), 변화율을 표로 출력합니다.
+두 실행의 설정(config)이 다르면 함께 표시합니다.
+
+사용법 (server 디렉터리에서):
+    python -m benchmarks.compare benchmarks/results/before.json benchmarks/results/after.json --threshold 0.05
+"""
+import sys
+import json
+import argparse
+
+from benchmarks.report import compare_results, format_table
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="벤치마크 결과 비교")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.0, help="이 변화율(예: 0.05) 미만 지표는 생략")
+    parser.add_argument("--filter", default="", help="지표 이름에 포함되어야 하는 문자열 (예: p95)")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, "r", encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    if baseline.get("benchmark") != candidate.get("benchmark"):
+        print(f"경고: 서로 다른 벤치마크 결과입니다. ({baseline.get('benchmark')} / {candidate.get('benchmark')})")
+
+    config_diff = {
+        key: (baseline.get("config", {}).get(key), candidate.get("config", {}).get(key))
+        for key in baseline.get("config", {}).keys() | candidate.get("config", {}).keys()
+        if baseline.get("config", {}).get(key) != candidate.get("config", {}).get(key)
+    }
+    if config_diff:
+        print("[설정 차이]")
+        for key, (before, after) in sorted(config_diff.items()):
+            print(f"  {key}: {before} -> {after}")
+        print()
+
+    rows = [row for row in compare_results(baseline, candidate, args.threshold) if args.filter in row["metric"]]
+    print(format_table(rows, ["metric", "baseline", "candidate", "change"]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+import os
+import json
+import random
+from dataclasses import dataclass, asdict
+from typing import List, Optional
+
+# --- 합성 모집요강 코퍼스 ---
+# 실제 모집요강과 비슷한 구조(전형별 모집인원, 일정, 지원자격, 등록금 등)의 마크다운 문서를 만들고,
+# 각 문서의 사실(fact)을 정답으로 갖는 질문 세트를 함께 생성합니다.
+# 같은 seed면 항상 같은 코퍼스/질문이 만들어지므로 실행 간 결과를 비교할 수 있습니다.
+
+_NAME_PREFIXES = ["한빛", "새롬", "푸른", "미래", "하늘", "가람", "누리", "다솜", "별빛", "온누리", "해오름", "늘품"]
+_NAME_SUFFIXES = ["과학기술", "국제", "문화예술", "바이오", "공과", "교육", "글로벌", "디지털"]
+_REGIONS = ["서울", "부산", "대전", "광주", "인천", "대구", "울산", "세종", "강원", "제주"]
+
+_ADMISSION_TYPES = ["학생부교과전형", "학생부종합전형", "논술전형", "실기전형", "지역균형전형", "농어촌학생전형"]
+_DEPARTMENTS = ["컴퓨터공학과", "경영학과", "간호학과", "기계공학과", "국어국문학과", "화학과", "미디어커뮤니케이션학과", "건축학과"]
+_DOCUMENTS = ["학교생활기록부", "자기소개서", "추천서", "졸업증명서", "가족관계증명서", "포트폴리오"]
+
+# 본문 길이를 늘리기 위한 일반 안내 문단 (검색 난이도를 높이는 방해 문장)
+_FILLER_SENTENCES = [
+    "지원자는 모집요강의 모든 내용을 숙지한 후 지원하여야 하며, 이를 준수하지 않아 발생하는 불이익은 지원자 본인의 책임입니다.",
+    "원서접수 완료 후에는 어떠한 경우에도 지원 사항을 변경하거나 취소할 수 없습니다.",
+    "제출 서류가 허위로 판명될 경우 합격 또는 입학을 취소합니다.",
+    "전형 일정은 대학의 사정에 따라 변경될 수 있으며, 변경 시 입학처 홈페이지를 통해 공지합니다.",
+    "장애인 등 대상자는 편의 지원 신청서를 제출하면 전형 과정에서 필요한 편의를 제공받을 수 있습니다.",
+    "복수 지원 금지 규정을 위반한 경우 입학 허가를 취소합니다.",
+    "충원 합격자 발표는 개별 전화 통보 및 홈페이지 공지를 병행합니다.",
+    "대학수학능력시험 최저학력기준은 해당 전형에 한하여 적용합니다.",
+]
+
+_GENERAL_CHAT = ["안녕하세요", "고마워요!", "오늘 날씨 어때?", "너는 누구야?", "좋은 하루 보내세요"]
+
+
+@dataclass
+class LabeledQuestion:
+    """정답 출처(source 파일명)와 정답 문자열(fact)이 표시된 질문"""
+    question: str
+    intent: str  # "admission_question" / "general_chat"
+    source: Optional[str] = None
+    fact: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def university_names(count: int, rng: random.Random) -> List[str]:
+    names = [f"{region}{prefix}{suffix}대학교"
+             for region in _REGIONS for prefix in _NAME_PREFIXES for suffix in _NAME_SUFFIXES]
+    rng.shuffle(names)
+    if count > len(names):
+        raise ValueError(f"대학 수는 최대 {len(names)}개까지 생성할 수 있습니다.")
+    return names[:count]
+
+
+def _filler(rng: random.Random, sentences: int) -> str:
+    return " ".join(rng.choice(_FILLER_SENTENCES) for _ in range(sentences))
+
+
+def build_guide(name: str, rng: random.Random, filler_paragraphs: int = 2):
+    """
+    대학 하나의 모집요강 마크다운과 정답 질문 목록을 생성합니다.
+    :return: (마크다운 문자열, [(질문, 정답 문자열), ...])
+    """
+    year = 2026
+    facts = []
+    lines = [f"# {year}학년도 {name} 수시모집 요강", ""]
+
+    lines += ["## 1. 전형별 모집인원", ""]
+    lines += ["| 전형명 | 모집단위 | 모집인원 |", "| --- | --- | --- |"]
+    for admission_type in rng.sample(_ADMISSION_TYPES, 4):
+        department = rng.choice(_DEPARTMENTS)
+        quota = rng.randint(5, 180)
+        lines.append(f"| {admission_type} | {department} | {quota}명 |")
+        facts.append((f"{name} {admission_type} {department} 모집인원은 몇 명인가요?", f"{quota}명"))
+    lines.append("")
+    for _ in range(filler_paragraphs):
+        lines += [_filler(rng, 4), ""]
+
+    month, day = rng.randint(9, 10), rng.randint(1, 20)
+    lines += ["## 2. 전형 일정", ""]
+    lines.append(f"- 원서접수: {year - 1}년 {month}월 {day}일부터 {month}월 {day + 4}일까지 (인터넷 접수)")
+    lines.append(f"- 서류 제출 마감: {year - 1}년 {month}월 {day + 7}일 17시")
+    announce = f"{year - 1}년 12월 {rng.randint(5, 15)}일"
+    lines.append(f"- 최초 합격자 발표: {announce}")
+    lines.append("")
+    facts.append((f"{name} 원서접수 기간은 언제인가요?", f"{month}월 {day}일부터 {month}월 {day + 4}일까지"))
+    facts.append((f"{name} 최초 합격자 발표일은 언제인가요?", announce))
+    for _ in range(filler_paragraphs):
+        lines += [_filler(rng, 4), ""]
+
+    required = rng.sample(_DOCUMENTS, 2)
+    lines += ["## 3. 지원자격 및 제출서류", ""]
+    lines.append("고등학교 졸업(예정)자 또는 법령에 의하여 이와 동등 이상의 학력이 있다고 인정된 자.")
+    lines.append(f"제출서류는 {required[0]}와 {required[1]}이며, 모든 서류는 원본으로 제출합니다.")
+    lines.append("")
+    facts.append((f"{name} 지원 시 제출해야 하는 서류는 무엇인가요?", f"{required[0]}와 {required[1]}"))
+    for _ in range(filler_paragraphs):
+        lines += [_filler(rng, 4), ""]
+
+    tuition = rng.randint(320, 520) * 10000
+    dorm = rng.randint(80, 160) * 10000
+    lines += ["## 4. 등록금 및 기숙사", ""]
+    lines.append(f"1학기 등록금은 {tuition:,}원이며, 기숙사비는 한 학기 {dorm:,}원입니다.")
+    lines.append("")
+    facts.append((f"{name} 1학기 등록금은 얼마인가요?", f"{tuition:,}원"))
+    facts.append((f"{name} 기숙사비는 한 학기에 얼마인가요?", f"{dorm:,}원"))
+
+    return "\n".join(lines), facts
+
+
+def generate_corpus(
+        output_dir: str,
+        universities: int = 10,
+        filler_paragraphs: int = 2,
+        general_questions: int = 5,
+        seed: int = 42,
+) -> List[LabeledQuestion]:
+    """
+    output_dir에 대학별 모집요강 마크다운(.md)을 생성하고 정답 질문 세트를 반환합니다.
+    :param universities: 생성할 문서(대학) 수 (코퍼스 크기)
+    :param filler_paragraphs: 섹션별 방해 문단 수 (문서 길이/청크 수)
+    :param general_questions: 섞어 넣을 잡담 질문 수 (의도 분류 경로 측정용)
+    """
+    rng = random.Random(seed)
+    os.makedirs(output_dir, exist_ok=True)
+
+    questions: List[LabeledQuestion] = []
+    for index, name in enumerate(university_names(universities, rng)):
+        markdown, facts = build_guide(name, rng, filler_paragraphs)
+        filename = f"{index:04d}_{name}_모집요강.md"
+        with open(os.path.join(output_dir, filename), "w", encoding="utf-8") as f:
+            f.write(markdown)
+        questions.extend(
+            LabeledQuestion(question=question, intent="admission_question", source=filename, fact=fact)
+            for question, fact in facts
+        )
+
+    questions.extend(
+        LabeledQuestion(question=rng.choice(_GENERAL_CHAT), intent="general_chat")
+        for _ in range(general_questions)
+    )
+    rng.shuffle(questions)
+    return questions
+
+
+def load_fixture_corpus(fixture_dir: str) -> List[LabeledQuestion]:
+    """
+    실제 모집요강 MD 폴더를 코퍼스로 쓸 때, 같은 폴더의 questions.jsonl
+    ({"question", "intent", "source", "fact"} 한 줄씩)에서 정답 질문 세트를 읽습니다.
+    """
+    path = os.path.join(fixture_dir, "questions.jsonl")
+    with open(path, "r", encoding="utf-8") as f:
+        return [LabeledQuestion(**json.loads(line)) for line in f if line.strip()]
@@ -0,0 +1,168 @@
+"""
+임베딩 백엔드 비교 벤치마크 (Azure OpenAI vs 로컬 CPU 모델)
+
+같은 코퍼스와 정답 질문 세트로 백엔드별 인덱스를 만들고
+- 모델 로드 시간, 인덱스 구축 시간, 벡터 차원
+- 쿼리 임베딩 지연 시간 (캐시를 거치지 않은 단건 호출) / FAISS 검색 지연 시간
+- 검색 재현율(recall@k), Rerank 후 재현율, MRR
+- 프로세스 메모리(RSS) 증가량
+을 나란히 비교합니다. 배포 환경별로 어떤 백엔드를 쓸지 정할 때 사용합니다.
+
+사용법 (server 디렉터리에서):
+    python -m benchmarks.embedding_backends --backends stub,local --universities 30
+    python -m benchmarks.embedding_backends --backends azure,local --output benchmarks/results/embeddings.json
+    (azure는 .env의 실제 AOAI 설정이 필요합니다)
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from typing import Any, Dict, List
+
+from benchmarks.corpus import LabeledQuestion, generate_corpus, load_fixture_corpus
+from benchmarks.report import environment_info, format_table, summarize, write_json
+from benchmarks.run_rag import build_index, evaluate_recall, rss_mb
+from benchmarks.stubs import StubEmbeddings, StubReranker, ensure_dummy_settings_env, install_stubs
+
+BACKENDS = ("stub", "local", "azure")
+
+
+def create_embeddings(backend: str, args):
+    from utils.config import settings
+
+    if backend == "stub":
+        return StubEmbeddings(latency_ms=args.stub_latency_ms)
+    if backend == "local":
+        if args.local_model:
+            settings.LOCAL_EMBEDDING_MODEL = args.local_model
+        if args.local_runtime:
+            settings.LOCAL_EMBEDDING_RUNTIME = args.local_runtime
+        return settings.get_local_embeddings()
+    return settings.get_azure_embeddings()
+
+
+def measure_queries(vector_store, embeddings, questions: List[LabeledQuestion], k: int) -> Dict[str, Any]:
+    """질문마다 쿼리 임베딩과 FAISS 검색 시간을 따로 측정합니다. (쿼리 임베딩 캐시를 거치지 않음)"""
+    embed_seconds, search_seconds = [], []
+    for question in questions:
+        started = time.perf_counter()
+        vector = embeddings.embed_query(question.question)
+        embed_seconds.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        vector_store.similarity_search_by_vector(vector, k=k)
+        search_seconds.append(time.perf_counter() - started)
+    return {"embed_query": summarize(embed_seconds), "faiss_search": summarize(search_seconds)}
+
+
+def run_backend(backend: str, args, md_folder: str, questions: List[LabeledQuestion], workdir: str) -> Dict[str, Any]:
+    rss_before = rss_mb()
+    embeddings = create_embeddings(backend, args)
+
+    # 첫 호출에 모델 로드(로컬) 또는 연결 수립(Azure)이 포함되므로 따로 측정
+    started = time.perf_counter()
+    dimensions = len(embeddings.embed_query("워밍업"))
+    load_seconds = time.perf_counter() - started
+
+    built = build_index(md_folder, os.path.join(workdir, backend), embeddings)
+    vector_store = built["vector_store"]
+    latency = measure_queries(vector_store, embeddings, questions, args.k)
+    recall = evaluate_recall(vector_store, questions, args.k)
+    rss_after = rss_mb()
+
+    return {
+        "backend": backend,
+        "dimensions": dimensions,
+        "load_seconds": load_seconds,
+        "index": built["stats"],
+        "latency": latency,
+        "recall": recall,
+        "rss_delta_mb": (rss_after - rss_before) if rss_before is not None else None,
+    }
+
+
+def summary_rows(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    rows = []
+    for result in results:
+        embed, search = result["latency"]["embed_query"], result["latency"]["faiss_search"]
+        rows.append({
+            "backend": result["backend"],
+            "dims": result["dimensions"],
+            "load_s": result["load_seconds"],
+            "index_s": result["index"]["index_seconds"],
+            "embed_p50_ms": embed["p50"] * 1000,
+            "embed_p95_ms": embed["p95"] * 1000,
+            "search_p50_ms": search["p50"] * 1000,
+            "recall@k": result["recall"]["recall_at_k"],
+            "rerank_recall": result["recall"]["recall_after_rerank"],
+            "mrr": result["recall"]["mrr"],
+            "rss_mb": result["rss_delta_mb"],
+        })
+    return rows
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="임베딩 백엔드 비교 벤치마크")
+    parser.add_argument("--backends", default="stub,local", help=f"쉼표로 구분한 백엔드 목록 ({', '.join(BACKENDS)})")
+    parser.add_argument("--universities", type=int, default=20, help="합성 코퍼스의 문서(대학) 수")
+    parser.add_argument("--filler", type=int, default=2, help="섹션별 방해 문단 수 (문서 길이)")
+    parser.add_argument("--fixture-dir", help="합성 코퍼스 대신 사용할 MD 폴더 (questions.jsonl 필요)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--k", type=int, default=10, help="재현율 계산 시 검색 문서 수")
+    parser.add_argument("--local-model", help="LOCAL_EMBEDDING_MODEL 대신 사용할 모델 경로/ID")
+    parser.add_argument("--local-runtime", choices=("torch", "onnx"), help="LOCAL_EMBEDDING_RUNTIME 대신 사용할 런타임")
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0, help="stub 백엔드의 요청당 지연")
+    parser.add_argument("--real-reranker", action="store_true", help="로컬 Cross-Encoder로 Rerank 후 재현율 계산")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--log-level", default="WARNING")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    backends = [name.strip() for name in args.backends.split(",") if name.strip()]
+    unknown = set(backends) - set(BACKENDS)
+    if unknown:
+        print(f"알 수 없는 백엔드: {', '.join(sorted(unknown))}")
+        return 2
+    if "azure" not in backends:
+        # Azure를 호출하지 않으면 .env 없이도 실행되도록 더미 설정을 채웁니다.
+        ensure_dummy_settings_env()
+
+    from utils.logging_config import configure_logging
+
+    configure_logging(args.log_level)
+    # Rerank 후 재현율 계산에만 사용 (LLM은 호출하지 않음)
+    install_stubs(reranker=None if args.real_reranker else StubReranker())
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="embedding-bench-") as workdir:
+        if args.fixture_dir:
+            md_folder = args.fixture_dir
+            questions = load_fixture_corpus(args.fixture_dir)
+        else:
+            md_folder = os.path.join(workdir, "md")
+            questions = generate_corpus(md_folder, args.universities, args.filler, 0, args.seed)
+        questions = [question for question in questions if question.source and question.fact]
+
+        for backend in backends:
+            print(f"[{backend}] 인덱스 구축 및 측정 중...")
+            results.append(run_backend(backend, args, md_folder, questions, workdir))
+
+    print()
+    print(format_table(summary_rows(results)))
+
+    if args.output:
+        write_json(args.output, {
+            "benchmark": "embedding_backends",
+            "config": vars(args),
+            "environment": environment_info(),
+            "results": {result["backend"]: result for result in results},
+        })
+        print(f"\n결과 저장: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""
+FAISS 인덱스 저장 형식 비교 벤치마크 (차원 축소 x 스칼라 양자화)
+
+청크와 질문을 한 번만 최대 차원으로 임베딩한 뒤, 차원 축소(앞쪽 차원만 남기고 다시 L2 정규화)와
+저장 형식(flat / fp16 / sq8)의 조합마다 인덱스를 만들어
+- 인덱스 크기(직렬화 바이트)와 현재 형식(최대 차원 flat) 대비 압축률
+- 검색 지연 시간 p50 / p95
+- 정답 기준 recall@k, MRR과 현재 형식 검색 결과와의 겹침 비율(overlap@k)
+을 비교합니다.
+
+text-embedding-3 계열의 dimensions 요청은 앞쪽 차원을 잘라 다시 정규화한 것과 같으므로
+API를 차원마다 다시 호출하지 않고 한 번의 임베딩으로 모든 차원을 측정할 수 있습니다.
+(stub 백엔드는 Matryoshka 방식으로 학습된 임베딩이 아니므로 차원 축소 시 품질 손실이 과장됩니다.)
+
+사용법 (server 디렉터리에서):
+    python -m benchmarks.index_formats --backend stub --stub-dimensions 3072 --dimensions 3072,1024,512,256
+    python -m benchmarks.index_formats --backend azure --dimensions 3072,1024,256 --output benchmarks/results/index-formats.json
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from typing import Any, Dict, List, Optional
+
+from benchmarks.corpus import LabeledQuestion, generate_corpus, load_fixture_corpus
+from benchmarks.embedding_backends import BACKENDS, create_embeddings
+from benchmarks.report import environment_info, format_table, summarize, write_json
+from benchmarks.stubs import StubEmbeddings, ensure_dummy_settings_env
+
+QUANTIZATIONS = ("flat", "fp16", "sq8")
+
+
+def truncate(vectors, dimensions: int):
+    """앞쪽 dimensions개 차원만 남기고 다시 L2 정규화합니다. (Matryoshka 차원 축소)"""
+    import numpy as np
+
+    truncated = np.ascontiguousarray(vectors[:, :dimensions], dtype="float32")
+    norms = np.linalg.norm(truncated, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return truncated / norms
+
+
+def build_index(vectors, quantization: str):
+    import faiss
+    from processing import quantize_faiss_index
+
+    index = faiss.IndexFlatL2(vectors.shape[1])
+    index.add(vectors)
+    return quantize_faiss_index(index, quantization)
+
+
+def index_bytes(index) -> int:
+    import faiss
+
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def search_all(index, queries, k: int):
+    """질문을 하나씩 검색하여 (결과 id 목록, 질문별 지연 시간)을 반환합니다. (실제 요청과 같은 단건 검색)"""
+    results, seconds = [], []
+    for query in queries:
+        started = time.perf_counter()
+        _, ids = index.search(query.reshape(1, -1), k)
+        seconds.append(time.perf_counter() - started)
+        results.append([int(i) for i in ids[0] if i >= 0])
+    return results, seconds
+
+
+def score(results: List[List[int]], relevant: List[set], baseline: Optional[List[List[int]]]) -> Dict[str, Any]:
+    hits, reciprocal_ranks, overlaps = 0, [], []
+    for i, ids in enumerate(results):
+        rank = next((position + 1 for position, doc_id in enumerate(ids) if doc_id in relevant[i]), None)
+        hits += rank is not None
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+        if baseline is not None and baseline[i]:
+            overlaps.append(len(set(ids) & set(baseline[i])) / len(baseline[i]))
+    total = len(results) or 1
+    return {
+        "recall_at_k": hits / total,
+        "mrr": sum(reciprocal_ranks) / total,
+        "overlap_at_k": (sum(overlaps) / len(overlaps)) if overlaps else None,
+    }
+
+
+def relevant_chunks(documents, questions: List[LabeledQuestion]) -> List[set]:
+    """질문별 정답 청크 id (정답 출처 파일이면서 정답 문자열을 포함한 청크)"""
+    return [
+        {
+            i for i, doc in enumerate(documents)
+            if doc.metadata.get("source") == question.source and question.fact in doc.page_content
+        }
+        for question in questions
+    ]
+
+
+def run(args, md_folder: str, questions: List[LabeledQuestion]) -> Dict[str, Any]:
+    import numpy as np
+    from processing import load_md_documents
+
+    if args.backend == "stub":
+        embeddings = StubEmbeddings(dimensions=args.stub_dimensions)
+    else:
+        embeddings = create_embeddings(args.backend, args)
+
+    documents = load_md_documents(md_folder)
+    started = time.perf_counter()
+    doc_vectors = np.asarray(embeddings.embed_documents([doc.page_content for doc in documents]), dtype="float32")
+    query_vectors = np.asarray([embeddings.embed_query(q.question) for q in questions], dtype="float32")
+    embed_seconds = time.perf_counter() - started
+
+    full_dimensions = doc_vectors.shape[1]
+    dimensions_list = [int(value) for value in args.dimensions.split(",")] if args.dimensions else [full_dimensions]
+    dimensions_list = [d for d in dimensions_list if d <= full_dimensions]
+    relevant = relevant_chunks(documents, questions)
+
+    # 현재 형식(최대 차원 flat)을 기준으로 크기/검색 결과를 비교
+    baseline_index = build_index(truncate(doc_vectors, full_dimensions), "flat")
+    baseline_results, _ = search_all(baseline_index, truncate(query_vectors, full_dimensions), args.k)
+    baseline_bytes = index_bytes(baseline_index)
+
+    rows = []
+    for dimensions in dimensions_list:
+        docs = truncate(doc_vectors, dimensions)
+        queries = truncate(query_vectors, dimensions)
+        for quantization in args.quantizations.split(","):
+            started = time.perf_counter()
+            index = build_index(docs, quantization)
+            build_seconds = time.perf_counter() - started
+
+            # 워밍업 후 측정
+            search_all(index, queries[: min(len(queries), 5)], args.k)
+            results, seconds = search_all(index, queries, args.k)
+            size = index_bytes(index)
+            rows.append({
+                "dimensions": dimensions,
+                "quantization": quantization,
+                "index_bytes": size,
+                "compression": baseline_bytes / size if size else None,
+                "build_seconds": build_seconds,
+                "search": summarize(seconds),
+                **score(results, relevant, baseline_results),
+            })
+
+    return {
+        "chunks": len(documents),
+        "questions": len(questions),
+        "full_dimensions": full_dimensions,
+        "embed_seconds": embed_seconds,
+        "formats": rows,
+    }
+
+
+def summary_rows(result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "dims": row["dimensions"],
+            "format": row["quantization"],
+            "size_kb": row["index_bytes"] / 1024,
+            "x_smaller": row["compression"],
+            "search_p50_ms": row["search"]["p50"] * 1000,
+            "search_p95_ms": row["search"]["p95"] * 1000,
+            "recall@k": row["recall_at_k"],
+            "mrr": row["mrr"],
+            "overlap@k": row["overlap_at_k"],
+        }
+        for row in result["formats"]
+    ]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="FAISS 인덱스 저장 형식 비교 벤치마크")
+    parser.add_argument("--backend", choices=BACKENDS, default="stub", help="임베딩 백엔드")
+    parser.add_argument("--dimensions", default="3072,1536,1024,512,256", help="쉼표로 구분한 비교할 차원 목록")
+    parser.add_argument("--quantizations", default=",".join(QUANTIZATIONS), help="쉼표로 구분한 저장 형식 목록")
+    parser.add_argument("--stub-dimensions", type=int, default=3072, help="stub 백엔드의 최대 차원")
+    parser.add_argument("--universities", type=int, default=50, help="합성 코퍼스의 문서(대학) 수")
+    parser.add_argument("--filler", type=int, default=2, help="섹션별 방해 문단 수 (문서 길이)")
+    parser.add_argument("--fixture-dir", help="합성 코퍼스 대신 사용할 MD 폴더 (questions.jsonl 필요)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--k", type=int, default=10, help="검색 문서 수")
+    parser.add_argument("--local-model", help="LOCAL_EMBEDDING_MODEL 대신 사용할 모델 경로/ID")
+    parser.add_argument("--local-runtime", choices=("torch", "onnx"), help="LOCAL_EMBEDDING_RUNTIME 대신 사용할 런타임")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--log-level", default="WARNING")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    unknown = set(args.quantizations.split(",")) - set(QUANTIZATIONS)
+    if unknown:
+        print(f"알 수 없는 저장 형식: {', '.join(sorted(unknown))}")
+        return 2
+    if args.backend != "azure":
+        ensure_dummy_settings_env()
+
+    from utils.logging_config import configure_logging
+
+    configure_logging(args.log_level)
+
+    with tempfile.TemporaryDirectory(prefix="index-bench-") as workdir:
+        if args.fixture_dir:
+            md_folder = args.fixture_dir
+            questions = load_fixture_corpus(args.fixture_dir)
+        else:
+            md_folder = os.path.join(workdir, "md")
+            questions = generate_corpus(md_folder, args.universities, args.filler, 0, args.seed)
+        questions = [question for question in questions if question.source and question.fact]
+        result = run(args, md_folder, questions)
+
+    print(f"청크 {result['chunks']}개, 질문 {result['questions']}개, 최대 차원 {result['full_dimensions']}")
+    print(format_table(summary_rows(result)))
+
+    if args.output:
+        write_json(args.output, {
+            "benchmark": "index_formats",
+            "config": vars(args),
+            "environment": environment_info(),
+            **result,
+        })
+        print(f"\n결과 저장: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,11 @@
+"""
+FastAPI 서버 HTTP 부하 테스트 도구
+
+- mock_aoai: 설정한 속도로 토큰을 스트리밍하는 Azure OpenAI 대체 서버
+- sse_client: TTFB / 토큰 간 간격을 측정하는 SSE 클라이언트
+- run_load: 가상 사용자 시나리오 실행 및 결과 보고서 생성
+
+사용법 (server 디렉터리에서):
+    python -m benchmarks.loadtest.run_load --spawn --users 200 --output benchmarks/results/load.json
+    python -m benchmarks.compare benchmarks/results/load-before.json benchmarks/results/load.json
+"""
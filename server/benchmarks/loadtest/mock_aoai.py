@@ -0,0 +1,178 @@
+"""
+Azure OpenAI 대체(mock) 서버
+
+Chat Completions(스트리밍/비스트리밍)와 Embeddings 엔드포인트를 흉내 냅니다.
+첫 토큰 지연과 초당 토큰 수를 옵션으로 조절할 수 있어, 실제 Azure 할당량이나 비용 없이
+서버의 스트리밍 경로에 원하는 부하를 줄 수 있습니다.
+
+사용법 (server 디렉터리에서):
+    python -m benchmarks.loadtest.mock_aoai --port 9100 --first-token-ms 300 --tokens-per-second 50
+    # 서버는 AOAI_ENDPOINT=http://127.0.0.1:9100/ 로 실행
+"""
+import sys
+import json
+import time
+import array
+import base64
+import asyncio
+import argparse
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from benchmarks.stubs import GREETING_WORDS, StubEmbeddings, split_tokens
+
+
+class MockOptions:
+    """mock 서버 응답 속도/크기 설정 (CLI 옵션으로 채워짐)"""
+    first_token_ms: float = 300.0
+    tokens_per_second: float = 50.0
+    answer_tokens: int = 80
+    embedding_dimensions: int = 3072
+    embedding_latency_ms: float = 50.0
+
+
+options = MockOptions()
+app = FastAPI(title="Mock Azure OpenAI")
+_embedder = StubEmbeddings()
+
+
+def _last_user_text(messages: List[Dict[str, Any]]) -> str:
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            content = message.get("content")
+            return content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+    return ""
+
+
+def _response_text(messages: List[Dict[str, Any]]) -> str:
+    """프롬프트 종류(의도 분류 / 쿼리 재작성 / 답변)에 맞는 응답 본문"""
+    system = "\n".join(str(m.get("content")) for m in messages if m.get("role") == "system")
+    question = _last_user_text(messages)
+    if "의도 분류기" in system:
+        intent = "general_chat" if any(word in question for word in GREETING_WORDS) else "admission_question"
+        return json.dumps({"intent": intent})
+    if "쿼리 재작성" in system:
+        return question.replace("마지막 질문:", "", 1).strip()
+    words = ("모집요강을 참고하여 답변드립니다. " * options.answer_tokens).split()
+    return " ".join(words[:options.answer_tokens])
+
+
+def _usage(messages: List[Dict[str, Any]], text: str) -> Dict[str, int]:
+    prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in messages)
+    completion_tokens = len(text.split())
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def _chunk(model: str, delta: Dict[str, Any], finish_reason=None) -> bytes:
+    payload = {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return b"data: " + json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n\n"
+
+
+async def _stream_completion(model: str, messages, text: str, include_usage: bool):
+    await asyncio.sleep(options.first_token_ms / 1000)
+    yield _chunk(model, {"role": "assistant", "content": ""})
+    interval = 1 / options.tokens_per_second if options.tokens_per_second > 0 else 0
+    for i, token in enumerate(split_tokens(text)):
+        if i and interval:
+            await asyncio.sleep(interval)
+        yield _chunk(model, {"content": token})
+    yield _chunk(model, {}, finish_reason="stop")
+    if include_usage:
+        usage = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()),
+                 "model": model, "choices": [], "usage": _usage(messages, text)}
+        yield b"data: " + json.dumps(usage).encode("utf-8") + b"\n\n"
+    yield b"data: [DONE]\n\n"
+
+
+@app.post("/openai/deployments/{deployment}/chat/completions")
+async def chat_completions(deployment: str, request: Request):
+    body = await request.json()
+    messages = body.get("messages", [])
+    text = _response_text(messages)
+
+    if body.get("stream"):
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+        return StreamingResponse(
+            _stream_completion(deployment, messages, text, include_usage),
+            media_type="text/event-stream",
+        )
+
+    tokens = len(split_tokens(text))
+    interval = 1 / options.tokens_per_second if options.tokens_per_second > 0 else 0
+    await asyncio.sleep(options.first_token_ms / 1000 + interval * tokens)
+    return JSONResponse({
+        "id": "chatcmpl-mock",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": deployment,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": _usage(messages, text),
+    })
+
+
+@app.post("/openai/deployments/{deployment}/embeddings")
+async def embeddings(deployment: str, request: Request):
+    body = await request.json()
+    inputs = body.get("input", [])
+    if not isinstance(inputs, list) or (inputs and isinstance(inputs[0], int)):
+        inputs = [inputs]
+
+    await asyncio.sleep(options.embedding_latency_ms / 1000)
+    data = []
+    for index, item in enumerate(inputs):
+        # langchain_openai는 토큰 ID 목록을 보낼 수 있으므로 문자열로 바꿔 해시합니다.
+        text = item if isinstance(item, str) else " ".join(str(token) for token in item)
+        vector = _embedder.vectorize(text)
+        if body.get("encoding_format") == "base64":
+            embedding: Any = base64.b64encode(array.array("f", vector).tobytes()).decode("ascii")
+        else:
+            embedding = vector
+        data.append({"object": "embedding", "index": index, "embedding": embedding})
+
+    tokens = sum(len(item) if isinstance(item, list) else len(item.split()) for item in inputs)
+    return JSONResponse({
+        "object": "list",
+        "data": data,
+        "model": deployment,
+        "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+    })
+
+
+def main(argv=None) -> int:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Mock Azure OpenAI 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--first-token-ms", type=float, default=options.first_token_ms)
+    parser.add_argument("--tokens-per-second", type=float, default=options.tokens_per_second)
+    parser.add_argument("--answer-tokens", type=int, default=options.answer_tokens)
+    parser.add_argument("--embedding-dimensions", type=int, default=options.embedding_dimensions)
+    parser.add_argument("--embedding-latency-ms", type=float, default=options.embedding_latency_ms)
+    args = parser.parse_args(argv)
+
+    options.first_token_ms = args.first_token_ms
+    options.tokens_per_second = args.tokens_per_second
+    options.answer_tokens = args.answer_tokens
+    options.embedding_dimensions = args.embedding_dimensions
+    options.embedding_latency_ms = args.embedding_latency_ms
+    _embedder.dimensions = args.embedding_dimensions
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,399 @@
+"""
+FastAPI 서버 HTTP 부하 테스트
+
+가상 사용자(virtual user)마다
+    채팅 세션 생성(POST /api/v1/chats/) -> 질문 N회 스트리밍(POST /api/v1/chat/stream) -> 세션 목록 조회(GET /api/v1/chats/)
+를 실행하고, 선택적으로 PDF 업로드(POST /api/v1/documents/upload)를 섞어 다음을 측정합니다.
+
+- 스트림: TTFB, 첫 토큰 시간, 'update' 프레임 간 간격, 완료율, 승인 거절(429/503) 수
+- 일반 요청: 엔드포인트별 지연 시간과 상태 코드
+- 이벤트 루프 지연: 부하 중 /health/live 응답 시간 (루프가 막히면 함께 늘어남)
+- 서버 메트릭(/metrics) 변화량: DB 쓰기 처리량, 쿼리 평균 지연 등
+
+--spawn 옵션을 주면 mock Azure OpenAI 서버와 API 서버(임시 DB)를 직접 띄워서 실행합니다.
+같은 --seed와 옵션이면 같은 질문 순서로 실행되며, 결과 JSON은 benchmarks.compare로 비교할 수 있습니다.
+
+사용법 (server 디렉터리에서):
+    python -m benchmarks.loadtest.run_load --spawn --users 200 --messages 2 --output benchmarks/results/load.json
+    python -m benchmarks.loadtest.run_load --base-url http://localhost:8000 --users 50
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.report import environment_info, format_table, summarize, write_json
+from benchmarks.loadtest.sse_client import StreamResult, stream_chat
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_QUESTIONS = [
+    "수시 학생부종합전형 모집인원은 몇 명인가요?",
+    "원서접수 기간은 언제인가요?",
+    "논술전형 지원 자격이 궁금합니다.",
+    "제출해야 하는 서류는 무엇인가요?",
+    "최초 합격자 발표일은 언제인가요?",
+    "1학기 등록금은 얼마인가요?",
+    "기숙사비는 한 학기에 얼마인가요?",
+    "수능 최저학력기준이 적용되는 전형이 있나요?",
+    "안녕하세요",
+    "고마워요!",
+]
+
+
+# --- 서버 메트릭(/metrics) ---
+
+def parse_prometheus(text: str) -> Dict[str, float]:
+    """Prometheus 텍스트 포맷을 {'이름{라벨}': 값} 형태로 파싱합니다."""
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        name, _, value = line.rpartition(" ")
+        try:
+            samples[name] = float(value)
+        except ValueError:
+            continue
+    return samples
+
+
+async def scrape_metrics(client: httpx.AsyncClient, base_url: str) -> Dict[str, float]:
+    try:
+        response = await client.get(f"{base_url}/metrics")
+        response.raise_for_status()
+    except httpx.HTTPError:
+        return {}
+    return parse_prometheus(response.text)
+
+
+def metrics_delta(before: Dict[str, float], after: Dict[str, float], elapsed: float) -> Dict[str, Any]:
+    """부하 구간 동안의 서버 메트릭 변화량을 요약합니다."""
+    delta = {name: value - before.get(name, 0.0) for name, value in after.items()}
+
+    def total(prefix: str, suffix: str, **labels) -> float:
+        result = 0.0
+        for name, value in delta.items():
+            if not name.startswith(prefix + suffix):
+                continue
+            if all(f'{key}="{label}"' in name for key, label in labels.items()):
+                result += value
+        return result
+
+    db_writes = sum(total("db_query_duration_seconds", "_count", statement=verb) for verb in ("INSERT", "UPDATE", "DELETE"))
+    db_count = total("db_query_duration_seconds", "_count")
+    db_sum = total("db_query_duration_seconds", "_sum")
+    lag_count = total("event_loop_lag_seconds", "_count")
+    return {
+        "db_writes": db_writes,
+        "db_writes_per_second": db_writes / elapsed if elapsed > 0 else None,
+        "db_queries": db_count,
+        "db_query_avg_ms": (db_sum / db_count * 1000) if db_count else None,
+        "sse_server_ttfb_avg_ms": (
+            total("sse_ttfb_seconds", "_sum") / total("sse_ttfb_seconds", "_count") * 1000
+            if total("sse_ttfb_seconds", "_count") else None
+        ),
+        "event_loop_lag_avg_ms": (
+            total("event_loop_lag_seconds", "_sum") / lag_count * 1000 if lag_count else None
+        ),
+    }
+
+
+async def fetch_loop_report(client: httpx.AsyncClient, args) -> Optional[Dict[str, Any]]:
+    """서버가 LOOP_MONITOR 모드로 실행 중이면 블로킹 호출 위치 집계를 가져옵니다."""
+    headers = {"X-Admin-Token": args.admin_token} if args.admin_token else {}
+    try:
+        response = await client.get(f"{args.base_url}/admin/loop", params={"top": 10}, headers=headers)
+    except httpx.HTTPError:
+        return None
+    if response.status_code != 200:
+        return None
+    report = response.json()
+    return {
+        "blocks": report["blocks"],
+        "blocked_seconds": report["blocked_seconds"],
+        "lag_p99": report["lag"]["p99"],
+        "locations": {
+            item["location"]: {"count": item["count"], "total_seconds": item["total_seconds"], "max_seconds": item["max_seconds"]}
+            for item in report["locations"]
+        },
+    }
+
+
+# --- 가상 사용자 시나리오 ---
+
+class LoadRecorder:
+    """요청/스트림 측정값 수집기"""
+
+    def __init__(self):
+        self.streams: List[StreamResult] = []
+        self.requests: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.probe_latencies: List[float] = []
+
+    async def timed(self, name: str, coro) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await coro
+        except httpx.HTTPError as e:
+            self.statuses[name][type(e).__name__] += 1
+            return None
+        self.requests[name].append(time.perf_counter() - started)
+        self.statuses[name][str(response.status_code)] += 1
+        return response
+
+
+async def virtual_user(client: httpx.AsyncClient, args, recorder: LoadRecorder, rng: random.Random, start_delay: float):
+    await asyncio.sleep(start_delay)
+    prompts = [rng.choice(_QUESTIONS) for _ in range(args.messages)]
+
+    response = await recorder.timed("create_session", client.post(f"{args.base_url}/api/v1/chats/", json={"topic": prompts[0]}))
+    if response is None or response.status_code != 200:
+        return
+    session_id = response.json()["id"]
+
+    for prompt in prompts:
+        recorder.streams.append(await stream_chat(client, f"{args.base_url}/api/v1/chat/stream", session_id, prompt))
+        if args.think_time:
+            await asyncio.sleep(args.think_time)
+
+    if args.list_sessions:
+        await recorder.timed("list_sessions", client.get(f"{args.base_url}/api/v1/chats/"))
+
+
+async def uploader(client: httpx.AsyncClient, args, recorder: LoadRecorder, start_delay: float):
+    await asyncio.sleep(start_delay)
+    with open(args.upload_pdf, "rb") as f:
+        content = f.read()
+    files = {"file": (os.path.basename(args.upload_pdf), content, "application/pdf")}
+    await recorder.timed("upload", client.post(f"{args.base_url}/api/v1/documents/upload", files=files))
+
+
+async def loop_probe(client: httpx.AsyncClient, base_url: str, recorder: LoadRecorder, interval: float, stop: asyncio.Event):
+    """부하 중 가벼운 엔드포인트의 응답 시간을 주기적으로 측정합니다. (이벤트 루프 지연의 외부 관측값)"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            await client.get(f"{base_url}/health/live")
+            recorder.probe_latencies.append(time.perf_counter() - started)
+        except httpx.HTTPError:
+            pass
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run(args) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    recorder = LoadRecorder()
+    limits = httpx.Limits(max_connections=args.users + args.uploads + 10, max_keepalive_connections=args.users + 10)
+    timeout = httpx.Timeout(args.timeout, connect=10.0)
+
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client, \
+            httpx.AsyncClient(timeout=timeout) as probe_client:
+        before = await scrape_metrics(probe_client, args.base_url)
+        stop = asyncio.Event()
+        probe = asyncio.create_task(loop_probe(probe_client, args.base_url, recorder, args.probe_interval, stop))
+
+        ramp = args.ramp_up / args.users if args.users else 0
+        tasks = [
+            virtual_user(client, args, recorder, random.Random(rng.random()), i * ramp)
+            for i in range(args.users)
+        ]
+        if args.upload_pdf:
+            tasks += [uploader(client, args, recorder, args.ramp_up * (i + 1) / (args.uploads + 1)) for i in range(args.uploads)]
+
+        started = time.perf_counter()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+        stop.set()
+        await probe
+        after = await scrape_metrics(probe_client, args.base_url)
+        loop_report = await fetch_loop_report(probe_client, args)
+
+    streams = recorder.streams
+    completed = [s for s in streams if s.completed]
+    gaps = [gap for s in streams for gap in s.token_gaps]
+    statuses = Counter(str(s.status) for s in streams)
+    return {
+        "benchmark": "load",
+        "config": {key: value for key, value in vars(args).items() if key != "server_env"},
+        "environment": environment_info(),
+        "elapsed_seconds": elapsed,
+        "streams": {
+            "attempted": len(streams),
+            "completed": len(completed),
+            "completion_rate": len(completed) / len(streams) if streams else None,
+            "streams_per_second": len(completed) / elapsed if elapsed > 0 else None,
+            "status_counts": dict(statuses),
+            "errors": sum(1 for s in streams if s.error and s.status == 200),
+            "ttfb": summarize([s.ttfb for s in streams if s.ttfb is not None]),
+            "first_token": summarize([s.first_token for s in completed if s.first_token is not None]),
+            "total": summarize([s.total for s in completed]),
+            "inter_token_gap": summarize(gaps),
+        },
+        "requests": {
+            name: {**summarize(latencies), "status_counts": dict(recorder.statuses[name])}
+            for name, latencies in recorder.requests.items()
+        },
+        "loop_probe": summarize(recorder.probe_latencies),
+        "server_metrics": metrics_delta(before, after, elapsed),
+        "loop_blocking": loop_report,
+    }
+
+
+# --- 서버 실행 (--spawn) ---
+
+def _wait_ready(base_url: str, path: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}{path}", timeout=2.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{base_url}{path} 가 {timeout}초 안에 준비되지 않았습니다.")
+
+
+def spawn_servers(args, workdir: str) -> List[subprocess.Popen]:
+    """mock Azure OpenAI 서버와 API 서버(임시 SQLite DB)를 띄우고 준비될 때까지 기다립니다."""
+    from tools.check_import_time import DUMMY_ENV
+
+    mock_url = f"http://127.0.0.1:{args.mock_port}"
+    mock = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.loadtest.mock_aoai", "--port", str(args.mock_port),
+         "--first-token-ms", str(args.first_token_ms), "--tokens-per-second", str(args.tokens_per_second),
+         "--answer-tokens", str(args.answer_tokens)],
+        cwd=SERVER_DIR,
+    )
+
+    env = dict(os.environ)
+    env.update(DUMMY_ENV)
+    env.update({
+        "AOAI_ENDPOINT": mock_url + "/",
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(workdir, 'loadtest.db')}",
+        "LOG_LEVEL": "WARNING",
+        "LOOP_MONITOR": "true",
+        "INTENT_LOG_PATH": "",  # 모의 LLM의 분류 결과는 학습 데이터로 기록하지 않음
+    })
+    for item in args.server_env:
+        key, _, value = item.partition("=")
+        env[key] = value
+
+    port = httpx.URL(args.base_url).port or 8000
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=SERVER_DIR,
+        env=env,
+    )
+    processes = [mock, server]
+    try:
+        _wait_ready(mock_url, "/docs", 30)
+        _wait_ready(args.base_url, "/health/ready", args.ready_timeout)
+    except Exception:
+        stop_servers(processes)
+        raise
+    return processes
+
+
+def stop_servers(processes: List[subprocess.Popen]):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def print_report(result: Dict[str, Any]):
+    streams = result["streams"]
+    print(f"\n[스트림] {streams['attempted']}건 중 {streams['completed']}건 완료 "
+          f"(완료율 {streams['completion_rate']}, 상태 {streams['status_counts']}, "
+          f"{streams['streams_per_second']:.2f} streams/s)")
+    rows = []
+    for name in ("ttfb", "first_token", "total", "inter_token_gap"):
+        rows.append({"metric": name, **{k: (v * 1000 if isinstance(v, float) else v)
+                                        for k, v in streams[name].items()}})
+    rows.append({"metric": "loop_probe", **{k: (v * 1000 if isinstance(v, float) else v)
+                                            for k, v in result["loop_probe"].items()}})
+    for name, summary in result["requests"].items():
+        rows.append({"metric": f"http:{name}", **{k: (v * 1000 if isinstance(v, float) else v)
+                                                   for k, v in summary.items() if k != "status_counts"}})
+    print("(단위: ms)")
+    print(format_table(rows, ["metric", "count", "mean", "p50", "p95", "p99", "max"]))
+    print("\n[서버 메트릭 변화량]")
+    print(format_table([result["server_metrics"]]))
+
+    blocking = result.get("loop_blocking")
+    if blocking:
+        print(f"\n[이벤트 루프 블로킹] {blocking['blocks']}회, 누적 {blocking['blocked_seconds']}초")
+        print(format_table([{"location": location, **stats} for location, stats in blocking["locations"].items()]))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="FastAPI 서버 HTTP 부하 테스트")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8085")
+    parser.add_argument("--users", type=int, default=100, help="동시 가상 사용자 수")
+    parser.add_argument("--messages", type=int, default=2, help="사용자당 질문 수")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="모든 사용자가 시작하기까지 걸리는 시간(초)")
+    parser.add_argument("--think-time", type=float, default=0.0, help="질문 사이 대기 시간(초)")
+    parser.add_argument("--list-sessions", action=argparse.BooleanOptionalAction, default=True,
+                        help="사용자마다 마지막에 세션 목록 조회")
+    parser.add_argument("--upload-pdf", help="함께 업로드할 PDF 파일 (업로드 부하 측정)")
+    parser.add_argument("--uploads", type=int, default=1, help="--upload-pdf 업로드 횟수")
+    parser.add_argument("--probe-interval", type=float, default=0.1, help="/health/live 측정 간격(초)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--admin-token", help="서버의 ADMIN_TOKEN (/admin/loop 조회용)")
+    parser.add_argument("--max-blocked-seconds", type=float, default=None,
+                        help="이벤트 루프 블로킹 누적 시간이 이 값을 넘으면 종료 코드 1 (CI 회귀 검사)")
+
+    spawn = parser.add_argument_group("--spawn (mock Azure OpenAI + API 서버 직접 실행)")
+    spawn.add_argument("--spawn", action="store_true")
+    spawn.add_argument("--mock-port", type=int, default=9100)
+    spawn.add_argument("--first-token-ms", type=float, default=300.0)
+    spawn.add_argument("--tokens-per-second", type=float, default=50.0)
+    spawn.add_argument("--answer-tokens", type=int, default=80)
+    spawn.add_argument("--ready-timeout", type=float, default=120.0)
+    spawn.add_argument("--server-env", action="append", default=[], metavar="KEY=VALUE",
+                       help="API 서버 환경 변수 (예: CHAT_MAX_CONCURRENCY=64)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    args.base_url = args.base_url.rstrip("/")
+
+    with tempfile.TemporaryDirectory(prefix="load-test-") as workdir:
+        processes = spawn_servers(args, workdir) if args.spawn else []
+        try:
+            result = asyncio.run(run(args))
+        finally:
+            stop_servers(processes)
+
+    print_report(result)
+    if args.output:
+        write_json(args.output, result)
+        print(f"\n결과 저장: {args.output}")
+
+    blocking = result.get("loop_blocking")
+    if args.max_blocked_seconds is not None and blocking and blocking["blocked_seconds"] > args.max_blocked_seconds:
+        print(f"실패: 이벤트 루프 블로킹 누적 {blocking['blocked_seconds']}초 > 허용 {args.max_blocked_seconds}초")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
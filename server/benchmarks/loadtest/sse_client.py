@@ -0,0 +1,99 @@
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+
+@dataclass
+class StreamResult:
+    """SSE 스트림 한 건의 측정 결과"""
+    status: Optional[int] = None
+    ttfb: Optional[float] = None  # 요청 시작 ~ 첫 바이트(하트비트/단계 이벤트 포함)
+    first_token: Optional[float] = None  # 요청 시작 ~ 첫 'update' 프레임
+    total: Optional[float] = None
+    token_gaps: List[float] = field(default_factory=list)  # 'update' 프레임 사이 간격
+    updates: int = 0
+    stages: List[str] = field(default_factory=list)
+    completed: bool = False  # 'end' 이벤트 수신 여부
+    error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "ttfb": self.ttfb,
+            "first_token": self.first_token,
+            "total": self.total,
+            "updates": self.updates,
+            "completed": self.completed,
+            "error": self.error,
+        }
+
+
+class SSEDecoder:
+    """
+    바이트 청크를 받아 완성된 SSE 이벤트('data:' 라인 묶음)를 순서대로 반환하는 증분 디코더입니다.
+    청크 경계가 이벤트/UTF-8 문자 중간에 걸려도 다음 청크와 이어서 처리합니다.
+    주석 라인(':' 시작, 하트비트)은 건너뜁니다.
+    """
+
+    def __init__(self):
+        self._buffer = b""
+
+    def feed(self, chunk: bytes) -> List[str]:
+        self._buffer += chunk
+        events = []
+        while True:
+            end = self._buffer.find(b"\n\n")
+            if end < 0:
+                break
+            raw, self._buffer = self._buffer[:end], self._buffer[end + 2:]
+            data_lines = [
+                line[5:].lstrip() for line in raw.decode("utf-8").split("\n") if line.startswith("data:")
+            ]
+            if data_lines:
+                events.append("\n".join(data_lines))
+        return events
+
+
+async def stream_chat(client: httpx.AsyncClient, url: str, session_id: int, prompt: str) -> StreamResult:
+    """/api/v1/chat/stream 에 질문을 보내고 스트림이 끝날 때까지 읽으며 시간을 측정합니다."""
+    result = StreamResult()
+    decoder = SSEDecoder()
+    started = time.perf_counter()
+    last_update = None
+
+    try:
+        async with client.stream("POST", url, json={"session_id": session_id, "topic": prompt}) as response:
+            result.status = response.status_code
+            if response.status_code != 200:
+                await response.aread()
+                result.error = f"HTTP {response.status_code}"
+                return result
+
+            async for chunk in response.aiter_bytes():
+                now = time.perf_counter()
+                if result.ttfb is None:
+                    result.ttfb = now - started
+                for data in decoder.feed(chunk):
+                    event = json.loads(data)
+                    event_type = event.get("type")
+                    if event_type == "update":
+                        result.updates += 1
+                        if result.first_token is None:
+                            result.first_token = now - started
+                        else:
+                            result.token_gaps.append(now - last_update)
+                        last_update = now
+                    elif event_type == "stage":
+                        result.stages.append(event["data"].get("stage"))
+                    elif event_type == "end":
+                        result.completed = True
+                    elif event_type == "error":
+                        result.error = str(event.get("data"))
+    except (httpx.HTTPError, ValueError) as e:
+        result.error = f"{type(e).__name__}: {e}"
+    finally:
+        result.total = time.perf_counter() - started
+    return result
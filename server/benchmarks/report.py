@@ -0,0 +1,111 @@
+import os
+import json
+import math
+import platform
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+# 벤치마크 결과 집계/출력 공용 함수
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """선형 보간 방식의 백분위수 (q: 0~100). 값이 없으면 None"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * q / 100
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values: Sequence[float]) -> Dict[str, Optional[float]]:
+    """count / mean / p50 / p95 / p99 / max 요약"""
+    return {
+        "count": len(values),
+        "mean": (sum(values) / len(values)) if values else None,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+
+def _format_cell(value: Any) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.4f}" if abs(value) < 100 else f"{value:.1f}"
+    return str(value)
+
+
+def format_table(rows: List[Dict[str, Any]], columns: Optional[Iterable[str]] = None) -> str:
+    """dict 목록을 고정폭 텍스트 표로 변환합니다."""
+    if not rows:
+        return "(결과 없음)"
+    columns = list(columns or rows[0].keys())
+    cells = [[_format_cell(row.get(column)) for column in columns] for row in rows]
+    widths = [max(len(column), *(len(cell[i]) for cell in cells)) for i, column in enumerate(columns)]
+    lines = ["  ".join(column.ljust(width) for column, width in zip(columns, widths))]
+    lines.append("  ".join("-" * width for width in widths))
+    lines.extend("  ".join(cell.ljust(width) for cell, width in zip(row, widths)) for row in cells)
+    return "\n".join(lines)
+
+
+def environment_info() -> Dict[str, Any]:
+    """결과 비교 시 함께 기록할 실행 환경 정보"""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_json(path: str, payload: Dict[str, Any]):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+
+
+def flatten(payload: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """중첩 dict의 숫자 값만 'a.b.c' 키로 펼칩니다. (config/environment 제외)"""
+    flat = {}
+    for key, value in payload.items():
+        if not prefix and key in ("config", "environment", "benchmark"):
+            continue
+        name = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, list):
+            for index, item in enumerate(value):
+                if isinstance(item, dict):
+                    # 목록 항목은 구분 가능한 값(concurrency 등)이 있으면 그 값으로 이름을 붙입니다.
+                    label = item.get("concurrency", index)
+                    flat.update(flatten(item, f"{name}[{label}]"))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def compare_results(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float = 0.0) -> List[Dict[str, Any]]:
+    """
+    두 결과의 공통 숫자 지표를 비교합니다.
+    :param threshold: 변화율(절댓값)이 이 값 미만인 지표는 제외 (예: 0.05 = 5%)
+    """
+    base, cand = flatten(baseline), flatten(candidate)
+    rows = []
+    for name in sorted(base.keys() & cand.keys()):
+        before, after = base[name], cand[name]
+        change = ((after - before) / abs(before)) if before else None
+        if change is not None and abs(change) < threshold:
+            continue
+        rows.append({
+            "metric": name,
+            "baseline": before,
+            "candidate": after,
+            "change": f"{change * 100:+.1f}%" if change is not None else "-",
+        })
+    return rows
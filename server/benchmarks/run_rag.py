@@ -0,0 +1,342 @@
+"""
+RAG 파이프라인 오프라인 벤치마크
+
+합성(또는 고정 fixture) 모집요강 코퍼스로 인덱스를 만들고, 로컬 대체 LLM/임베딩으로
+컴파일된 LangGraph를 실제 채팅 스트림과 같은 방식(GraphEventStream)으로 끝까지 실행하여
+- 인덱스 구축(청크 분할 / 임베딩 + FAISS) 시간과 청크 수
+- 노드별 / 첫 토큰(TTFT) / 전체 지연 시간의 p50 / p95 / p99
+- 동시 실행 수별 처리량(요청/초)
+- 프로세스 메모리(RSS)와 tracemalloc 최대 사용량(--trace-memory)
+- 정답 질문 세트 기준 검색 재현율(recall@k), Rerank 후 재현율, MRR, 의도 분류 정확도
+를 측정합니다. 같은 seed와 옵션이면 같은 코퍼스/질문으로 실행되므로 변경 전후를 비교할 수 있습니다.
+
+사용법 (server 디렉터리에서):
+    python -m benchmarks.run_rag --universities 50 --concurrency 1,8,32
+    python -m benchmarks.run_rag --fixture-dir data/md --real-reranker --output benchmarks/results/rag.json
+"""
+import os
+import sys
+import time
+import uuid
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from benchmarks.corpus import LabeledQuestion, generate_corpus, load_fixture_corpus
+from benchmarks.report import environment_info, format_table, summarize, write_json
+from benchmarks.stubs import StubChatModel, StubEmbeddings, StubReranker, ensure_dummy_settings_env, install_stubs
+
+
+def rss_mb() -> Optional[float]:
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def _stage_timer():
+    """노드별 실행 시간을 기록하는 LangChain 콜백 (요청마다 새 인스턴스 사용)"""
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class StageTimer(BaseCallbackHandler):
+        run_inline = True
+
+        def __init__(self):
+            self.durations: Dict[str, float] = {}
+            self._started: Dict[Any, tuple] = {}
+
+        def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+            name = kwargs.get("name")
+            # 노드 자체의 실행만 기록 (노드 안의 프롬프트/체인 실행은 제외)
+            if name and (metadata or {}).get("langgraph_node") == name:
+                self._started[run_id] = (name, time.perf_counter())
+
+        def on_chain_end(self, outputs, *, run_id, **kwargs):
+            started = self._started.pop(run_id, None)
+            if started is not None:
+                name, at = started
+                self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - at
+
+        def on_chain_error(self, error, *, run_id, **kwargs):
+            self._started.pop(run_id, None)
+
+    return StageTimer()
+
+
+# --- 1. 인덱스 구축 ---
+
+def build_index(md_folder: str, store_dir: str, embeddings) -> Dict[str, Any]:
+    """MD 폴더를 청크로 분할하고 FAISS 인덱스를 구축하며 각 단계 시간을 측정합니다."""
+    from processing import build_persistent_vector_store, load_md_documents
+
+    started = time.perf_counter()
+    documents = load_md_documents(md_folder)
+    chunk_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    vector_store = build_persistent_vector_store(documents, os.path.join(store_dir, "faiss_index"), embeddings)
+    index_seconds = time.perf_counter() - started
+
+    lengths = [len(doc.page_content) for doc in documents]
+    return {
+        "vector_store": vector_store,
+        "stats": {
+            "files": len([name for name in os.listdir(md_folder) if name.endswith(".md")]),
+            "chunks": len(documents),
+            "avg_chunk_chars": (sum(lengths) / len(lengths)) if lengths else 0,
+            "chunk_seconds": chunk_seconds,
+            "index_seconds": index_seconds,
+        },
+    }
+
+
+# --- 2. 검색 품질 ---
+
+def _contains_answer(documents, question: LabeledQuestion) -> bool:
+    return any(
+        doc.metadata.get("source") == question.source and question.fact in doc.page_content
+        for doc in documents
+    )
+
+
+def evaluate_recall(vector_store, questions: List[LabeledQuestion], k: int) -> Dict[str, Any]:
+    """
+    정답 출처와 정답 문자열을 함께 포함한 청크가 검색/Rerank 결과에 있는지로 재현율을 계산합니다.
+    쿼리 재작성 단계는 거치지 않고 원본 질문으로 검색합니다.
+    """
+    from retrieval.vector_store import search_vector_store
+    from workflow.nodes import rerank_candidates
+
+    labeled = [q for q in questions if q.source and q.fact]
+    retrieval_hits = rerank_hits = rerank_pairs = 0
+    reciprocal_ranks = []
+    for question in labeled:
+        documents = search_vector_store(query=question.question, vector_store=vector_store, k=k)
+        rank = next(
+            (i + 1 for i, doc in enumerate(documents) if _contains_answer([doc], question)), None
+        )
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+        retrieval_hits += rank is not None
+
+        reranked = rerank_candidates(question.question, documents, None)
+        rerank_hits += _contains_answer(reranked.documents, question)
+        rerank_pairs += reranked.pairs
+
+    total = len(labeled) or 1
+    return {
+        "questions": len(labeled),
+        "k": k,
+        "recall_at_k": retrieval_hits / total,
+        "recall_after_rerank": rerank_hits / total,
+        "mrr": sum(reciprocal_ranks) / total,
+        # 단계적 Rerank에서 질문당 Cross-Encoder로 평가한 쌍 수
+        "avg_rerank_pairs": rerank_pairs / total,
+    }
+
+
+# --- 3. 그래프 실행 (지연 시간 / 처리량) ---
+
+async def run_question(graph, question: LabeledQuestion) -> Dict[str, Any]:
+    """질문 하나를 채팅 스트림과 같은 방식으로 실행하고 단계별 시간을 반환합니다."""
+    from langchain_core.messages import HumanMessage
+    from workflow.events import GraphEventStream
+
+    timer = _stage_timer()
+    state = {"messages": [HumanMessage(content=question.question)], "original_query": question.question}
+    config = {"configurable": {"thread_id": f"bench-{uuid.uuid4().hex}"}, "callbacks": [timer]}
+
+    started = time.perf_counter()
+    first_token_at = None
+    intent = None
+    error = None
+    stream = GraphEventStream(graph, state, config)
+    try:
+        async for event_type, data in stream:
+            if event_type == "token" and first_token_at is None:
+                first_token_at = time.perf_counter()
+            elif event_type == "stage" and data.get("stage") == "classified":
+                intent = data.get("intent")
+    except Exception as e:
+        error = str(e)
+    finished = time.perf_counter()
+
+    stages = dict(timer.durations)
+    stages["total"] = finished - started
+    if first_token_at is not None:
+        stages["ttft"] = first_token_at - started
+    return {
+        "stages": stages,
+        "intent": intent,
+        "expected_intent": question.intent,
+        "tokens": stream.token_count,
+        "error": error,
+    }
+
+
+async def run_load(graph, questions: List[LabeledQuestion], concurrency: int, requests: int) -> Dict[str, Any]:
+    """requests개의 질문을 동시 실행 수(concurrency)로 제한하여 실행합니다."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def worker(index: int):
+        async with semaphore:
+            return await run_question(graph, questions[index % len(questions)])
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(worker(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    stage_values = defaultdict(list)
+    for result in results:
+        for stage, seconds in result["stages"].items():
+            stage_values[stage].append(seconds)
+
+    classified = [r for r in results if r["intent"] is not None]
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "elapsed_seconds": elapsed,
+        "throughput_rps": requests / elapsed if elapsed > 0 else None,
+        "errors": sum(1 for r in results if r["error"]),
+        "intent_accuracy": (
+            sum(r["intent"] == r["expected_intent"] for r in classified) / len(classified) if classified else None
+        ),
+        "tokens_total": sum(r["tokens"] for r in results),
+        "stages": {stage: summarize(values) for stage, values in stage_values.items()},
+        "rss_mb": rss_mb(),
+    }
+
+
+def _stage_rows(run: Dict[str, Any]) -> List[Dict[str, Any]]:
+    rows = []
+    for stage, summary in run["stages"].items():
+        row = {"stage": stage, "count": summary["count"]}
+        for key in ("mean", "p50", "p95", "p99", "max"):
+            row[f"{key}_ms"] = summary[key] * 1000 if summary[key] is not None else None
+        rows.append(row)
+    return rows
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="RAG 파이프라인 오프라인 벤치마크")
+    corpus = parser.add_argument_group("코퍼스")
+    corpus.add_argument("--universities", type=int, default=20, help="합성 코퍼스의 문서(대학) 수")
+    corpus.add_argument("--filler", type=int, default=2, help="섹션별 방해 문단 수 (문서 길이)")
+    corpus.add_argument("--general-questions", type=int, default=5, help="섞어 넣을 잡담 질문 수")
+    corpus.add_argument("--fixture-dir", help="합성 코퍼스 대신 사용할 MD 폴더 (questions.jsonl 필요)")
+    corpus.add_argument("--seed", type=int, default=42)
+
+    stubs = parser.add_argument_group("대체 구현 지연 시간")
+    stubs.add_argument("--first-token-ms", type=float, default=300.0, help="LLM 첫 토큰 지연")
+    stubs.add_argument("--token-ms", type=float, default=20.0, help="LLM 토큰 간 간격")
+    stubs.add_argument("--answer-tokens", type=int, default=60, help="답변 토큰 수")
+    stubs.add_argument("--embed-latency-ms", type=float, default=0.0, help="임베딩 요청당 지연")
+    stubs.add_argument("--rerank-pair-ms", type=float, default=0.0, help="Reranker 쌍(pair)당 지연")
+    stubs.add_argument("--real-reranker", action="store_true", help="로컬 Cross-Encoder 모델을 그대로 사용")
+
+    run = parser.add_argument_group("실행")
+    run.add_argument("--concurrency", default="1,4,16", help="쉼표로 구분한 동시 실행 수 목록")
+    run.add_argument("--requests", type=int, default=None, help="동시 실행 수별 요청 수 (기본: 질문 수)")
+    run.add_argument("--warmup", type=int, default=2, help="측정 전 워밍업 요청 수")
+    run.add_argument("--k", type=int, default=10, help="재현율 계산 시 검색 문서 수")
+    run.add_argument("--intent-classifier", choices=["hybrid", "local", "llm"], default="hybrid",
+                     help="의도 분류 방식 (INTENT_CLASSIFIER, 노드별 지연 시간에서 classify_intent 비교)")
+    run.add_argument("--trace-memory", action="store_true", help="tracemalloc으로 최대 메모리 사용량 측정 (느려짐)")
+    run.add_argument("--output", help="결과 JSON 저장 경로")
+    run.add_argument("--log-level", default="WARNING")
+    return parser.parse_args(argv)
+
+
+async def main_async(args) -> Dict[str, Any]:
+    from utils.logging_config import configure_logging
+    from workflow.graph import build_graph
+
+    configure_logging(args.log_level)
+
+    embeddings = StubEmbeddings(latency_ms=args.embed_latency_ms)
+    llm = StubChatModel(first_token_ms=args.first_token_ms, token_ms=args.token_ms, answer_tokens=args.answer_tokens)
+    reranker = None if args.real_reranker else StubReranker(per_pair_ms=args.rerank_pair_ms)
+    install_stubs(llm=llm, embeddings=embeddings, reranker=reranker)
+
+    if args.trace_memory:
+        tracemalloc.start()
+
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as workdir:
+        if args.fixture_dir:
+            md_folder = args.fixture_dir
+            questions = load_fixture_corpus(args.fixture_dir)
+        else:
+            md_folder = os.path.join(workdir, "md")
+            questions = generate_corpus(
+                md_folder, args.universities, args.filler, args.general_questions, args.seed
+            )
+
+        rss_before = rss_mb()
+        built = build_index(md_folder, os.path.join(workdir, "vector_store"), embeddings)
+        index_stats = built["stats"]
+        index_stats["rss_delta_mb"] = (rss_mb() - rss_before) if rss_before is not None else None
+        if args.trace_memory:
+            index_stats["tracemalloc_peak_mb"] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            tracemalloc.reset_peak()
+
+        vector_store = built["vector_store"]
+        recall = evaluate_recall(vector_store, questions, args.k)
+
+        graph = build_graph(vector_store)
+        for i in range(args.warmup):
+            await run_question(graph, questions[i % len(questions)])
+
+        runs = []
+        requests = args.requests or len(questions)
+        for concurrency in (int(value) for value in args.concurrency.split(",")):
+            result = await run_load(graph, questions, concurrency, requests)
+            if args.trace_memory:
+                result["tracemalloc_peak_mb"] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+                tracemalloc.reset_peak()
+            runs.append(result)
+
+    if args.trace_memory:
+        tracemalloc.stop()
+
+    return {
+        "benchmark": "rag",
+        "config": vars(args),
+        "environment": environment_info(),
+        "index": index_stats,
+        "recall": recall,
+        "runs": runs,
+    }
+
+
+def print_report(result: Dict[str, Any]):
+    print("\n[인덱스]")
+    print(format_table([result["index"]]))
+    print("\n[검색 품질]")
+    print(format_table([result["recall"]]))
+    for run in result["runs"]:
+        print(f"\n[동시 실행 {run['concurrency']}] 요청 {run['requests']}개, "
+              f"처리량 {run['throughput_rps']:.2f} req/s, 오류 {run['errors']}개, "
+              f"의도 분류 정확도 {run['intent_accuracy']}, RSS {run['rss_mb']} MB")
+        print(format_table(_stage_rows(run)))
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    # Settings의 필수 환경 변수가 없어도 실행되도록 더미 값을 채운 뒤 서버 모듈을 import 합니다.
+    ensure_dummy_settings_env()
+    os.environ["INTENT_CLASSIFIER"] = args.intent_classifier
+    # 대체 LLM의 분류 결과가 학습 데이터(LLM 분류 로그)에 섞이지 않도록 기록하지 않음
+    os.environ["INTENT_LOG_PATH"] = ""
+    result = asyncio.run(main_async(args))
+    print_report(result)
+    if args.output:
+        write_json(args.output, result)
+        print(f"\n결과 저장: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
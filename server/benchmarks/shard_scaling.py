@@ -0,0 +1,173 @@
+"""
+샤드 인덱스 병렬 검색 확장성 벤치마크
+
+같은 벡터 집합을 샤드 수(= 검색 스레드 수)를 바꿔 가며 나눠 담고, ShardedVectorStore로
+- 단건 검색 지연 시간 p50 / p95 (질문 하나를 순서대로 검색, 실제 요청과 같은 방식)
+- 동시 검색 처리량(질문/초, --concurrency개 요청을 동시에 실행)
+- 단일 인덱스 결과와의 겹침 비율(overlap@k, flat 인덱스는 항상 1.0이어야 함)
+을 측정합니다. 코어 수보다 샤드 수가 많으면 지연 시간이 더 줄지 않으므로 environment.cpu_count와 함께 보세요.
+벡터는 임베딩 없이 난수로 만들며, 검색 비용은 벡터 수 x 차원에 비례합니다.
+
+사용법 (server 디렉터리에서):
+    python -m benchmarks.shard_scaling --vectors 200000 --dimensions 3072 --shards 1,2,4,8
+    python -m benchmarks.shard_scaling --shards 1,4 --threads 1,4 --output benchmarks/results/shards.json
+"""
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from benchmarks.report import environment_info, format_table, summarize, write_json
+from benchmarks.stubs import StubEmbeddings, ensure_dummy_settings_env
+
+
+def random_vectors(count: int, dimensions: int, seed: int):
+    """L2 정규화된 float32 난수 벡터"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((count, dimensions), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def build_shards(vectors, shard_count: int, executor: Optional[ThreadPoolExecutor]):
+    """벡터를 shard_count개 인덱스에 나눠 담은 ShardedVectorStore (문서 내용은 전체 벡터 번호)"""
+    import faiss
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.documents import Document
+    from retrieval.index_registry import shard_name
+    from retrieval.vector_store import ShardedVectorStore
+
+    # 벡터로 직접 검색하므로 임베딩은 호출되지 않음
+    embeddings = StubEmbeddings(dimensions=vectors.shape[1])
+    shards = {}
+    bounds = [len(vectors) * number // shard_count for number in range(shard_count + 1)]
+    for number in range(shard_count):
+        start, end = bounds[number], bounds[number + 1]
+        index = faiss.IndexFlatL2(vectors.shape[1])
+        index.add(vectors[start:end])
+        docstore = InMemoryDocstore({str(i): Document(page_content=str(i)) for i in range(start, end)})
+        shards[shard_name(number)] = FAISS(
+            embedding_function=embeddings, index=index, docstore=docstore,
+            index_to_docstore_id={position: str(start + position) for position in range(end - start)},
+        )
+    return ShardedVectorStore(shards, executor=executor)
+
+
+def search_ids(store, query, k: int) -> List[int]:
+    return [int(doc.page_content) for doc, _ in store.similarity_search_with_score_by_vector(query, k=k)]
+
+
+def measure(store, queries, k: int, concurrency: int) -> Dict[str, Any]:
+    latencies, results = [], []
+    for query in queries:
+        started = time.perf_counter()
+        results.append(search_ids(store, query, k))
+        latencies.append(time.perf_counter() - started)
+
+    # 여러 요청이 동시에 들어올 때의 처리량 (요청마다 모든 샤드를 검색하므로 코어를 나눠 씀)
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        started = time.perf_counter()
+        list(clients.map(lambda query: search_ids(store, query, k), queries))
+        elapsed = time.perf_counter() - started
+    return {"latency": summarize(latencies), "throughput_qps": len(queries) / elapsed, "results": results}
+
+
+def run(args) -> Dict[str, Any]:
+    vectors = random_vectors(args.vectors, args.dimensions, args.seed)
+    queries = [query.tolist() for query in random_vectors(args.queries, args.dimensions, args.seed + 1)]
+    shard_counts = [int(value) for value in args.shards.split(",")]
+    thread_counts = [int(value) for value in args.threads.split(",")] if args.threads else shard_counts
+    if len(thread_counts) != len(shard_counts):
+        raise ValueError("--threads는 --shards와 같은 개수여야 합니다.")
+
+    rows, baseline = [], None
+    for shard_count, threads in zip(shard_counts, thread_counts):
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="faiss-shard") as executor:
+            started = time.perf_counter()
+            store = build_shards(vectors, shard_count, executor)
+            build_seconds = time.perf_counter() - started
+            # 첫 검색의 페이지 폴트/스레드 생성 비용 제외
+            for query in queries[:args.warmup]:
+                search_ids(store, query, args.k)
+            result = measure(store, queries, args.k, args.concurrency)
+
+        if baseline is None:
+            baseline = result
+        overlap = sum(
+            len(set(ids) & set(expected)) / max(len(expected), 1)
+            for ids, expected in zip(result["results"], baseline["results"])
+        ) / len(queries)
+        rows.append({
+            "shards": shard_count,
+            "threads": threads,
+            "build_seconds": build_seconds,
+            "latency": result["latency"],
+            "speedup_p50": baseline["latency"]["p50"] / result["latency"]["p50"],
+            "throughput_qps": result["throughput_qps"],
+            "overlap_at_k": overlap,
+        })
+        print(f"  샤드 {shard_count}개 / 스레드 {threads}개: p50 {result['latency']['p50'] * 1000:.2f} ms")
+    return {"vectors": args.vectors, "dimensions": args.dimensions, "queries": args.queries, "runs": rows}
+
+
+def summary_rows(result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "shards": row["shards"],
+            "threads": row["threads"],
+            "p50_ms": row["latency"]["p50"] * 1000,
+            "p95_ms": row["latency"]["p95"] * 1000,
+            "speedup_p50": row["speedup_p50"],
+            "qps": row["throughput_qps"],
+            "overlap@k": row["overlap_at_k"],
+        }
+        for row in result["runs"]
+    ]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="샤드 인덱스 병렬 검색 확장성 벤치마크")
+    parser.add_argument("--vectors", type=int, default=200000, help="전체 벡터 수")
+    parser.add_argument("--dimensions", type=int, default=1024, help="벡터 차원")
+    parser.add_argument("--shards", default="1,2,4,8", help="쉼표로 구분한 샤드 수 목록 (첫 값이 비교 기준)")
+    parser.add_argument("--threads", help="샤드 수별 검색 스레드 수 (기본: 샤드 수와 같음)")
+    parser.add_argument("--queries", type=int, default=200, help="측정할 질문 수")
+    parser.add_argument("--warmup", type=int, default=10, help="측정 전 워밍업 검색 수")
+    parser.add_argument("--concurrency", type=int, default=8, help="처리량 측정 시 동시 요청 수")
+    parser.add_argument("--k", type=int, default=40, help="검색 문서 수 (RETRIEVE_MAX_K)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--log-level", default="WARNING")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    ensure_dummy_settings_env()
+
+    from utils.logging_config import configure_logging
+
+    configure_logging(args.log_level)
+
+    print(f"벡터 {args.vectors}개 x {args.dimensions}차원, 질문 {args.queries}개, CPU {os.cpu_count()}개")
+    result = run(args)
+    print(format_table(summary_rows(result)))
+
+    if args.output:
+        write_json(args.output, {
+            "benchmark": "shard_scaling",
+            "config": vars(args),
+            "environment": environment_info(),
+            **result,
+        })
+        print(f"\n결과 저장: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+import os
+import re
+import math
+import time
+import json
+import asyncio
+import hashlib
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# --- 결정적(deterministic) 로컬 대체 구현 ---
+# Azure OpenAI / Cross-Encoder 없이 그래프를 끝까지 실행하기 위한 대체 구현입니다.
+# 네트워크 지연은 설정한 값(ms)만큼 sleep으로 흉내 내며, 같은 입력에는 항상 같은 출력을 반환합니다.
+
+_TOKEN_RE = re.compile(r"[가-힣A-Za-z0-9,.]+")
+GREETING_WORDS = ("안녕", "고마", "감사", "날씨", "누구", "하루")
+
+
+def ensure_dummy_settings_env():
+    """Settings의 필수 환경 변수를 더미 값으로 채웁니다. (.env 없이 벤치마크 실행)"""
+    from tools.check_import_time import DUMMY_ENV
+
+    for key, value in DUMMY_ENV.items():
+        os.environ.setdefault(key, value)
+
+
+def char_ngrams(text: str, n: int = 2) -> List[str]:
+    """공백으로 나눈 단어별 문자 n-gram (형태소 분석 없이 한국어 어휘 중첩을 근사)"""
+    grams = []
+    for word in _TOKEN_RE.findall(text):
+        if len(word) <= n:
+            grams.append(word)
+        else:
+            grams.extend(word[i:i + n] for i in range(len(word) - n + 1))
+    return grams
+
+
+def split_tokens(text: str) -> List[str]:
+    """응답 문자열을 스트리밍할 단어 단위 토큰(앞 공백 포함)으로 나눕니다."""
+    words = text.split(" ")
+    return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+
+def _stable_hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class StubEmbeddings(Embeddings):
+    """
+    문자 2-gram을 해시하여 고정 차원 벡터로 만드는 임베딩입니다. (L2 정규화)
+    어휘가 겹치는 문서일수록 코사인 유사도가 높으므로 검색 재현율(recall) 비교에 쓸 수 있습니다.
+    """
+
+    def __init__(self, dimensions: int = 256, latency_ms: float = 0.0, per_text_ms: float = 0.0):
+        self.dimensions = dimensions
+        self.latency_ms = latency_ms  # 요청 1회당 고정 지연 (네트워크 왕복)
+        self.per_text_ms = per_text_ms  # 텍스트 1개당 추가 지연
+        self.calls = 0
+        self.texts = 0
+
+    def vectorize(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        for gram in char_ngrams(text):
+            h = _stable_hash(gram)
+            vector[h % self.dimensions] += 1.0 if (h >> 32) & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def _delay(self, count: int) -> float:
+        self.calls += 1
+        self.texts += count
+        return (self.latency_ms + self.per_text_ms * count) / 1000
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self._delay(len(texts)))
+        return [self.vectorize(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self._delay(1))
+        return self.vectorize(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(self._delay(len(texts)))
+        return [self.vectorize(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await asyncio.sleep(self._delay(1))
+        return self.vectorize(text)
+
+
+class StubReranker:
+    """
+    CrossEncoder.predict와 같은 인터페이스의 Reranker입니다.
+    질문 2-gram이 문서에 포함된 비율을 시그모이드로 보정하여 0~1 점수로 반환합니다.
+    (ms-marco Cross-Encoder처럼 관련 문서는 0.7 임계값을 넘도록 보정)
+    """
+
+    def __init__(self, per_pair_ms: float = 0.0):
+        self.per_pair_ms = per_pair_ms
+
+    def predict(self, pairs, **kwargs) -> List[float]:
+        time.sleep(self.per_pair_ms * len(pairs) / 1000)
+        scores = []
+        for query, text in pairs:
+            query_grams = set(char_ngrams(query))
+            if not query_grams:
+                scores.append(0.0)
+                continue
+            overlap = len(query_grams & set(char_ngrams(text))) / len(query_grams)
+            scores.append(1 / (1 + math.exp(-12 * (overlap - 0.45))))
+        return scores
+
+
+class StubChatModel(BaseChatModel):
+    """
+    프롬프트 종류에 따라 정해진 응답을 토큰 단위로 스트리밍하는 Chat 모델입니다.
+
+    - 의도 분류(JSON 모드): 인사/잡담 단어가 있으면 general_chat, 아니면 admission_question
+    - 쿼리 재작성: 마지막 사용자 질문을 그대로 반환
+    - 답변 생성: 참고 문서의 첫 문장을 인용하고 answer_tokens 개수만큼 토큰을 생성
+
+    first_token_ms / token_ms로 첫 토큰 지연과 토큰 간 간격을 흉내 냅니다.
+    """
+
+    first_token_ms: float = 300.0
+    token_ms: float = 20.0
+    answer_tokens: int = 60
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-chat"
+
+    def with_structured_output(self, schema, *, method: str = "json_mode", include_raw: bool = False, **kwargs):
+        """JSON 모드 응답을 Pydantic 모델로 파싱하는 체인을 반환합니다."""
+        return self | PydanticOutputParser(pydantic_object=schema)
+
+    # --- 응답 생성 ---
+
+    @staticmethod
+    def _last_human(messages: List[BaseMessage]) -> str:
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                return str(message.content)
+        return ""
+
+    def _response_text(self, messages: List[BaseMessage]) -> str:
+        system = "\n".join(str(m.content) for m in messages if isinstance(m, SystemMessage))
+        question = self._last_human(messages)
+
+        if "의도 분류기" in system:
+            intent = "general_chat" if any(word in question for word in GREETING_WORDS) else "admission_question"
+            return json.dumps({"intent": intent})
+        if "쿼리 재작성" in system:
+            return question.replace("마지막 질문:", "", 1).strip()
+
+        quote = ""
+        if "참고 문서 시작" in system:
+            body = system.split("--- 참고 문서 시작 ---", 1)[1]
+            lines = [line for line in body.splitlines() if line.strip() and not line.startswith(("[문서", "---"))]
+            quote = lines[0] if lines else ""
+        filler = " ".join(["모집요강을 참고하여 답변드립니다."] * self.answer_tokens)
+        words = (quote + " " + filler).split()
+        return " ".join(words[:self.answer_tokens])
+
+    def _usage(self, messages: List[BaseMessage], text: str) -> dict:
+        prompt_tokens = sum(len(str(m.content).split()) for m in messages)
+        completion_tokens = len(text.split())
+        return {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        text = self._response_text(messages)
+        time.sleep((self.first_token_ms + self.token_ms * len(split_tokens(text))) / 1000)
+        message = AIMessage(content=text, usage_metadata=self._usage(messages, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        text = self._response_text(messages)
+        time.sleep(self.first_token_ms / 1000)
+        for i, token in enumerate(split_tokens(text)):
+            if i:
+                time.sleep(self.token_ms / 1000)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, text)))
+
+    async def _astream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        text = self._response_text(messages)
+        await asyncio.sleep(self.first_token_ms / 1000)
+        for i, token in enumerate(split_tokens(text)):
+            if i:
+                await asyncio.sleep(self.token_ms / 1000)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, text)))
+
+
+def install_stubs(
+        llm: Optional[StubChatModel] = None,
+        embeddings: Optional[Embeddings] = None,
+        reranker: Optional[Any] = None,
+):
+    """
+    컴포넌트 레지스트리(utils.components)의 llm / embeddings / reranker를 대체 구현으로 교체합니다.
+    노드와 라우터는 get_llm() 등으로 레지스트리를 통해 가져오므로 코드 수정 없이 적용됩니다.
+    reranker에 None을 주면 실제 Cross-Encoder(local_models)를 그대로 사용합니다.
+    """
+    from utils import components
+    import utils.config  # noqa: F401  (레지스트리에 기본 팩토리 등록)
+
+    components.override("llm", llm or StubChatModel())
+    components.override("embeddings", embeddings or StubEmbeddings())
+    if reranker is not None:
+        components.override("reranker", reranker)
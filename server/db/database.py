@@ -1,14 +1,51 @@
-from sqlalchemy import create_engine
+import time
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from utils import metrics
 from utils.config import settings
 
+# 쿼리 실행 시간 메트릭 (statement: SELECT / INSERT / UPDATE / DELETE / PRAGMA 등)
+DB_QUERY_DURATION = metrics.histogram("db_query_duration_seconds", "SQL 쿼리 실행 시간", ["statement"])
+
 # SQLite 엔진 생성
 engine = create_engine(
     settings.SQLALCHEMY_DATABASE_URI,
     connect_args={"check_same_thread": False},  # SQLite 전용 설정
 )
+
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragma(dbapi_connection, connection_record):
+    """
+    여러 워커 프로세스가 같은 SQLite 파일을 쓰므로 WAL 모드로 읽기/쓰기 동시성을 높이고,
+    잠금 충돌 시 바로 실패하지 않고 잠시 대기하도록 설정합니다.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # 시작 시각은 실행 컨텍스트(구문 실행마다 새로 생성)에 둡니다.
+    # 연결에 쌓아 두면 쿼리가 예외로 끝날 때(after_cursor_execute 미호출) 꺼내지 못하고 계속 남습니다.
+    if context is not None:
+        context._query_started_at = time.perf_counter()
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started_at", None)
+    if started is None:
+        return
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+    DB_QUERY_DURATION.observe(time.perf_counter() - started, statement=verb)
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # SQLAlchemy 모델 기본 클래스
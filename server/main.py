@@ -1,5 +1,7 @@
 import uvicorn
 import os
+import logging
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -9,15 +11,24 @@ from db.database import Base, engine
 import db.models
 
 # 새 라우터 import (계획에 따라 이름 변경)
-from routers import chat, documents, chat_workflow
+from routers import admin, chat, documents, chat_workflow, health, metrics
 
 # Vector DB 초기화를 위한 import
-from processing import load_md_documents, build_persistent_vector_store, load_persistent_vector_store
 from processing import MD_FOLDER_PATH, PDF_FOLDER_PATH, VECTOR_STORE_PATH
+from retrieval.index_registry import IndexWatcher, ensure_vector_store
 
-from utils.config import get_embeddings, settings
+from utils import components
+from utils.config import get_embeddings, get_llm, get_reranker, settings
+from utils.logging_config import configure_logging
+from utils.loop_monitor import LoopMonitor
 
+from workflow import intent
 from workflow.graph import get_compiled_graph
+from workflow.checkpointer import close_checkpointer, open_checkpointer
+
+# 로깅 설정 (print 대신 레벨/구조화 필드가 있는 로그를 사용)
+configure_logging(settings.LOG_LEVEL, settings.LOG_JSON)
+logger = logging.getLogger(__name__)
 
 
 # FastAPI 인스턴스 생성 (프로젝트명 변경)
@@ -36,54 +47,138 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.on_event("startup")
-def startup_event():
+def apply_vector_store(vector_store, index_info):
+    """이 워커의 Vector Store를 교체하고, 이를 사용하도록 LangGraph를 다시 컴파일합니다."""
+    app.state.vector_store = vector_store
+    app.state.index_version = index_info["version"] if index_info else None
+    get_compiled_graph(vector_store)
+
+
+def warm_up_components():
     """
-    서버 시작 시 필요한 폴더를 생성하고 Vector Store를 초기화합니다.
+    워커마다 모델 레지스트리를 미리 로드하여 첫 요청이 로딩 비용을 치르지 않도록 합니다.
+    (Reranker 모델 로드 + 더미 추론, LLM/Embeddings 클라이언트 생성, 의도 분류 모델/로컬 임베딩 모델 로드)
     """
-    # 1. 필수 폴더 생성
-    os.makedirs(PDF_FOLDER_PATH, exist_ok=True)
-    os.makedirs(MD_FOLDER_PATH, exist_ok=True)
-    os.makedirs(os.path.dirname(VECTOR_STORE_PATH), exist_ok=True)
-    print("필수 폴더 생성을 확인했습니다.")
+    components.set_readiness("models", False, "warming up")
+    try:
+        get_reranker().predict([("워밍업", "워밍업")])
+        get_llm()
+        if settings.INTENT_CLASSIFIER != "llm":
+            intent.warm_up()
+        embeddings = get_embeddings()
+        if settings.EMBEDDING_BACKEND == "local":
+            # 로컬 임베딩 모델은 첫 호출 시 로드되므로 미리 한 번 실행
+            embeddings.embed_query("워밍업")
+        components.set_readiness("models", True)
+    except Exception as e:
+        logger.warning("모델 워밍업 중 오류 발생: %s", e)
+        # 첫 사용 시 다시 로드를 시도하므로 요청 처리는 가능
+        components.set_readiness("models", True, f"warm-up failed: {e}")
 
-    # 2. Vector Store 초기화
-    embeddings = get_embeddings()
+
+def initialize_vector_store_and_graph():
+    """
+    Vector Store를 로드(또는 구축)하고 LangGraph를 컴파일합니다.
+    임베딩 클라이언트, FAISS 등 무거운 모듈이 여기서 처음 import 되므로
+    서버 시작을 막지 않도록 백그라운드 스레드에서 실행됩니다.
+    """
+    components.set_readiness("vector_store", False, "loading")
+    components.set_readiness("graph", False, "waiting for vector store")
+
+    # 1. Vector Store 초기화
+    # 현재 버전(CURRENT.json)을 mmap으로 로드하고, 없으면 MD 폴더로부터 구축합니다.
+    # 여러 워커가 동시에 시작해도 파일 락으로 한 워커만 구축합니다.
+    index_info = None
     try:
-        if os.path.exists(VECTOR_STORE_PATH):
-            print("기존 Vector Store 로드 중...")
-            app.state.vector_store = load_persistent_vector_store(VECTOR_STORE_PATH, embeddings)
-            print("Vector Store 로드 완료.")
+        vector_store, index_info = ensure_vector_store(MD_FOLDER_PATH, get_embeddings(), settings.INDEX_USE_MMAP)
+        if vector_store is None:
+            logger.info("MD 파일이 없어 빈 Vector Store로 초기화합니다.")
         else:
-            print(f"'{MD_FOLDER_PATH}'에서 MD 파일 로드하여 Vector Store 구축 중...")
-            documents = load_md_documents(MD_FOLDER_PATH)
-            if documents:
-                app.state.vector_store = build_persistent_vector_store(documents, VECTOR_STORE_PATH, embeddings)
-                print("Vector Store 구축 및 저장 완료.")
-            else:
-                app.state.vector_store = None  # 문서가 없으면 None으로 초기화
-                print("MD 파일이 없어 빈 Vector Store로 초기화합니다.")
+            logger.info("Vector Store 로드 완료.", extra={"version": index_info["version"]})
+        components.set_readiness("vector_store", True, "loaded" if vector_store else "empty")
     except Exception as e:
-        print(f"Vector Store 초기화 중 오류 발생: {e}")
-        app.state.vector_store = None
+        logger.exception("Vector Store 초기화 중 오류 발생: %s", e)
+        vector_store = None
+        # 문서 업로드로 복구 가능하므로 준비 상태는 유지하되, 원인을 기록합니다.
+        components.set_readiness("vector_store", True, f"unavailable: {e}")
 
-    # --- 3. LangGraph 컴파일 ---
+    # 2. LangGraph 컴파일
     # Vector Store 로드가 완료된 후, 이를 인자로 전달하여 그래프를 컴파일합니다.
     # 컴파일된 그래프는 graph.graph.compiled_graph에 전역 변수로 저장됩니다.
-    get_compiled_graph(app.state.vector_store)
-    print("LangGraph가 Vector Store로 컴파일되었습니다.")
-    # --- End ---
+    try:
+        apply_vector_store(vector_store, index_info)
+        app.state.index_watcher.mark_loaded(index_info)
+        logger.info("LangGraph가 Vector Store로 컴파일되었습니다.")
+        components.set_readiness("graph", True)
+    except Exception as e:
+        logger.exception("LangGraph 컴파일 중 오류 발생: %s", e)
+        components.set_readiness("graph", False, str(e))
 
-# 4. 데이터베이스 테이블 생성
-print("데이터베이스 테이블 생성 중...")
-Base.metadata.create_all(bind=engine)
-print("데이터베이스 테이블 생성 완료.")
+    # 3. 모델 워밍업
+    if settings.WARMUP_MODELS:
+        warm_up_components()
+
+
+@app.on_event("startup")
+async def startup_event():
+    """
+    서버 시작 시 필요한 폴더와 DB 테이블을 생성하고,
+    Vector Store 로드 및 그래프 컴파일은 백그라운드로 시작합니다.
+    (준비 완료 여부는 /health/ready 로 확인)
+    """
+    app.state.vector_store = None
+    app.state.index_version = None
+    # 디버그/프로파일링 모드: 이벤트 루프 지연 측정 및 블로킹 호출 감지 (/admin/loop)
+    app.state.loop_monitor = None
+    if settings.LOOP_MONITOR:
+        app.state.loop_monitor = LoopMonitor(settings.LOOP_MONITOR_INTERVAL, settings.LOOP_BLOCK_THRESHOLD)
+        app.state.loop_monitor.start()
+    # 다른 워커가 새 인덱스를 게시하면 이 워커도 다시 로드하도록 감시
+    app.state.index_watcher = IndexWatcher(
+        embeddings_factory=get_embeddings,
+        on_reload=apply_vector_store,
+        interval=settings.INDEX_WATCH_INTERVAL,
+        use_mmap=settings.INDEX_USE_MMAP,
+    )
 
-# 5. 라우터 추가
+    # 1. 필수 폴더 생성
+    os.makedirs(PDF_FOLDER_PATH, exist_ok=True)
+    os.makedirs(MD_FOLDER_PATH, exist_ok=True)
+    os.makedirs(os.path.dirname(VECTOR_STORE_PATH), exist_ok=True)
+    logger.info("필수 폴더 생성을 확인했습니다.")
+
+    # 2. 데이터베이스 테이블 생성
+    logger.info("데이터베이스 테이블 생성 중...")
+    Base.metadata.create_all(bind=engine)
+    components.set_readiness("database", True)
+    logger.info("데이터베이스 테이블 생성 완료.")
+
+    # 3. LangGraph 체크포인터 (그래프 컴파일 전에 준비)
+    await open_checkpointer()
+
+    # 4. Vector Store + LangGraph 초기화 (백그라운드)
+    app.state.startup_task = asyncio.create_task(asyncio.to_thread(initialize_vector_store_and_graph))
+    app.state.index_watcher.start(after=app.state.startup_task)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """서버 종료 시 인덱스 감시를 멈추고 공유 Azure OpenAI HTTP 커넥션 풀을 닫습니다."""
+    await app.state.index_watcher.stop()
+    if app.state.loop_monitor is not None:
+        await app.state.loop_monitor.stop()
+    await close_checkpointer()
+    await settings.aclose_http_clients()
+    logger.info("Azure OpenAI HTTP 클라이언트 종료 완료.")
+
+# 라우터 추가
+app.include_router(health.router)
+app.include_router(metrics.router)
+app.include_router(admin.router)
 app.include_router(chat.router)
 app.include_router(documents.router)
 app.include_router(chat_workflow.router)
-print("API 라우터 포함 완료.")
+logger.info("API 라우터 포함 완료.")
 
 
 @app.get("/", tags=["Root"])
@@ -92,4 +187,9 @@ async def read_root():
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    if settings.WORKERS > 1:
+        # 멀티 워커 모드: 워커들은 디스크의 인덱스(CURRENT.json)와 SQLite(WAL)를 공유합니다.
+        # (reload 모드는 단일 워커에서만 사용할 수 있습니다)
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=settings.WORKERS)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
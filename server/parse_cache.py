@@ -0,0 +1,175 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# --- PDF → Markdown 변환 결과 캐시 ---
+# PDF 변환(pymupdf4llm)은 인덱스 구축에서 가장 느린 단계입니다.
+# 청크 분할/임베딩 설정을 바꿔 인덱스를 다시 만들 때 변환까지 다시 하지 않도록
+# (PDF 내용 해시, 변환기 버전, 변환 옵션)을 키로 gzip 압축한 Markdown과 페이지별 시작 위치를 저장합니다.
+# 항목은 PDF 해시마다 하나(<sha256>.json.gz)이며, 저장된 변환기 버전/옵션이 현재와 다르면
+# 오래된(stale) 항목으로 보고 다시 변환하여 덮어씁니다.
+PARSE_CACHE_PATH = "data/parse_cache"
+# 캐시 파일 형식 버전 (형식을 바꾸면 올려서 기존 항목을 모두 stale로 처리)
+CACHE_FORMAT = 1
+# pymupdf4llm.to_markdown에 넘기는 옵션 (바꾸면 캐시 키가 달라짐)
+PARSE_OPTIONS: Dict[str, Any] = {}
+
+_CACHE_NAME = "pdf_parse"
+
+PARSE_DURATION = metrics.histogram(
+    "pdf_parse_seconds", "PDF → Markdown 변환 소요 시간 (캐시 미스)",
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+
+
+@dataclass
+class ParsedPdf:
+    markdown: str
+    page_offsets: List[int] = field(default_factory=list)  # 페이지별 markdown 내 시작 위치
+    key: Dict[str, Any] = field(default_factory=dict)
+    cached: bool = False
+
+    @property
+    def pages(self) -> int:
+        return len(self.page_offsets)
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _package_version(name: str) -> Optional[str]:
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return None
+
+
+def cache_key(sha256: str) -> Dict[str, Any]:
+    """변환 결과를 결정하는 값들 (하나라도 바뀌면 다시 변환)"""
+    return {
+        "format": CACHE_FORMAT,
+        "sha256": sha256,
+        "pymupdf4llm": _package_version("pymupdf4llm"),
+        "pymupdf": _package_version("PyMuPDF"),
+        "options": PARSE_OPTIONS,
+    }
+
+
+def _entry_path(sha256: str) -> str:
+    return os.path.join(PARSE_CACHE_PATH, f"{sha256}.json.gz")
+
+
+def _read_entry(sha256: str) -> Optional[Dict[str, Any]]:
+    """캐시 파일을 읽습니다. 없으면 None, 손상되었으면 빈 dict"""
+    path = _entry_path(sha256)
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, json.JSONDecodeError) as e:
+        logger.warning("손상된 변환 캐시 항목을 무시합니다: %s (%s)", path, e)
+        return {}
+
+
+def load_cached(sha256: str) -> Optional[ParsedPdf]:
+    """현재 키와 일치하는 캐시 항목을 반환합니다. (없거나 stale이면 None)"""
+    entry = _read_entry(sha256)
+    if entry is None:
+        metrics.CACHE_REQUESTS.inc(cache=_CACHE_NAME, result="miss")
+        return None
+
+    key = cache_key(sha256)
+    if entry.get("key") != key:
+        logger.info("변환기 버전/옵션이 바뀌어 다시 변환합니다.", extra={"sha256": sha256, "cached_key": entry.get("key")})
+        metrics.CACHE_REQUESTS.inc(cache=_CACHE_NAME, result="stale")
+        return None
+    metrics.CACHE_REQUESTS.inc(cache=_CACHE_NAME, result="hit")
+    return ParsedPdf(markdown=entry["markdown"], page_offsets=entry["page_offsets"], key=key, cached=True)
+
+
+def _store(parsed: ParsedPdf):
+    os.makedirs(PARSE_CACHE_PATH, exist_ok=True)
+    path = _entry_path(parsed.key["sha256"])
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    entry = {
+        "key": parsed.key,
+        "created_at": time.time(),
+        "page_offsets": parsed.page_offsets,
+        "markdown": parsed.markdown,
+    }
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def convert_pdf(pdf_path: str) -> ParsedPdf:
+    """pymupdf4llm으로 페이지별 Markdown을 만들어 이어 붙입니다. (캐시를 거치지 않음)"""
+    import pymupdf4llm
+
+    # page_chunks=True는 페이지별 결과를 돌려주며, 이어 붙이면 page_chunks=False의 결과와 같습니다.
+    pages = pymupdf4llm.to_markdown(pdf_path, page_chunks=True, **PARSE_OPTIONS)
+    offsets, parts, position = [], [], 0
+    for page in pages:
+        offsets.append(position)
+        parts.append(page["text"])
+        position += len(page["text"])
+    return ParsedPdf(markdown="".join(parts), page_offsets=offsets)
+
+
+def parse_pdf(pdf_path: str, sha256: Optional[str] = None) -> ParsedPdf:
+    """
+    캐시를 거쳐 PDF를 Markdown으로 변환합니다.
+    sha256을 모르면 파일을 읽어 계산합니다. (content-addressed 저장소의 PDF는 파일명이 곧 해시)
+    """
+    sha256 = sha256 or file_sha256(pdf_path)
+    cached = load_cached(sha256)
+    if cached is not None:
+        return cached
+
+    started = time.perf_counter()
+    parsed = convert_pdf(pdf_path)
+    PARSE_DURATION.observe(time.perf_counter() - started)
+    parsed.key = cache_key(sha256)
+    try:
+        _store(parsed)
+    except OSError as e:
+        # 캐시 저장 실패는 변환 결과 사용에 영향 없음
+        logger.warning("변환 캐시 저장 실패: %s", e)
+    return parsed
+
+
+def prune(keep: Optional[set] = None) -> int:
+    """현재 키와 맞지 않는 항목과 (keep이 주어지면) keep에 없는 PDF의 항목을 지웁니다. 지운 수를 반환합니다."""
+    if not os.path.isdir(PARSE_CACHE_PATH):
+        return 0
+    removed = 0
+    for filename in os.listdir(PARSE_CACHE_PATH):
+        if not filename.endswith(".json.gz"):
+            continue
+        sha256 = filename[:-len(".json.gz")]
+        if keep is not None and sha256 not in keep:
+            stale = True
+        else:
+            entry = _read_entry(sha256)
+            stale = entry is not None and entry.get("key") != cache_key(sha256)
+        if stale:
+            os.remove(os.path.join(PARSE_CACHE_PATH, filename))
+            removed += 1
+    return removed
@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from processing import PDF_FOLDER_PATH
+
+logger = logging.getLogger(__name__)
+
+# --- 내용 주소 기반(content-addressed) PDF 저장소 ---
+# 업로드된 PDF를 메모리에 한 번에 읽지 않고 청크 단위로 디스크에 쓰면서 SHA-256을 계산하고,
+# 클라이언트가 보낸 파일명 대신 해시(<sha256>.pdf)로 저장합니다.
+# 인덱싱이 끝난 PDF는 manifest.json에 기록하여, 같은 내용의 PDF가 다시 올라오면(파일명이 달라도)
+# 파싱과 Vector Store 재구축 없이 바로 "이미 인덱싱됨"으로 응답합니다.
+MANIFEST_PATH = os.path.join(PDF_FOLDER_PATH, "manifest.json")
+LOCK_PATH = os.path.join(PDF_FOLDER_PATH, ".manifest.lock")
+
+
+class UploadTooLarge(Exception):
+    """업로드 크기가 제한을 넘은 경우"""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"파일 크기가 제한({max_bytes // (1024 * 1024)}MB)을 초과했습니다.")
+        self.max_bytes = max_bytes
+
+
+@dataclass
+class StoredPdf:
+    sha256: str
+    path: str
+    size: int
+
+
+def pdf_path_for(sha256: str) -> str:
+    return os.path.join(PDF_FOLDER_PATH, f"{sha256}.pdf")
+
+
+async def save_upload(file, max_bytes: int, chunk_size: int = 1024 * 1024) -> StoredPdf:
+    """
+    UploadFile을 청크 단위로 임시 파일에 쓰면서 해시를 계산하고, <sha256>.pdf로 옮겨 저장합니다.
+    max_bytes를 넘으면 임시 파일을 지우고 UploadTooLarge를 발생시킵니다.
+    """
+    os.makedirs(PDF_FOLDER_PATH, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    tmp_path = os.path.join(PDF_FOLDER_PATH, f".upload-{os.getpid()}-{id(file)}.tmp")
+    try:
+        with open(tmp_path, "wb") as out:
+            while chunk := await file.read(chunk_size):
+                size += len(chunk)
+                if size > max_bytes:
+                    logger.warning("업로드 크기 제한 초과: %s", getattr(file, "filename", None))
+                    raise UploadTooLarge(max_bytes)
+                digest.update(chunk)
+                # 디스크 쓰기가 이벤트 루프를 막지 않도록 스레드에서 실행
+                await asyncio.to_thread(out.write, chunk)
+        sha256 = digest.hexdigest()
+        path = pdf_path_for(sha256)
+        if os.path.exists(path):
+            os.remove(tmp_path)  # 같은 내용이 이미 저장되어 있음
+        else:
+            os.replace(tmp_path, path)
+        return StoredPdf(sha256=sha256, path=path, size=size)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _manifest_lock():
+    """워커 간 manifest.json 갱신을 직렬화하는 파일 락"""
+    from filelock import FileLock
+
+    os.makedirs(PDF_FOLDER_PATH, exist_ok=True)
+    return FileLock(LOCK_PATH, timeout=30)
+
+
+def read_manifest() -> Dict[str, Dict[str, Any]]:
+    """sha256 → 인덱싱 정보 (없거나 손상되었으면 빈 dict)"""
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def find_ingested(sha256: str, md_folder: str) -> Optional[Dict[str, Any]]:
+    """이미 인덱싱된 PDF면 기록을 반환합니다. (변환된 MD 파일이 지워졌으면 None)"""
+    entry = read_manifest().get(sha256)
+    if entry and os.path.exists(os.path.join(md_folder, entry["md_filename"])):
+        return entry
+    return None
+
+
+def record_ingested(stored: StoredPdf, filename: str, md_filename: str):
+    """인덱싱(Vector Store 반영)이 끝난 PDF를 manifest에 기록합니다."""
+    with _manifest_lock():
+        manifest = read_manifest()
+        # 같은 파일명으로 올라온 다른 내용의 PDF는 MD 파일이 덮어써졌으므로 기록에서 제거
+        manifest = {sha: entry for sha, entry in manifest.items() if entry["md_filename"] != md_filename}
+        manifest[stored.sha256] = {
+            "filename": filename,
+            "md_filename": md_filename,
+            "size": stored.size,
+            "ingested_at": time.time(),
+        }
+        tmp_path = f"{MANIFEST_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, MANIFEST_PATH)
@@ -1,11 +1,14 @@
 import os
-# import fitz  # PyMuPDF
-import pymupdf4llm
-from typing import List
-from langchain_community.vectorstores import FAISS
-from langchain_community.document_loaders import UnstructuredMarkdownLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain.schema import Document
+import logging
+from typing import List, Optional, TYPE_CHECKING
+from langchain_core.documents import Document
+
+# pymupdf4llm, UnstructuredMarkdownLoader, FAISS는 import 비용이 크므로
+# 서버 시작 시점이 아니라 각 함수가 처음 호출될 때 import 합니다.
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+
+logger = logging.getLogger(__name__)
 
 # MD 파일 저장 경로
 MD_FOLDER_PATH = "data/md"
@@ -15,10 +18,10 @@ PDF_FOLDER_PATH = "data/pdf"
 VECTOR_STORE_PATH = "data/vector_store/faiss_index"
 
 
-def parse_pdf_to_markdown(pdf_path: str, md_filename: str) -> str:
+def parse_pdf_to_markdown(pdf_path: str, md_filename: str, sha256: Optional[str] = None) -> str:
     """
-    PDF 바이트 데이터를 받아 텍스트를 추출하고 마크다운 파일로 저장합니다.
-    PyMuPDF를 사용하여 텍스트를 블록 단위로 추출합니다.
+    PDF를 마크다운으로 변환하여 MD 폴더에 저장합니다.
+    변환 결과는 (PDF 해시, 변환기 버전, 옵션) 기준으로 캐시되므로 같은 PDF는 다시 변환하지 않습니다.
     """
     if not os.path.exists(MD_FOLDER_PATH):
         os.makedirs(MD_FOLDER_PATH)
@@ -26,18 +29,19 @@ def parse_pdf_to_markdown(pdf_path: str, md_filename: str) -> str:
     md_path = os.path.join(MD_FOLDER_PATH, md_filename)
 
     try:
-        # PyMuPDF4LLM을 사용하여 바이트 데이터로부터 직접 마크다운 생성
-        # to_markdown()는 표, 제목, 단락 구조를 인식하여 변환합니다.
-        md_content = pymupdf4llm.to_markdown(pdf_path)
+        from parse_cache import parse_pdf
+
+        # PyMuPDF4LLM의 to_markdown()는 표, 제목, 단락 구조를 인식하여 변환합니다.
+        parsed = parse_pdf(pdf_path, sha256)
 
         # 변환된 마크다운을 파일로 저장
         with open(md_path, "w", encoding="utf-8") as f:
-            f.write(md_content)
+            f.write(parsed.markdown)
 
         return md_path
 
     except Exception as e:
-        print(f"Error parsing PDF to MD: {e}")
+        logger.exception("Error parsing PDF to MD: %s", e)
         return ""
 
 
@@ -45,6 +49,9 @@ def load_md_documents(md_folder_path: str) -> List[Document]:
     """
     지정된 폴더 내의 모든 마크다운 파일을 로드하고 분할합니다.
     """
+    from langchain_community.document_loaders import UnstructuredMarkdownLoader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
     documents = []
     if not os.path.exists(md_folder_path):
         return documents
@@ -60,7 +67,7 @@ def load_md_documents(md_folder_path: str) -> List[Document]:
                     doc.metadata["source"] = filename
                 documents.extend(docs)
             except Exception as e:
-                print(f"Error loading MD file {filename}: {e}")
+                logger.warning("Error loading MD file %s: %s", filename, e)
 
     if not documents:
         return []
@@ -69,16 +76,47 @@ def load_md_documents(md_folder_path: str) -> List[Document]:
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=1000,
         chunk_overlap=100,
-        separators=["\n\n", "\n", " ", ""]  # 분할 기준
+        separators=["\n\n", "\n", " ", ""],  # 분할 기준
+        add_start_index=True,  # 원문 내 위치 (참고 문서 조립 시 겹치는 청크를 합치는 데 사용)
     )
     return text_splitter.split_documents(documents)
 
 
-def build_persistent_vector_store(documents: List[Document], store_path: str, embeddings) -> FAISS:
+# 인덱스 저장 형식: flat(float32 원본) / fp16(절반) / sq8(1/4, 차원별 8bit 스칼라 양자화)
+INDEX_QUANTIZATIONS = ("flat", "fp16", "sq8")
+
+
+def quantize_faiss_index(index, quantization: str):
+    """
+    flat(float32) 인덱스의 벡터를 스칼라 양자화(IndexScalarQuantizer) 인덱스로 옮깁니다.
+    벡터 순서(FAISS id)는 그대로이므로 docstore 매핑을 바꿀 필요가 없습니다.
+    """
+    import faiss
+
+    if quantization == "flat":
+        return index
+    if quantization not in INDEX_QUANTIZATIONS:
+        raise ValueError(f"지원하지 않는 인덱스 양자화 형식입니다: {quantization}")
+
+    qtype = faiss.ScalarQuantizer.QT_fp16 if quantization == "fp16" else faiss.ScalarQuantizer.QT_8bit
+    vectors = index.reconstruct_n(0, index.ntotal)
+    quantized = faiss.IndexScalarQuantizer(index.d, qtype, index.metric_type)
+    # sq8은 차원별 최솟값/최댓값을 학습하여 구간을 정합니다. (fp16은 학습할 값이 없음)
+    quantized.train(vectors)
+    quantized.add(vectors)
+    return quantized
+
+
+def build_persistent_vector_store(documents: List[Document], store_path: str, embeddings,
+                                  quantization: str = "flat") -> "FAISS":
     """
     Document 목록으로부터 FAISS Vector Store를 생성하고 디스크에 저장합니다.
+    quantization이 fp16/sq8이면 벡터를 양자화하여 저장합니다. (메모리/검색 비용 감소, 약간의 정확도 손실)
     """
+    from langchain_community.vectorstores import FAISS
+
     vector_store = FAISS.from_documents(documents, embeddings)
+    vector_store.index = quantize_faiss_index(vector_store.index, quantization)
 
     store_dir = os.path.dirname(store_path)
     if not os.path.exists(store_dir):
@@ -88,10 +126,12 @@ def build_persistent_vector_store(documents: List[Document], store_path: str, em
     return vector_store
 
 
-def load_persistent_vector_store(store_path: str, embeddings) -> FAISS:
+def load_persistent_vector_store(store_path: str, embeddings) -> "FAISS":
     """
     디스크에 저장된 FAISS Vector Store를 로드합니다.
     """
+    from langchain_community.vectorstores import FAISS
+
     if not os.path.exists(store_path):
         raise FileNotFoundError(f"Vector store not found at {store_path}")
 
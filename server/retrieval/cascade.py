@@ -0,0 +1,83 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+# --- 단계적(cascade) Rerank ---
+# 모든 후보를 Cross-Encoder로 점수 매기지 않고, 비용이 낮은 단계부터 후보를 줄여 나갑니다.
+#   1. 1차 점수(FAISS에 저장된 벡터의 유사도)로 최고 점수와 차이가 큰 후보를 제외
+#   2. 남은 후보를 1차 점수 순으로 작은 배치로 Cross-Encoder에 넣고,
+#      확신도 높은 문서가 충분히 모이면 나머지는 점수 매기지 않고 종료 (early exit)
+#   3. 처음 k개 중 threshold를 넘는 문서가 없을 때만 후보 범위(k)를 두 배씩 넓혀 추가로 점수 매김
+
+Predict = Callable[[List[Tuple[str, str]]], Sequence[float]]
+
+
+@dataclass
+class CascadeConfig:
+    threshold: float = 0.7  # 최종 문서로 사용할 Cross-Encoder 점수 하한
+    top_n: int = 5  # 최종 문서 수
+    initial_k: int = 10  # 처음 Cross-Encoder로 평가할 후보 범위
+    batch_size: int = 4  # Cross-Encoder 배치 크기
+    early_exit_score: float = 0.9  # 이 점수 이상이면 확신도 높은 문서로 간주
+    early_exit_count: int = 3  # 확신도 높은 문서가 이만큼 모이면 종료
+    prune_margin: Optional[float] = 0.15  # 1차 점수가 (최고 점수 - margin) 미만인 후보 제외 (None이면 사용 안 함)
+
+
+@dataclass
+class CascadeResult:
+    documents: List[Document]
+    candidates: int  # 검색된 전체 후보 수
+    pruned: int  # 1차 점수로 제외된 후보 수
+    pairs: int  # Cross-Encoder로 평가한 (질문, 문서) 쌍 수
+    expansions: int = 0  # 후보 범위를 넓힌 횟수
+    early_exit: bool = False
+    scores: List[float] = field(default_factory=list)  # 최종 문서의 Cross-Encoder 점수
+
+
+def prune_candidates(first_pass: Optional[Sequence[float]], count: int, margin: Optional[float],
+                     keep_at_least: int) -> List[int]:
+    """1차 점수 기준으로 Cross-Encoder에 넘길 후보 인덱스(1차 점수 순)를 반환합니다."""
+    if not first_pass or margin is None:
+        return list(range(count))
+    order = sorted(range(count), key=lambda i: first_pass[i], reverse=True)
+    floor = first_pass[order[0]] - margin
+    return [i for position, i in enumerate(order) if position < keep_at_least or first_pass[i] >= floor]
+
+
+def cascade_rerank(query: str, documents: List[Document], predict: Predict, config: CascadeConfig,
+                   first_pass: Optional[Sequence[float]] = None) -> CascadeResult:
+    """
+    documents(검색 순서)를 단계적으로 Rerank하여 threshold를 넘는 상위 top_n개 문서를 반환합니다.
+    first_pass는 documents와 같은 순서의 1차 유사도 점수입니다. (없으면 가지치기 없이 검색 순서 사용)
+    """
+    candidates = prune_candidates(first_pass, len(documents), config.prune_margin, config.top_n)
+    result = CascadeResult(documents=[], candidates=len(documents), pruned=len(documents) - len(candidates), pairs=0)
+
+    scored: List[Tuple[float, int]] = []
+    start, window = 0, max(config.initial_k, 1)
+    while start < len(candidates):
+        tier = candidates[start:window]
+        for offset in range(0, len(tier), config.batch_size):
+            batch = tier[offset:offset + config.batch_size]
+            scores = predict([(query, documents[i].page_content) for i in batch])
+            result.pairs += len(batch)
+            scored.extend((float(score), i) for score, i in zip(scores, batch))
+            if sum(score >= config.early_exit_score for score, _ in scored) >= config.early_exit_count:
+                result.early_exit = True
+                break
+        if result.early_exit or any(score > config.threshold for score, _ in scored):
+            break
+        # 통과한 문서가 없으면 다음 후보 범위로 확장
+        start, window = window, window * 2
+        if start < len(candidates):
+            result.expansions += 1
+
+    passed = sorted((item for item in scored if item[0] > config.threshold), key=lambda item: item[0], reverse=True)
+    passed = passed[:config.top_n]
+    result.documents = [documents[i] for _, i in passed]
+    result.scores = [score for score, _ in passed]
+    return result
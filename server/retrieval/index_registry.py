@@ -0,0 +1,352 @@
+import logging
+import os
+import json
+import time
+import uuid
+import zlib
+import pickle
+import shutil
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple, TYPE_CHECKING
+
+from langchain_core.documents import Document
+
+from processing import VECTOR_STORE_PATH, load_md_documents
+from utils.config import settings
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+
+logger = logging.getLogger(__name__)
+
+# --- 버전 관리되는 Vector Store 디렉터리 ---
+# 여러 워커(프로세스)가 같은 인덱스를 공유할 수 있도록, 재구축 결과는 매번 새 디렉터리
+# (faiss_index-<version>)에 저장하고 CURRENT.json 포인터를 원자적으로 교체(os.replace)합니다.
+# 각 워커는 포인터의 버전을 감시하다가 바뀌면 새 인덱스를 다시 로드합니다.
+# 임베딩 백엔드마다 벡터 공간이 다르므로 로컬 임베딩 인덱스는 별도 디렉터리(data/vector_store/local)에 둡니다.
+INDEX_NAME = os.path.basename(VECTOR_STORE_PATH)
+INDEX_ROOT = os.path.dirname(VECTOR_STORE_PATH)
+if settings.EMBEDDING_BACKEND != "azure":
+    INDEX_ROOT = os.path.join(INDEX_ROOT, settings.EMBEDDING_BACKEND)
+POINTER_PATH = os.path.join(INDEX_ROOT, "CURRENT.json")
+LOCK_PATH = os.path.join(INDEX_ROOT, ".rebuild.lock")
+# 이전 버전을 바로 지우지 않고 남겨둘 개수 (다른 워커가 아직 읽는 중일 수 있음)
+KEEP_VERSIONS = 2
+
+# --- 샤드 레이아웃 (INDEX_SHARDS > 1) ---
+# 버전 디렉터리 아래에 샤드별 FAISS 인덱스(shard-00, shard-01, ...)를 두고 CURRENT.json의 "shards"에 샤드 목록을 기록합니다.
+# 같은 파일(source)의 청크는 항상 같은 샤드에 들어가므로, 문서 하나가 바뀌면 그 샤드만 다시 임베딩/구축하고
+# 나머지 샤드는 이전 버전의 파일을 하드 링크하여 새 버전을 만듭니다. (이전 버전 삭제와 무관하게 유지됨)
+SHARD_FILES = ("index.faiss", "index.pkl")
+
+
+def _rebuild_lock():
+    """워커 간 인덱스 재구축을 직렬화하는 파일 락"""
+    from filelock import FileLock
+
+    os.makedirs(INDEX_ROOT, exist_ok=True)
+    return FileLock(LOCK_PATH, timeout=600)
+
+
+def read_current_version() -> Optional[Dict[str, Any]]:
+    """CURRENT.json 포인터를 읽습니다. (없거나 손상되었으면 None)"""
+    try:
+        with open(POINTER_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_pointer(info: Dict[str, Any]):
+    tmp_path = f"{POINTER_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(info, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, POINTER_PATH)
+
+
+def _prune_old_versions(current_path: str):
+    """포인터가 가리키지 않는 오래된 버전 디렉터리를 정리합니다."""
+    prefix = INDEX_NAME + "-"
+    versions = sorted(
+        (entry for entry in os.listdir(INDEX_ROOT) if entry.startswith(prefix)),
+        key=lambda entry: os.path.getmtime(os.path.join(INDEX_ROOT, entry)),
+        reverse=True,
+    )
+    for entry in versions[KEEP_VERSIONS:]:
+        path = os.path.join(INDEX_ROOT, entry)
+        if os.path.abspath(path) != os.path.abspath(current_path):
+            # 다른 워커가 mmap으로 열고 있어도 파일 삭제 후 매핑은 유효합니다. (POSIX)
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def shard_name(number: int) -> str:
+    return f"shard-{number:02d}"
+
+
+def shard_for_source(source: str, shard_count: int) -> str:
+    """source(파일명)가 속한 샤드 이름 (프로세스와 무관하게 같은 값이 나오도록 crc32 사용)"""
+    return shard_name(zlib.crc32(source.encode("utf-8")) % shard_count)
+
+
+def shards_for_sources(sources: Iterable[str]) -> Optional[Set[str]]:
+    """바뀐 파일들이 속한 샤드 이름 (샤드를 쓰지 않으면 None = 전체 재구축)"""
+    if settings.INDEX_SHARDS <= 1:
+        return None
+    return {shard_for_source(source, settings.INDEX_SHARDS) for source in sources}
+
+
+def group_by_shard(documents: List[Document], shard_count: int) -> Dict[str, List[Document]]:
+    groups: Dict[str, List[Document]] = {}
+    for doc in documents:
+        groups.setdefault(shard_for_source(doc.metadata.get("source", ""), shard_count), []).append(doc)
+    return groups
+
+
+def load_faiss_mmap(store_path: str, embeddings) -> "FAISS":
+    """
+    FAISS 인덱스를 메모리 맵(mmap)으로 읽기 전용 로드합니다.
+    여러 워커가 같은 파일을 열면 OS 페이지 캐시를 공유하므로 인덱스 메모리가 워커 수만큼 중복되지 않습니다.
+    mmap을 지원하지 않는 인덱스/버전이면 일반 로드로 대체합니다.
+    """
+    import faiss
+    from langchain_community.vectorstores import FAISS
+
+    index_file = os.path.join(store_path, "index.faiss")
+    # IndexFlat 계열은 IO_FLAG_MMAP_IFC(faiss>=1.9), 그 외에는 IO_FLAG_MMAP을 사용
+    mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None) or faiss.IO_FLAG_MMAP
+    try:
+        index = faiss.read_index(index_file, mmap_flag | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError as e:
+        logger.warning("mmap 로드를 지원하지 않아 일반 로드로 대체합니다: %s", e)
+        index = faiss.read_index(index_file)
+
+    with open(os.path.join(store_path, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+
+def load_current_vector_store(embeddings, use_mmap: bool = True) -> Tuple[Optional["FAISS"], Optional[Dict[str, Any]]]:
+    """
+    현재 버전의 Vector Store를 로드합니다.
+    포인터가 없으면 이전 방식의 단일 경로(VECTOR_STORE_PATH)를 확인합니다.
+    """
+    info = read_current_version()
+    if info is None:
+        # 이전 방식의 단일 경로는 Azure 임베딩으로 만든 인덱스입니다.
+        if settings.EMBEDDING_BACKEND == "azure" and os.path.exists(VECTOR_STORE_PATH):
+            info = {"version": "legacy", "path": VECTOR_STORE_PATH}
+        else:
+            return None, None
+
+    expected = settings.embedding_signature()
+    if info.get("embedding", expected) != expected:
+        # 다른 임베딩 모델로 만든 인덱스는 벡터 공간이 달라 검색할 수 없으므로 새로 구축하게 합니다.
+        logger.warning("인덱스의 임베딩 모델이 현재 설정과 다릅니다.", extra={"index": info.get("embedding"), "expected": expected})
+        return None, None
+
+    if info.get("shards"):
+        from retrieval.vector_store import ShardedVectorStore
+
+        store = ShardedVectorStore({
+            name: _load_store(os.path.join(info["path"], name), embeddings, use_mmap) for name in sorted(info["shards"])
+        })
+    else:
+        store = _load_store(info["path"], embeddings, use_mmap)
+    return store, info
+
+
+def _load_store(store_path: str, embeddings, use_mmap: bool) -> "FAISS":
+    from processing import load_persistent_vector_store
+
+    if use_mmap:
+        return load_faiss_mmap(store_path, embeddings)
+    return load_persistent_vector_store(store_path, embeddings)
+
+
+def _reusable_shards(shard_count: int) -> Dict[str, Dict[str, Any]]:
+    """현재 버전에서 그대로 가져다 쓸 수 있는 샤드 (샤드 수/임베딩/저장 형식이 같을 때만)"""
+    current = read_current_version()
+    if (
+        not current or not current.get("shards")
+        or current.get("shard_count") != shard_count
+        or current.get("embedding") != settings.embedding_signature()
+        or current.get("quantization") != settings.INDEX_QUANTIZATION
+    ):
+        return {}
+    return {
+        name: {**meta, "path": os.path.join(current["path"], name)}
+        for name, meta in current["shards"].items()
+        if os.path.exists(os.path.join(current["path"], name, SHARD_FILES[0]))
+    }
+
+
+def _link_shard(source_path: str, target_path: str):
+    """이전 버전의 샤드 파일을 새 버전 디렉터리로 하드 링크합니다. (지원하지 않는 파일 시스템이면 복사)"""
+    os.makedirs(target_path, exist_ok=True)
+    for filename in SHARD_FILES:
+        source, target = os.path.join(source_path, filename), os.path.join(target_path, filename)
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copy2(source, target)
+
+
+def _build_shards(documents: List[Document], embeddings, store_path: str, version: str,
+                  rebuild: Optional[Set[str]]):
+    """
+    샤드별 인덱스를 만듭니다. rebuild가 주어지면 그 샤드만 새로 구축하고, 나머지는 현재 버전에서 가져옵니다.
+    (가져올 샤드가 없거나 청크 수가 달라졌으면 새로 구축)
+    """
+    from processing import build_persistent_vector_store
+    from retrieval.vector_store import ShardedVectorStore
+
+    shard_count = settings.INDEX_SHARDS
+    previous = _reusable_shards(shard_count) if rebuild is not None else {}
+    stores, shards_info, rebuilt = {}, {}, []
+    for name, docs in sorted(group_by_shard(documents, shard_count).items()):
+        path = os.path.join(store_path, name)
+        reused = previous.get(name)
+        if name not in (rebuild or ()) and reused and reused["documents"] == len(docs):
+            _link_shard(reused["path"], path)
+            stores[name] = _load_store(path, embeddings, settings.INDEX_USE_MMAP)
+            shards_info[name] = {"documents": len(docs), "built_version": reused["built_version"]}
+        else:
+            stores[name] = build_persistent_vector_store(docs, path, embeddings, settings.INDEX_QUANTIZATION)
+            shards_info[name] = {"documents": len(docs), "built_version": version}
+            rebuilt.append(name)
+    info = {"shard_count": shard_count, "shards": shards_info, "rebuilt_shards": rebuilt}
+    return ShardedVectorStore(stores), info
+
+
+def _publish_locked(documents: List[Document], embeddings, shards: Optional[Set[str]] = None,
+                    on_publish: Optional[Callable[[Dict[str, Any]], None]] = None) -> Tuple["FAISS", Dict[str, Any]]:
+    """(재구축 락을 잡은 상태에서) 새 버전을 구축/저장하고 포인터를 교체합니다."""
+    from processing import build_persistent_vector_store
+
+    version = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    store_path = os.path.join(INDEX_ROOT, f"{INDEX_NAME}-{version}")
+    if settings.INDEX_SHARDS > 1:
+        vector_store, shard_info = _build_shards(documents, embeddings, store_path, version, shards)
+        dimensions = vector_store.shards[0].index.d
+    else:
+        vector_store = build_persistent_vector_store(documents, store_path, embeddings, settings.INDEX_QUANTIZATION)
+        shard_info = {}
+        dimensions = vector_store.index.d
+
+    info = {
+        "version": version,
+        "path": store_path,
+        "embedding": settings.embedding_signature(),
+        "dimensions": dimensions,
+        "quantization": settings.INDEX_QUANTIZATION,
+        "documents": len(documents),
+        "created_at": time.time(),
+        "created_by_pid": os.getpid(),
+        **shard_info,
+    }
+    if on_publish is not None:
+        on_publish(info)
+    _write_pointer(info)
+    _prune_old_versions(store_path)
+
+    logger.info("Vector Store 버전 게시 완료", extra={
+        "version": version, "chunks": len(documents), "rebuilt_shards": shard_info.get("rebuilt_shards")})
+    return vector_store, info
+
+
+def publish_vector_store(documents: List[Document], embeddings, shards: Optional[Iterable[str]] = None,
+                         on_publish: Optional[Callable[[Dict[str, Any]], None]] = None) -> Tuple["FAISS", Dict[str, Any]]:
+    """
+    Document 목록으로 새 버전의 Vector Store를 구축하여 저장하고, 포인터를 새 버전으로 교체합니다.
+    워커 간 파일 락으로 동시에 하나의 재구축만 실행됩니다.
+    shards가 주어지면(INDEX_SHARDS > 1) 그 샤드만 다시 구축하고 나머지는 현재 버전의 샤드를 그대로 사용합니다.
+    on_publish는 포인터를 교체하기 직전에 새 버전 정보로 호출됩니다. (게시한 워커가 자기 버전을 다시 로드하지 않도록
+    IndexWatcher.mark_loaded를 넘김)
+    """
+    with _rebuild_lock():
+        return _publish_locked(documents, embeddings, set(shards) if shards is not None else None, on_publish)
+
+
+def ensure_vector_store(md_folder_path: str, embeddings, use_mmap: bool = True):
+    """
+    현재 버전의 Vector Store를 로드하고, 없으면 MD 폴더로부터 구축합니다.
+    여러 워커가 동시에 시작해도 락 안에서 다시 확인하므로 한 번만 구축됩니다.
+    """
+    store, info = load_current_vector_store(embeddings, use_mmap)
+    if store is not None:
+        return store, info
+
+    with _rebuild_lock():
+        store, info = load_current_vector_store(embeddings, use_mmap)
+        if store is not None:
+            return store, info
+
+        logger.info("'%s'에서 MD 파일 로드하여 Vector Store 구축 중...", md_folder_path)
+        documents = load_md_documents(md_folder_path)
+        if not documents:
+            return None, None
+        return _publish_locked(documents, embeddings)
+
+
+class IndexWatcher:
+    """
+    CURRENT.json의 버전을 주기적으로 확인하여, 다른 워커가 새 인덱스를 게시하면
+    이 워커의 Vector Store를 다시 로드하고 on_reload 콜백(그래프 재컴파일 등)을 호출합니다.
+    """
+
+    def __init__(self, embeddings_factory: Callable[[], Any], on_reload: Callable[[Any, Dict[str, Any]], None],
+                 interval: float = 2.0, use_mmap: bool = True):
+        self.embeddings_factory = embeddings_factory
+        self.on_reload = on_reload
+        self.interval = interval
+        self.use_mmap = use_mmap
+        self.loaded_version: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def mark_loaded(self, info: Optional[Dict[str, Any]]):
+        """이 워커가 직접 로드/게시한 버전을 기록합니다. (같은 버전을 다시 로드하지 않도록)"""
+        self.loaded_version = info["version"] if info else None
+
+    def _reload(self):
+        loaded_version = self.loaded_version
+        store, info = load_current_vector_store(self.embeddings_factory(), self.use_mmap)
+        if store is None:
+            return
+        if self.loaded_version != loaded_version:
+            # 로드하는 동안 이 워커가 직접 새 버전을 게시함 (업로드 쪽에서 적용하므로 덮어쓰지 않음)
+            return
+        self.on_reload(store, info)
+        self.mark_loaded(info)
+        logger.info("Vector Store를 새 버전으로 다시 로드했습니다.", extra={"pid": os.getpid(), "version": info["version"]})
+
+    async def _run(self, after: Optional[Awaitable[Any]]):
+        if after is not None:
+            # 시작 시 로드가 끝나기 전에는 loaded_version이 없어 같은 버전을 한 번 더 로드하게 되므로 기다림
+            # (로드 실패 여부와 관계없이 감시는 시작)
+            await asyncio.wait({asyncio.ensure_future(after)})
+        while True:
+            await asyncio.sleep(self.interval)
+            info = read_current_version()
+            if info is None or info.get("version") == self.loaded_version:
+                continue
+            try:
+                await asyncio.to_thread(self._reload)
+            except Exception as e:
+                logger.warning("Vector Store 다시 로드 실패 (다음 주기에 재시도): %s", e)
+
+    def start(self, after: Optional[Awaitable[Any]] = None):
+        """감시를 시작합니다. after(시작 시 Vector Store 로드 태스크 등)가 주어지면 끝난 뒤 첫 확인을 합니다."""
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run(after))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import threading
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# --- 로컬 CPU 임베딩 ---
+# Azure 임베딩 API 대신 로컬 다국어 문장 임베딩 모델(sentence-transformers)로 벡터를 만듭니다.
+# 질문마다 네트워크 왕복이 없고, 오프라인에서도 검색할 수 있습니다.
+# torch / sentence_transformers는 import 비용이 크므로 처음 모델을 만들 때 import 합니다.
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    sentence-transformers 모델을 CPU에서 실행하는 LangChain Embeddings 구현입니다.
+
+    - runtime="torch": PyTorch로 실행. quantize=True이면 Linear 계층을 int8 동적 양자화합니다.
+    - runtime="onnx": ONNX Runtime으로 실행 (optimum[onnxruntime] 필요).
+      onnx_file로 양자화된 모델 파일(예: onnx/model_qint8_avx512_vnni.onnx)을 지정할 수 있습니다.
+    - query_prefix / document_prefix: e5 계열처럼 질문/문서 접두어를 요구하는 모델용
+    - truncate_dim: 앞쪽 차원만 사용 (Matryoshka 방식으로 학습된 모델에서 품질 손실이 작음)
+    벡터는 L2 정규화되므로 FAISS 내적/L2 거리 모두 코사인 유사도 순서와 같습니다.
+    """
+
+    def __init__(
+            self,
+            model_name: str,
+            runtime: str = "torch",
+            quantize: bool = True,
+            onnx_file: Optional[str] = None,
+            query_prefix: str = "",
+            document_prefix: str = "",
+            batch_size: int = 32,
+            num_threads: Optional[int] = None,
+            truncate_dim: Optional[int] = None,
+    ):
+        self.model_name = model_name
+        self.runtime = runtime
+        self.quantize = quantize
+        self.onnx_file = onnx_file
+        self.query_prefix = query_prefix
+        self.document_prefix = document_prefix
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self.truncate_dim = truncate_dim
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._load()
+        return self._model
+
+    def _load(self):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+
+        if self.runtime == "onnx":
+            model_kwargs = {"file_name": self.onnx_file} if self.onnx_file else None
+            model = SentenceTransformer(self.model_name, device="cpu", backend="onnx", model_kwargs=model_kwargs,
+                                        truncate_dim=self.truncate_dim)
+        else:
+            model = SentenceTransformer(self.model_name, device="cpu", truncate_dim=self.truncate_dim)
+            if self.quantize:
+                model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        logger.info("로컬 임베딩 모델 로드 완료", extra={
+            "model": self.model_name, "runtime": self.runtime, "quantize": self.quantize,
+            "dimensions": model.get_sentence_embedding_dimension(),
+        })
+        return model
+
+    @property
+    def dimensions(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return vectors.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._encode([self.document_prefix + text for text in texts])
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([self.query_prefix + text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """여러 질문을 한 번에 임베딩합니다. (query_embedder의 배치 처리용)"""
+        return self._encode([self.query_prefix + text for text in texts])
+
+    # CPU 연산이므로 이벤트 루프를 막지 않도록 스레드에서 실행합니다.
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.to_thread(self.embed_query, text)
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.embed_queries, texts)
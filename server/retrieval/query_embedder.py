@@ -0,0 +1,198 @@
+import time
+import asyncio
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from utils import metrics, tracing
+from utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+# --- 쿼리 임베딩 캐시 / 배치 ---
+# 검색할 때마다 재작성된 쿼리를 Azure 임베딩 API로 보내면 FAISS 검색 전에 왕복 지연이 생깁니다.
+#   1. 정규화한 쿼리 → 임베딩 벡터를 LRU 캐시에 보관하여 반복/동일 질문은 API를 호출하지 않습니다.
+#      (정규화 결과는 캐시/합치기 키로만 쓰고, API에는 앞뒤 공백만 제거한 원래 쿼리를 보냅니다)
+#   2. 짧은 시간 창(batch_window) 안에 들어온 동시 요청은 한 번의 aembed_documents 호출로 묶고,
+#      같은 쿼리가 이미 요청 중이면 그 결과를 함께 기다립니다.
+
+EMBEDDING_BATCH_SIZE = metrics.histogram(
+    "query_embedding_batch_size", "한 번의 임베딩 API 호출로 묶인 쿼리 수",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+EMBEDDING_BATCH_DURATION = metrics.histogram("query_embedding_batch_seconds", "쿼리 임베딩 배치 호출 소요 시간")
+
+_CACHE_NAME = "query_embedding"
+
+
+def normalize_query(query: str) -> str:
+    """캐시 키용 정규화: 유니코드 NFKC, 앞뒤 공백 제거, 연속 공백 축약, 소문자화"""
+    return " ".join(unicodedata.normalize("NFKC", query).split()).lower()
+
+
+class _Batch:
+    """아직 API로 보내지 않은 쿼리 묶음 (같은 이벤트 루프에서만 사용)"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.futures: Dict[str, asyncio.Future] = {}
+        self.texts: Dict[str, str] = {}  # 키 → 임베딩할 원래 쿼리 (같은 키는 먼저 들어온 쿼리 사용)
+        self.handle: Optional[asyncio.TimerHandle] = None
+
+
+class QueryEmbedder:
+    """
+    임베딩 모델 하나에 대한 쿼리 임베딩 LRU 캐시 + 비동기 배치 처리기입니다.
+
+    - cache_size: 캐시에 보관할 최대 쿼리 수 (0이면 캐시 사용 안 함)
+    - batch_window: 첫 요청 후 다른 요청을 모으기 위해 기다리는 시간(초)
+    - max_batch: 한 번에 보낼 최대 쿼리 수 (도달하면 즉시 전송)
+    """
+
+    def __init__(self, embeddings: Any, cache_size: int = 1024, batch_window: float = 0.01, max_batch: int = 16):
+        self.embeddings = embeddings
+        self.cache_size = cache_size
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._batch: Optional[_Batch] = None
+        # 배치에 담겼거나 API 호출 중인 쿼리 (같은 쿼리의 동시 요청은 같은 Future를 기다림)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    # --- 캐시 ---
+
+    def _get_cached(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+        return vector
+
+    def _put_cached(self, key: str, vector: List[float]):
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._cache[key] = vector
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    # --- 동기 ---
+
+    def embed(self, query: str) -> List[float]:
+        """동기 호출용 (캐시만 사용하고 배치하지 않음)"""
+        key = normalize_query(query)
+        vector = self._get_cached(key)
+        if vector is not None:
+            metrics.CACHE_REQUESTS.inc(cache=_CACHE_NAME, result="hit")
+            return vector
+        metrics.CACHE_REQUESTS.inc(cache=_CACHE_NAME, result="miss")
+        vector = self.embeddings.embed_query(query.strip())
+        self._put_cached(key, vector)
+        return vector
+
+    # --- 비동기 (배치) ---
+
+    async def aembed(self, query: str) -> List[float]:
+        key = normalize_query(query)
+        vector = self._get_cached(key)
+        if vector is not None:
+            metrics.CACHE_REQUESTS.inc(cache=_CACHE_NAME, result="hit")
+            return vector
+
+        loop = asyncio.get_running_loop()
+        future = self._inflight.get(key)
+        if future is not None and future.get_loop() is loop:
+            metrics.CACHE_REQUESTS.inc(cache=_CACHE_NAME, result="coalesced")
+            # 다른 요청의 취소가 이 요청까지 취소하지 않도록 shield
+            return await asyncio.shield(future)
+
+        metrics.CACHE_REQUESTS.inc(cache=_CACHE_NAME, result="miss")
+        batch = self._batch
+        if batch is None or batch.loop is not loop:
+            batch = self._batch = _Batch(loop)
+            batch.handle = loop.call_later(self.batch_window, self._dispatch, batch)
+
+        future = loop.create_future()
+        batch.futures[key] = future
+        batch.texts[key] = query.strip()
+        self._inflight[key] = future
+        if len(batch.futures) >= self.max_batch:
+            batch.handle.cancel()
+            self._dispatch(batch)
+        return await asyncio.shield(future)
+
+    def _dispatch(self, batch: _Batch):
+        """모인 쿼리를 하나의 태스크로 전송합니다. (이후 요청은 새 배치에 담김)"""
+        if self._batch is batch:
+            self._batch = None
+        batch.loop.create_task(self._run_batch(batch))
+
+    async def _run_batch(self, batch: _Batch):
+        futures = batch.futures
+        keys = list(futures)
+        started = time.perf_counter()
+        try:
+            # 질문/문서 임베딩이 다른 모델(LocalEmbeddings의 e5 접두어 등)은 aembed_queries를 제공합니다.
+            # Azure OpenAI처럼 구분이 없으면 aembed_documents로 한 번에 보냅니다.
+            embed_batch = getattr(self.embeddings, "aembed_queries", None) or self.embeddings.aembed_documents
+            vectors = await embed_batch([batch.texts[key] for key in keys])
+            if len(vectors) != len(keys):
+                raise ValueError(f"임베딩 결과 수({len(vectors)})가 쿼리 수({len(keys)})와 다릅니다.")
+        except Exception as e:
+            logger.warning("쿼리 임베딩 배치 호출 실패: %s", e, extra={"batch_size": len(keys)})
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            EMBEDDING_BATCH_SIZE.observe(len(keys))
+            EMBEDDING_BATCH_DURATION.observe(time.perf_counter() - started)
+            for key, vector in zip(keys, vectors):
+                self._put_cached(key, vector)
+                future = futures[key]
+                if not future.done():
+                    future.set_result(vector)
+        finally:
+            # 태스크가 취소된 경우에도 기다리는 요청이 멈추지 않도록 남은 Future를 모두 정리
+            for key, future in futures.items():
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+                if not future.done():
+                    future.cancel()
+
+
+# 임베딩 모델(인스턴스)별 QueryEmbedder. 인덱스를 다시 로드해도 같은 임베딩 인스턴스를 쓰므로 캐시가 유지됩니다.
+_embedders: Dict[int, QueryEmbedder] = {}
+_embedders_lock = threading.Lock()
+
+
+def get_query_embedder(embeddings: Any) -> QueryEmbedder:
+    with _embedders_lock:
+        embedder = _embedders.get(id(embeddings))
+        if embedder is None or embedder.embeddings is not embeddings:
+            embedder = _embedders[id(embeddings)] = QueryEmbedder(
+                embeddings,
+                cache_size=settings.QUERY_EMBEDDING_CACHE_SIZE,
+                batch_window=settings.QUERY_EMBEDDING_BATCH_WINDOW,
+                max_batch=settings.QUERY_EMBEDDING_MAX_BATCH,
+            )
+        return embedder
+
+
+async def aembed_query(query: str, embeddings: Any) -> List[float]:
+    """캐시/배치를 거쳐 쿼리 임베딩을 비동기로 가져옵니다."""
+    with tracing.span("embed_query", "embedding"):
+        return await get_query_embedder(embeddings).aembed(query)
+
+
+def embed_query(query: str, embeddings: Any) -> List[float]:
+    """캐시를 거쳐 쿼리 임베딩을 동기로 가져옵니다."""
+    with tracing.span("embed_query", "embedding"):
+        return get_query_embedder(embeddings).embed(query)
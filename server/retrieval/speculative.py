@@ -0,0 +1,142 @@
+import time
+import uuid
+import asyncio
+import difflib
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from retrieval.cascade import CascadeResult
+from retrieval.query_embedder import normalize_query
+from utils import metrics, tracing
+
+logger = logging.getLogger(__name__)
+
+# --- 추측(speculative) 검색 ---
+# 검색은 쿼리 변환(LLM 호출)이 끝나야 시작되지만, 첫 질문처럼 채팅 이력이 없으면 변환된 쿼리가 원래 질문과 거의 같습니다.
+#   1. 쿼리 변환 노드가 LLM을 호출하는 동안 원래 질문으로 임베딩 → FAISS 검색 → Rerank를 미리 실행하고
+#   2. 변환된 쿼리가 도착하면 원래 질문과 충분히 비슷할 때(정규화 후 문자열 유사도) 그 결과를 그대로 사용합니다.
+#   3. 다르면 추측 결과를 버리고(진행 중인 Rerank는 다음 배치에서 중단) 변환된 쿼리로 다시 검색합니다.
+# 실행 중인 추측은 프로세스 내 레지스트리에 두고, 그래프 상태에는 ID(speculation_id)만 저장합니다. (체크포인터 직렬화 대상)
+# 채팅 스트림이 취소/실패하면 스트림 쪽에서 버리고, 그래도 남은 추측은 SPECULATION_TTL_SECONDS 후 정리합니다.
+
+SPECULATIONS = metrics.counter("rag_speculative_retrieval_total", "추측 검색 사용 결과", ["result"])
+SPECULATION_SAVED = metrics.histogram("rag_speculative_saved_seconds", "추측 검색 적중으로 줄어든 검색/Rerank 대기 시간")
+
+# 검색 노드에 도달하지 못한 추측을 레지스트리에서 제거하기까지의 시간 (초)
+SPECULATION_TTL_SECONDS = 120.0
+
+Retrieve = Callable[[str], Awaitable[Tuple[List[Document], List[float]]]]
+# (query, documents, scores, should_stop) -> CascadeResult
+Rerank = Callable[[str, List[Document], List[float], Callable[[], bool]], CascadeResult]
+
+
+class SpeculationDiscarded(Exception):
+    """버려진 추측의 Rerank를 중단할 때 사용"""
+
+
+class Speculation:
+    def __init__(self, query: str):
+        loop = asyncio.get_running_loop()
+        self.query = query
+        self.started_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+        self.needed_at: Optional[float] = None  # 변환된 쿼리가 도착하여 결과를 쓰기로 한 시점
+        self.retrieval: asyncio.Future = loop.create_future()  # (documents, scores)
+        self.rerank: asyncio.Future = loop.create_future()  # CascadeResult
+        self.task: Optional[asyncio.Task] = None
+        self.expiry: Optional[asyncio.TimerHandle] = None
+        self.discarded = False
+
+    async def run(self, retrieve: Retrieve, rerank: Rerank):
+        try:
+            with tracing.span("speculative_retrieval", "retrieval", query=self.query):
+                documents, scores = await retrieve(self.query)
+                self.retrieval.set_result((documents, scores))
+                result = await asyncio.to_thread(rerank, self.query, documents, scores, lambda: self.discarded)
+                self.rerank.set_result(result)
+        except asyncio.CancelledError:
+            for future in (self.retrieval, self.rerank):
+                future.cancel()
+            raise
+        except Exception as e:
+            for future in (self.retrieval, self.rerank):
+                if not future.done():
+                    future.set_exception(e)
+                    # 아무도 기다리지 않는 경우 "exception was never retrieved" 경고 방지
+                    future.exception()
+        finally:
+            self.finished_at = time.perf_counter()
+
+    def claim(self):
+        """변환된 쿼리와 일치하여 추측 결과를 사용하기로 한 시점을 기록합니다."""
+        self.needed_at = time.perf_counter()
+
+    def saved_seconds(self) -> float:
+        """
+        변환된 쿼리로 검색을 시작했어야 할 시점(needed_at)까지 이미 끝낸 추측 작업 시간입니다.
+        끝났으면 전체 소요 시간, 아직 진행 중이었으면 그때까지 진행한 시간만큼 대기가 줄어듭니다.
+        """
+        needed_at = self.needed_at if self.needed_at is not None else time.perf_counter()
+        finished = self.finished_at if self.finished_at is not None else needed_at
+        return max(min(finished, needed_at) - self.started_at, 0.0)
+
+
+_active: Dict[str, Speculation] = {}
+
+
+def start(query: str, retrieve: Retrieve, rerank: Rerank) -> str:
+    """원래 질문으로 검색 + Rerank를 백그라운드에서 시작하고 추측 ID를 반환합니다."""
+    loop = asyncio.get_running_loop()
+    speculation = Speculation(query)
+    speculation.task = loop.create_task(speculation.run(retrieve, rerank))
+    speculation_id = uuid.uuid4().hex
+    _active[speculation_id] = speculation
+    # 그래프가 검색 노드 전에 끝나 아무도 가져가지 않은 추측도 결국 정리되도록 함
+    speculation.expiry = loop.call_later(SPECULATION_TTL_SECONDS, discard, speculation_id, "expired")
+    return speculation_id
+
+
+def get(speculation_id: Optional[str]) -> Optional[Speculation]:
+    return _active.get(speculation_id) if speculation_id else None
+
+
+def finish(speculation_id: Optional[str]) -> Optional[Speculation]:
+    """추측 결과 사용을 마치고 레지스트리에서 제거합니다."""
+    speculation = _active.pop(speculation_id, None) if speculation_id else None
+    if speculation is not None and speculation.expiry is not None:
+        speculation.expiry.cancel()
+    return speculation
+
+
+def discard(speculation_id: Optional[str], result: str = "miss"):
+    """추측 결과를 버립니다. 진행 중인 Rerank는 다음 배치 전에 중단됩니다."""
+    speculation = finish(speculation_id)
+    if speculation is None:
+        return
+    speculation.discarded = True
+    if speculation.task is not None and not speculation.retrieval.done():
+        speculation.task.cancel()
+    if result == "expired":
+        logger.warning("사용되지 않은 추측 검색을 정리합니다.", extra={"query": speculation.query})
+    SPECULATIONS.inc(result=result)
+
+
+def queries_match(original: str, transformed: str, min_similarity: float) -> bool:
+    """정규화한 두 쿼리의 문자열 유사도(difflib ratio)가 min_similarity 이상이면 True"""
+    left, right = normalize_query(original), normalize_query(transformed)
+    if left == right:
+        return True
+    return difflib.SequenceMatcher(None, left, right).ratio() >= min_similarity
+
+
+def stop_if_discarded(predict: Callable[[Any], Any], should_stop: Callable[[], bool]) -> Callable[[Any], Any]:
+    """Cross-Encoder 배치마다 추측이 버려졌는지 확인하는 predict 래퍼"""
+
+    def wrapped(pairs):
+        if should_stop():
+            raise SpeculationDiscarded()
+        return predict(pairs)
+
+    return wrapped
@@ -1,10 +1,145 @@
-import streamlit as st
-from langchain_community.vectorstores import FAISS
-from typing import List, Dict, Any
-from langchain.schema import Document
+import os
+import time
+import heapq
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import List, Dict, Any, Optional, Sequence, Tuple, TYPE_CHECKING
+from langchain_core.documents import Document
 
+from utils import metrics, tracing
+from utils.config import settings
+from retrieval.query_embedder import aembed_query, embed_query
 
-def search_vector_store(query: str, vector_store: FAISS, k: int = 5) -> List[Document]:
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+
+logger = logging.getLogger(__name__)
+
+SHARD_SEARCH_DURATION = metrics.histogram("faiss_shard_search_seconds", "샤드별 FAISS 검색 시간", ["shard"])
+
+
+# --- 샤드 인덱스 (병렬 fan-out 검색) ---
+# 단일 FAISS 인덱스는 질문 하나를 한 코어에서 전부 훑습니다. (단건 검색은 FAISS 내부 병렬화 대상이 아님)
+# INDEX_SHARDS > 1이면 문서를 source(파일명) 해시 버킷별 인덱스(샤드)에 나눠 저장하고
+#   1. 질문 벡터로 모든 샤드를 스레드 풀에서 동시에 검색한 뒤 (FAISS 검색은 GIL을 놓으므로 코어 수만큼 병렬 실행)
+#   2. 샤드별로 정렬된 top-k를 힙 병합(heapq.merge)하여 전체 top-k를 고르고, 그 문서만 docstore에서 꺼냅니다.
+# 샤드는 따로 다시 만들 수 있습니다. (retrieval.index_registry 참고)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_search_executor(shard_count: int) -> ThreadPoolExecutor:
+    """샤드 검색용 스레드 풀 (프로세스 내 공유, INDEX_SEARCH_THREADS가 없으면 min(샤드 수, CPU 수))"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = settings.INDEX_SEARCH_THREADS or min(shard_count, os.cpu_count() or 1)
+            _executor = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="faiss-shard")
+        return _executor
+
+
+def search_index(index: Any, vector: Any, k: int) -> List[Tuple[float, int]]:
+    """FAISS 인덱스 하나를 검색하여 (점수, 인덱스 내 위치) 목록을 반환합니다. (점수 순서는 인덱스 metric 기준)"""
+    scores, positions = index.search(vector, k)
+    return [(float(score), int(position)) for score, position in zip(scores[0], positions[0]) if position != -1]
+
+
+def merge_top_k(results: Sequence[List[Tuple[float, int]]], k: int,
+                larger_is_better: bool = False) -> List[Tuple[float, int, int]]:
+    """
+    샤드별로 정렬된 검색 결과를 힙 병합하여 전체 top-k (점수, 샤드 번호, 인덱스 내 위치)를 반환합니다.
+    L2 거리는 작을수록, 내적은 클수록 가까운 문서입니다.
+    """
+    tagged = [[(score, shard, position) for score, position in result] for shard, result in enumerate(results)]
+    key = (lambda item: -item[0]) if larger_is_better else (lambda item: item[0])
+    return list(islice(heapq.merge(*tagged, key=key), k))
+
+
+def _larger_is_better(index: Any) -> bool:
+    import faiss
+
+    return index.metric_type == faiss.METRIC_INNER_PRODUCT
+
+
+class ShardedVectorStore:
+    """
+    여러 FAISS 샤드를 하나의 Vector Store처럼 검색합니다.
+    검색 코드(search_vector_store, asearch_with_scores 등)가 사용하는 LangChain FAISS 메서드만 구현합니다.
+    """
+
+    def __init__(self, shards: Dict[str, "FAISS"], executor: Optional[ThreadPoolExecutor] = None):
+        if not shards:
+            raise ValueError("샤드가 없습니다.")
+        self.names = list(shards)
+        self.shards = list(shards.values())
+        # 지정하지 않으면 프로세스 공유 스레드 풀 사용 (벤치마크에서 스레드 수를 바꿔 가며 측정할 때 지정)
+        self.executor = executor or get_search_executor(len(self.shards))
+        first = self.shards[0]
+        self.embedding_function = first.embedding_function
+        self.distance_strategy = first.distance_strategy
+        self._normalize_L2 = first._normalize_L2
+        self._larger_is_better = _larger_is_better(first.index)
+
+    @property
+    def ntotal(self) -> int:
+        return sum(shard.index.ntotal for shard in self.shards)
+
+    def _query_vector(self, embedding: List[float]):
+        import faiss
+        import numpy as np
+
+        vector = np.array([embedding], dtype=np.float32)
+        if self._normalize_L2:
+            faiss.normalize_L2(vector)
+        return vector
+
+    def _search_shard(self, shard_no: int, vector: Any, k: int) -> List[Tuple[float, int]]:
+        started = time.perf_counter()
+        try:
+            return search_index(self.shards[shard_no].index, vector, k)
+        finally:
+            SHARD_SEARCH_DURATION.observe(time.perf_counter() - started, shard=self.names[shard_no])
+
+    def _resolve(self, merged: List[Tuple[float, int, int]]) -> List[Tuple[Document, float]]:
+        results = []
+        for score, shard_no, position in merged:
+            shard = self.shards[shard_no]
+            doc = shard.docstore.search(shard.index_to_docstore_id[position])
+            if isinstance(doc, Document):
+                results.append((doc, score))
+        return results
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               **kwargs) -> List[Tuple[Document, float]]:
+        vector = self._query_vector(embedding)
+        if len(self.shards) == 1:
+            results = [self._search_shard(0, vector, k)]
+        else:
+            results = list(self.executor.map(lambda shard_no: self._search_shard(shard_no, vector, k), range(len(self.shards))))
+        return self._resolve(merge_top_k(results, k, self._larger_is_better))
+
+    async def asimilarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                                      **kwargs) -> List[Tuple[Document, float]]:
+        vector = self._query_vector(embedding)
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*(
+            loop.run_in_executor(self.executor, self._search_shard, shard_no, vector, k)
+            for shard_no in range(len(self.shards))
+        ))
+        return self._resolve(merge_top_k(results, k, self._larger_is_better))
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    async def asimilarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs) -> List[Document]:
+        return [doc for doc, _ in await self.asimilarity_search_with_score_by_vector(embedding, k)]
+
+
+def search_vector_store(query: str, vector_store: "FAISS", k: int = 5) -> List[Document]:
     """
     메모리에 로드된 FAISS Vector Store에서 Similarity Search를 수행합니다.
 
@@ -14,13 +149,64 @@ def search_vector_store(query: str, vector_store: FAISS, k: int = 5) -> List[Doc
     :return: Document 리스트
     """
     if not vector_store:
-        st.warning("Vector Store가 아직 준비되지 않았습니다. 문서를 업로드하세요.")
+        logger.warning("Vector Store가 아직 준비되지 않았습니다. 문서를 업로드하세요.")
         return []
 
     try:
-        # FAISS 인스턴스에서 직접 검색 수행
-        return vector_store.similarity_search(query, k=k)
+        # 쿼리 임베딩(캐시 사용)과 FAISS 검색을 나누어 실행하여 트레이스에서 각각의 시간을 확인할 수 있게 합니다.
+        embedding = embed_query(query, vector_store.embedding_function)
+        with tracing.span("faiss_search", "retrieval", k=k):
+            return vector_store.similarity_search_by_vector(embedding, k=k)
     except Exception as e:
         # Streamlit이 아닌 FastAPI B/E이므로 st.error 대신 print/logging 사용
-        print(f"Vector store 검색 중 오류 발생: {str(e)}")
-        return []
\ No newline at end of file
+        logger.exception("Vector store 검색 중 오류 발생: %s", e)
+        return []
+
+
+async def asearch_vector_store(query: str, vector_store: "FAISS", k: int = 5) -> List[Document]:
+    """
+    search_vector_store의 비동기 버전입니다.
+    쿼리 임베딩은 캐시/배치(retrieval.query_embedder)를 거쳐 비동기로 가져오고,
+    FAISS 검색은 실행기(스레드)에서 수행하여 이벤트 루프를 막지 않습니다.
+    """
+    if not vector_store:
+        logger.warning("Vector Store가 아직 준비되지 않았습니다. 문서를 업로드하세요.")
+        return []
+
+    try:
+        embedding = await aembed_query(query, vector_store.embedding_function)
+        with tracing.span("faiss_search", "retrieval", k=k):
+            return await vector_store.asimilarity_search_by_vector(embedding, k=k)
+    except Exception as e:
+        logger.exception("Vector store 검색 중 오류 발생: %s", e)
+        return []
+
+
+def to_similarity(vector_store: "FAISS", score: float) -> float:
+    """
+    FAISS 검색 점수를 '클수록 관련 있는' 코사인 유사도로 변환합니다.
+    기본(EUCLIDEAN) 인덱스는 제곱 L2 거리를 반환하며, 정규화된 벡터에서는 cos = 1 - d²/2 입니다.
+    """
+    strategy = getattr(getattr(vector_store, "distance_strategy", None), "value", "EUCLIDEAN_DISTANCE")
+    if strategy in ("MAX_INNER_PRODUCT", "DOT_PRODUCT"):
+        return float(score)
+    return 1.0 - float(score) / 2.0
+
+
+async def asearch_with_scores(query: str, vector_store: "FAISS", k: int = 5) -> List[Tuple[Document, float]]:
+    """
+    asearch_vector_store와 같지만 FAISS에 저장된 벡터로 계산한 유사도(1차 점수)를 함께 반환합니다.
+    (유사도 내림차순, Rerank 단계의 후보 가지치기에 사용)
+    """
+    if not vector_store:
+        logger.warning("Vector Store가 아직 준비되지 않았습니다. 문서를 업로드하세요.")
+        return []
+
+    try:
+        embedding = await aembed_query(query, vector_store.embedding_function)
+        with tracing.span("faiss_search", "retrieval", k=k):
+            results = await vector_store.asimilarity_search_with_score_by_vector(embedding, k=k)
+        return [(doc, to_similarity(vector_store, score)) for doc, score in results]
+    except Exception as e:
+        logger.exception("Vector store 검색 중 오류 발생: %s", e)
+        return []
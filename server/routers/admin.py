@@ -0,0 +1,69 @@
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+
+from utils import tracing
+from utils.config import settings
+
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """ADMIN_TOKEN이 설정되어 있으면 X-Admin-Token 헤더가 일치하는지 확인합니다."""
+    if settings.ADMIN_TOKEN and not secrets.compare_digest(x_admin_token or "", settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="관리자 토큰이 올바르지 않습니다.")
+
+
+# 운영/디버깅용 관리자 라우터
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(require_admin)],
+)
+
+
+def _loop_monitor(request: Request):
+    monitor = getattr(request.app.state, "loop_monitor", None)
+    if monitor is None:
+        raise HTTPException(status_code=404, detail="이벤트 루프 모니터가 꺼져 있습니다. (LOOP_MONITOR=true로 실행)")
+    return monitor
+
+
+@router.get("/loop", summary="이벤트 루프 지연 및 블로킹 호출 위치 조회")
+async def get_loop_report(request: Request, top: int = 20):
+    """
+    최근 이벤트 루프 지연 시간(p50/p95/p99)과, threshold 이상 루프를 막은 호출을
+    코드 위치별(횟수, 누적/최대 시간, 마지막 스택)로 누적 시간 순으로 반환합니다.
+    """
+    return _loop_monitor(request).report(top=top)
+
+
+@router.post("/loop/reset", summary="이벤트 루프 블로킹 집계 초기화")
+async def reset_loop_report(request: Request):
+    _loop_monitor(request).reset()
+    return {"detail": "초기화되었습니다."}
+
+
+def _trace_exporter():
+    if not settings.TRACING:
+        raise HTTPException(status_code=404, detail="요청 트레이스가 꺼져 있습니다. (TRACING=true로 실행)")
+    return tracing.get_exporter()
+
+
+@router.get("/traces", summary="최근 요청 트레이스 목록 조회")
+async def list_traces(limit: int = 20, min_duration_ms: float = 0.0):
+    """이 워커가 최근 기록한 트레이스 요약을 최신 순으로 반환합니다. (min_duration_ms 이상만)"""
+    summaries = [trace.summary() for trace in reversed(_trace_exporter().recent)]
+    summaries = [item for item in summaries if (item["duration_ms"] or 0) >= min_duration_ms]
+    return summaries[:limit]
+
+
+@router.get("/traces/{trace_id}", summary="요청 트레이스 상세 조회")
+async def get_trace(trace_id: str, format: str = "json"):
+    """
+    트레이스의 span 목록을 반환합니다.
+    format=chrome이면 chrome://tracing / Perfetto에서 바로 열 수 있는 Chrome trace 형식으로 반환합니다.
+    """
+    trace = _trace_exporter().find(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="트레이스를 찾을 수 없습니다. (다른 워커이거나 보관 기간이 지났습니다)")
+    return trace.to_chrome() if format == "chrome" else trace.to_dict()
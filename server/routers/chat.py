@@ -1,3 +1,4 @@
+import logging
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session, joinedload
 from typing import List
@@ -5,6 +6,9 @@ from typing import List
 from db.database import get_db
 from db.models import ChatSession, ChatMessage
 from db.schemas import ChatSessionSchema, ChatSessionCreate, ChatMessageSchema
+from workflow.checkpointer import delete_thread
+
+logger = logging.getLogger(__name__)
 
 # /api/v1/chats 경로로 라우터 설정
 router = APIRouter(
@@ -86,6 +90,11 @@ def delete_chat_session(chat_id: int, db: Session = Depends(get_db)):
 
         db.delete(session)
         db.commit()
+        # 세션 ID가 재사용되어도 이전 대화 상태가 섞이지 않도록 LangGraph 체크포인트도 삭제
+        try:
+            delete_thread(str(chat_id))
+        except Exception as e:
+            logger.warning("체크포인트 삭제 실패 (다음 턴에 이력을 다시 동기화함): %s", e)
         return {"detail": "채팅 세션이 성공적으로 삭제되었습니다."}
     except Exception as e:
         db.rollback()
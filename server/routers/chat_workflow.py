@@ -1,17 +1,45 @@
-import json
+import logging
 import asyncio
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 
-from db.database import get_db
+from db.database import get_db, SessionLocal
 from db.models import ChatMessage, ChatSession
+from retrieval import speculative
 
+from utils import metrics, tracing
+from utils.admission import AdmissionController, AdmissionLease
+from utils.config import settings
+from utils.sse import SSEStreamEncoder
 from workflow.graph import get_graph_app # 컴파일된 그래프 인스턴스를 가져옵니다.
+from workflow.events import GraphEventStream
+from workflow.instrumentation import LLMMetricsCallback
+from workflow.checkpointer import CHECKPOINT_HISTORY, prune_thread
 from langchain_core.messages import HumanMessage, AIMessage
 
+logger = logging.getLogger(__name__)
+
+# 스트림 결과 메트릭 (status: completed / cancelled / error)
+CHAT_STREAMS = metrics.counter("chat_streams_total", "채팅 스트림 처리 결과", ["status"])
+# 클라이언트 이탈로 버려진(취소 전까지 생성된) 토큰 수
+CANCELLED_TOKENS = metrics.counter("chat_stream_cancelled_tokens_total", "취소된 스트림에서 생성된 토큰 수")
+
+# 중단된 부분 답변을 저장할 때 덧붙이는 안내 문구
+CANCELLED_ANSWER_SUFFIX = "\n\n(응답 생성이 중단되었습니다.)"
+
+# 채팅 스트림 승인 제어기 (전체 동시 실행 수 / 세션별 한도 / 대기열)
+admission_controller = AdmissionController(
+    max_concurrency=settings.CHAT_MAX_CONCURRENCY,
+    max_per_session=settings.CHAT_MAX_PER_SESSION,
+    max_queue=settings.CHAT_MAX_QUEUE,
+    queue_timeout=settings.CHAT_QUEUE_TIMEOUT,
+    retry_after=settings.CHAT_RETRY_AFTER,
+)
+
 # /api/v1/chat 경로로 라우터 설정
 router = APIRouter(
     prefix="/api/v1/chat",
@@ -48,6 +76,76 @@ def format_db_history_to_langchain(history: List[Dict[str, str]]) -> List:
     return messages
 
 
+_ROLE_TYPES = {"user": "human", "assistant": "ai"}
+
+
+async def load_turn_messages(compiled_graph, config: Dict[str, Any], session_id: int, db: Session) -> Tuple[List, str]:
+    """
+    이번 턴에 그래프에 넘길 전체 대화 이력(LangChain 메시지)과 로드 방식을 반환합니다.
+    체크포인트에 이전 턴까지의 이력이 있으면 DB에서는 그 마지막 메시지 이후에 추가된 메시지만 읽어 이어 붙이고,
+    체크포인트가 없거나 DB와 어긋나면(취소된 부분 답변, 세션 ID 재사용 등) 전체 이력을 다시 읽습니다.
+    """
+    cached = []
+    if compiled_graph.checkpointer is not None:
+        snapshot = await compiled_graph.aget_state(config)
+        cached = list(snapshot.values.get("messages") or [])
+
+    if cached:
+        # 체크포인트의 마지막 메시지 위치부터 읽어 DB와 같은 메시지인지 확인
+        rows = (
+            db.query(ChatMessage)
+            .filter(ChatMessage.session_id == session_id)
+            .order_by(ChatMessage.created_at.asc())
+            .offset(len(cached) - 1)
+            .all()
+        )
+        last = cached[-1]
+        if len(rows) > 1 and _ROLE_TYPES.get(rows[0].role) == last.type and rows[0].content == last.content:
+            CHECKPOINT_HISTORY.inc(result="incremental")
+            tail = [{"role": row.role, "content": row.content} for row in rows[1:]]
+            return cached + format_db_history_to_langchain(tail), "incremental"
+
+    CHECKPOINT_HISTORY.inc(result="full")
+    return format_db_history_to_langchain(get_chat_history_messages(session_id, db)), "full"
+
+
+def handle_cancelled_stream(session_id: int, graph_stream: GraphEventStream):
+    """
+    취소된 스트림의 부분 답변을 저장하고 취소 메트릭을 기록합니다.
+    요청 DB 세션은 이미 닫혔을 수 있으므로 별도의 세션을 사용합니다.
+    """
+    CHAT_STREAMS.inc(status="cancelled")
+    CANCELLED_TOKENS.inc(graph_stream.token_count)
+    logger.info("클라이언트 이탈로 스트림 취소", extra={"session_id": session_id, "tokens": graph_stream.token_count})
+
+    partial_answer = graph_stream.partial_answer
+    if not partial_answer:
+        return
+
+    db = SessionLocal()
+    try:
+        db.add(ChatMessage(
+            session_id=session_id,
+            role="assistant",
+            content=partial_answer + CANCELLED_ANSWER_SUFFIX,
+        ))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.exception("Error saving partial assistant message: %s", e)
+    finally:
+        db.close()
+
+
+async def release_on_close(stream, lease: AdmissionLease):
+    """스트림이 정상 종료/취소/오류로 끝나면 승인 슬롯을 반납합니다."""
+    try:
+        async for frame in stream:
+            yield frame
+    finally:
+        lease.release()
+
+
 async def langgraph_stream_generator(
         session_id: int,
         user_prompt: str,
@@ -55,109 +153,121 @@ async def langgraph_stream_generator(
 ):
     """
     LangGraph를 비동기 스트리밍으로 실행하고,
-    프론트엔드가 이해하는 SSE 형식으로 변환하여 yield합니다.
+    (이벤트 타입, 데이터) 형태의 스트림 이벤트(workflow.events 참고)를 yield합니다.
+    SSE 직렬화와 토큰 합치기(coalescing)는 utils.sse.SSEStreamEncoder가 담당합니다.
     """
 
     # 1. 사용자 질문 DB에 저장 (기존과 동일)
     try:
-        user_message = ChatMessage(session_id=session_id, role="user", content=user_prompt)
-        db.add(user_message)
-        db.commit()
-        db.refresh(user_message)  # ID를 받아옴
+        with tracing.span("db.save_user_message", "db"):
+            user_message = ChatMessage(session_id=session_id, role="user", content=user_prompt)
+            db.add(user_message)
+            db.commit()
+            db.refresh(user_message)  # ID를 받아옴
     except Exception as e:
         db.rollback()
-        print(f"Error saving user message: {e}")
-        error_data = {"type": "error", "data": f"사용자 메시지 저장 실패: {e}"}
-        yield f"data: {json.dumps(error_data, ensure_ascii=False)}\n\n"
+        logger.exception("Error saving user message: %s", e)
+        yield "error", f"사용자 메시지 저장 실패: {e}"
         return
 
     # 2. 그래프 실행 준비
     compiled_graph = get_graph_app()
     if compiled_graph is None:
-        print("치명적 오류: LangGraph가 컴파일되지 않았습니다.")
-        error_data = {"type": "error", "data": "서버 그래프 엔진이 준비되지 않았습니다."}
-        yield f"data: {json.dumps(error_data, ensure_ascii=False)}\n\n"
+        logger.critical("LangGraph가 컴파일되지 않았습니다.")
+        yield "error", "서버 그래프 엔진이 준비되지 않았습니다."
         return
 
-    # 3. 채팅 이력 조회 및 변환
-    history_dicts = get_chat_history_messages(session_id, db)
-    # LangChain BaseMessage 객체 리스트로 변환 (DB에 방금 저장한 user_message 포함)
-    messages = format_db_history_to_langchain(history_dicts)
+    # LangGraph는 상태를 저장/로드하기 위한 'thread_id'가 필요합니다.
+    # 여기서는 DB의 session_id를 사용합니다. (체크포인터가 thread별 대화 상태를 저장)
+    thread_id = str(session_id)
+    config = {
+        "configurable": {"thread_id": thread_id},
+        # LLM 호출별 지연 시간/첫 토큰 시간/토큰 사용량을 메트릭으로 기록
+        "callbacks": [LLMMetricsCallback()],
+    }
+    # 요청 트레이스가 활성화되어 있으면 노드/LLM 호출을 span으로 기록
+    trace = tracing.current_trace()
+    if trace is not None:
+        config["callbacks"].append(tracing.TracingCallback(trace))
+    # LANGFUSE=true이면 Langfuse로도 전송 (세션 단위로 묶어서 조회)
+    langfuse_handler = tracing.get_langfuse_handler()
+    if langfuse_handler is not None:
+        config["callbacks"].append(langfuse_handler)
+        config["metadata"] = {"langfuse_session_id": thread_id}
+
+    # 3. 채팅 이력 조회 및 변환 (체크포인트가 있으면 새로 추가된 메시지만 DB에서 읽음)
+    with tracing.span("db.load_history", "db") as history_span:
+        # LangChain BaseMessage 객체 리스트 (DB에 방금 저장한 user_message 포함)
+        messages, history_mode = await load_turn_messages(compiled_graph, config, session_id, db)
+        if history_span is not None:
+            history_span.attributes.update(messages=len(messages), mode=history_mode)
 
     # 4. 그래프 초기 상태 정의
+    # 체크포인트에 남은 이전 턴의 값이 섞이지 않도록 턴마다 새로 채워지는 값은 초기화합니다.
     initial_state = {
         "messages": messages,
-        "original_query": user_prompt
+        "original_query": user_prompt,
+        "transformed_query": None,
+        "intent": None,
+        "documents": None,
+        "retrieval_scores": None,
+        "speculation_id": None,
+        "answer": "",
     }
 
-    # LangGraph는 상태를 저장/로드하기 위한 'thread_id'가 필요합니다.
-    # 여기서는 DB의 session_id를 사용합니다.
-    config = {"configurable": {"thread_id": str(session_id)}}
-
     # 5. LangGraph 스트리밍 실행
-    full_response = ""
-    last_yielded_answer = ""
+    # 토큰은 stream_mode="messages"로, 단계 진행 상황은 stream_mode="updates"로 받아
+    # 타입이 정해진 이벤트(workflow.events)로 그대로 전달합니다.
+    graph_stream = GraphEventStream(compiled_graph, initial_state, config)
     try:
-        # app.astream()은 그래프의 각 노드에서 발생하는 이벤트를 스트리밍합니다.
-        async for event in compiled_graph.astream(initial_state, config=config):
-
-            # 우리는 '답변 생성 노드' (generate_rag_answer 또는 generate_normal_answer)
-            # 에서 나오는 스트리밍 '청크(chunk)'에만 관심이 있습니다.
-
-            event_data_key = None
-            if "generate_rag_answer" in event:
-                event_data_key = "generate_rag_answer"
-            elif "generate_normal_answer" in event:
-                event_data_key = "generate_normal_answer"
-
-            if event_data_key:
-                # --- 수정된 부분: 'chunk.content' 대신 'chunk_data["answer"]'를 확인 ---
-                # event[event_data_key]는 nodes.py에서 yield한 dict입니다: {"answer": "..."}
-                chunk_data = event[event_data_key]
-
-                # 'answer' 키가 있고, 내용이 있는지 확인
-                if "answer" in chunk_data and chunk_data["answer"]:
-                    chunk_content = chunk_data["answer"]
-
-                    # nodes.py에서 마지막 yield는 '전체 응답'입니다.
-                    # 스트리밍 청크는 '누적'되고, 마지막 청크는 '전체'입니다.
-                    # '전체 응답'이 '누적된 청크'와 다르다면, 이것이 새로운 '청크'입니다.
-                    if chunk_content != last_yielded_answer:
-                        # 프론트엔드에 보낼 실제 청크 (전체 응답에서 이전 응답을 뺀 값)
-                        sse_chunk = chunk_content[len(last_yielded_answer):]
-                        last_yielded_answer = chunk_content  # 마지막 응답 업데이트
-
-                        # 프론트엔드가 요구하는 SSE 형식으로 변환하여 yield
-                        sse_data = {"type": "update", "data": {"content": sse_chunk}}
-                        yield f"data: {json.dumps(sse_data, ensure_ascii=False)}\n\n"
-                        await asyncio.sleep(0.01)  # 이벤트 전송 간 약간의 텀
+        async for event in graph_stream:
+            yield event
+
+    except (asyncio.CancelledError, GeneratorExit):
+        # 클라이언트 이탈로 스트림이 취소된 경우:
+        # 그래프(및 LLM 스트림)를 닫고, 그때까지 생성된 부분 답변을 저장한 뒤 취소를 전파합니다.
+        await graph_stream.aclose()
+        # 검색 노드에 도달하기 전에 멈췄다면 백그라운드 추측 검색/Rerank도 중단
+        speculative.discard(graph_stream.speculation_id, result="aborted")
+        handle_cancelled_stream(session_id, graph_stream)
+        raise
 
     except Exception as e:
-        print(f"LangGraph 스트리밍 중 오류 발생: {e}")
-        error_data = {"type": "error", "data": f"LLM 스트리밍 실패: {e}"}
-        yield f"data: {json.dumps(error_data, ensure_ascii=False)}\n\n"
+        logger.exception("LangGraph 스트리밍 중 오류 발생: %s", e)
+        speculative.discard(graph_stream.speculation_id, result="aborted")
+        CHAT_STREAMS.inc(status="error")
+        yield "error", f"LLM 스트리밍 실패: {e}"
         return
 
+    full_response = graph_stream.answer
+
     # 6. LLM 전체 응답 DB에 저장
     try:
-        if last_yielded_answer:
-            assistant_message = ChatMessage(session_id=session_id, role="assistant", content=last_yielded_answer)
-            db.add(assistant_message)
-            db.commit()
+        if full_response:
+            with tracing.span("db.save_assistant_message", "db"):
+                assistant_message = ChatMessage(session_id=session_id, role="assistant", content=full_response)
+                db.add(assistant_message)
+                db.commit()
     except Exception as e:
         db.rollback()
-        print(f"Error saving assistant message: {e}")
-        error_data = {"type": "error", "data": f"AI 응답 저장 실패: {e}"}
-        yield f"data: {json.dumps(error_data, ensure_ascii=False)}\n\n"
+        logger.exception("Error saving assistant message: %s", e)
+        yield "error", f"AI 응답 저장 실패: {e}"
+
+    # 7. 이전 턴의 중간 체크포인트 정리 (다음 턴에는 마지막 상태만 필요)
+    try:
+        await prune_thread(thread_id)
+    except Exception as e:
+        logger.warning("체크포인트 정리 실패: %s", e)
 
-    # 7. 스트림 종료
-    event_data = {"type": "end", "data": {"full_response": full_response}}
-    yield f"data: {json.dumps(event_data, ensure_ascii=False)}\n\n"
+    # 8. 스트림 종료
+    CHAT_STREAMS.inc(status="completed")
+    yield "end", {"full_response": full_response}
 
 
 @router.post("/stream", summary="채팅 스트림 (RAG + LLM)")
 async def stream_chat(
         chat_request: ChatRequest,
+        request: Request,
         db: Session = Depends(get_db)
 ):
     """
@@ -170,10 +280,38 @@ async def stream_chat(
     if not session:
         raise HTTPException(status_code=404, detail="존재하지 않는 채팅 세션입니다.")
 
+    # 승인 제어: 슬롯이 없으면 대기하거나 429/503(Retry-After)으로 즉시 거절됩니다.
+    lease = await admission_controller.acquire(str(chat_request.session_id))
+
     generator = langgraph_stream_generator(
         session_id=chat_request.session_id,
         user_prompt=chat_request.topic,
         db=db
     )
 
-    return StreamingResponse(generator, media_type="text/event-stream")
\ No newline at end of file
+    encoder = SSEStreamEncoder(
+        flush_interval=settings.SSE_FLUSH_INTERVAL,
+        max_buffer_bytes=settings.SSE_MAX_BUFFER_BYTES,
+        heartbeat_interval=settings.SSE_HEARTBEAT_INTERVAL,
+        is_disconnected=request.is_disconnected,
+        # 채팅 한 턴의 타임라인 (TRACING=false이거나 샘플링되지 않으면 None)
+        trace=tracing.start_trace("chat_turn", session_id=chat_request.session_id),
+    )
+
+    return StreamingResponse(
+        release_on_close(encoder.stream(generator), lease),
+        media_type="text/event-stream",
+        # 프록시(nginx 등)의 응답 버퍼링을 끄고 캐시하지 않도록 지정
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # 스트림이 시작되지 못한 경우에도 슬롯이 반납되도록 보조 처리
+        background=BackgroundTask(lease.release),
+    )
+
+
+@router.get("/admission", summary="채팅 스트림 승인 제어 상태 조회")
+async def get_admission_stats():
+    """
+    현재 실행 중인 스트림 수, 대기열 깊이, 평균/최대 대기 시간 등
+    승인 제어기의 상태를 반환합니다.
+    """
+    return admission_controller.stats()
\ No newline at end of file
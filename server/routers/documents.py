@@ -1,16 +1,24 @@
 import os
-import shutil
+import asyncio
+import logging
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request
 
 from typing import List
 
 # Vector DB 및 PDF 처리 함수 import
-from processing import parse_pdf_to_markdown, load_md_documents, build_persistent_vector_store, PDF_FOLDER_PATH
-from processing import MD_FOLDER_PATH, VECTOR_STORE_PATH
+from processing import parse_pdf_to_markdown, load_md_documents
+from processing import MD_FOLDER_PATH
+from pdf_store import UploadTooLarge, find_ingested, record_ingested, save_upload
+from retrieval.index_registry import publish_vector_store, shards_for_sources
 
-from utils.config import get_embeddings
+from utils import metrics
+from utils.config import get_embeddings, settings
 from workflow.graph import get_compiled_graph
 
+logger = logging.getLogger(__name__)
+
+DOCUMENT_UPLOADS = metrics.counter("document_uploads_total", "PDF 업로드 처리 결과", ["result"])
+
 # /api/v1/documents 경로로 라우터 설정
 router = APIRouter(
     prefix="/api/v1/documents",
@@ -26,67 +34,100 @@ async def upload_document(
 ):
     """
     PDF 파일을 업로드합니다.
-    1. PDF를 'server/pdf/'에 저장합니다.
+    1. PDF를 청크 단위로 받아 'server/pdf/<sha256>.pdf'에 저장합니다. (크기 제한 초과 시 413)
+       같은 내용의 PDF가 이미 인덱싱되어 있으면 파싱/재구축 없이 바로 응답합니다.
     2. PDF를 마크다운으로 파싱하여 'server/md/'에 저장합니다.
-    3. 'server/md/' 폴더 전체를 다시 읽어 Vector Store를 재구축하고 저장합니다.
+    3. 'server/md/' 폴더 전체를 다시 읽어 Vector Store를 새 버전으로 재구축하고 저장합니다.
     4. 재구축된 Vector Store를 app.state.vector_store에 업데이트합니다.
     """
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="PDF 파일만 업로드할 수 있습니다.")
 
-    # 1. PDF 파일 저장
-    pdf_filename = file.filename
-    pdf_path = os.path.join(PDF_FOLDER_PATH, pdf_filename)
+    # Content-Length로 명백히 큰 요청은 본문을 읽기 전에 거절 (multipart 헤더 여유분 포함)
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.UPLOAD_MAX_BYTES + 64 * 1024:
+        DOCUMENT_UPLOADS.inc(result="too_large")
+        raise HTTPException(status_code=413, detail=str(UploadTooLarge(settings.UPLOAD_MAX_BYTES)))
 
+    # 1. PDF 파일 저장 (청크 단위로 쓰면서 해시 계산)
+    try:
+        stored = await save_upload(file, settings.UPLOAD_MAX_BYTES, settings.UPLOAD_CHUNK_SIZE)
+    except UploadTooLarge as e:
+        DOCUMENT_UPLOADS.inc(result="too_large")
+        raise HTTPException(status_code=413, detail=str(e))
+
+    base_filename = os.path.splitext(os.path.basename(file.filename))[0]
+    md_filename = base_filename + ".md"
+
+    ingested = await asyncio.to_thread(find_ingested, stored.sha256, MD_FOLDER_PATH)
+    if ingested is not None:
+        DOCUMENT_UPLOADS.inc(result="duplicate")
+        logger.info("이미 인덱싱된 PDF입니다: %s (sha256=%s)", file.filename, stored.sha256)
+        return {
+            "filename": file.filename,
+            "md_path": os.path.join(MD_FOLDER_PATH, ingested["md_filename"]),
+            "sha256": stored.sha256,
+            "duplicate": True,
+            "detail": f"이미 인덱싱된 문서입니다. ('{ingested['filename']}')",
+        }
+
+    # 파싱/임베딩/FAISS 구축(및 재구축 잠금 대기)은 오래 걸리므로 스레드에서 실행합니다.
+    # (이벤트 루프를 막으면 진행 중인 채팅 SSE 스트림이 모두 멈춤)
+    # 앱 상태와 그래프 교체는 이벤트 루프에서 적용합니다.
     try:
-        # 파일을 바이트로 읽기 (processing.py의 parse_pdf_to_markdown이 바이트를 받음)
-        pdf_bytes = await file.read()
-
-        # 디스크에도 저장
-        with open(pdf_path, "wb") as f:
-            f.write(pdf_bytes)
-
         # 2. PDF -> 마크다운 파싱 및 저장
-        base_filename = os.path.splitext(pdf_filename)[0]
-        md_filename = base_filename + ".md"
-        md_path = parse_pdf_to_markdown(pdf_path, md_filename)
+        md_path = await asyncio.to_thread(parse_pdf_to_markdown, stored.path, md_filename, stored.sha256)
 
         if not md_path:
             raise HTTPException(status_code=500, detail="PDF 파싱 중 오류가 발생했습니다.")
 
         # 3. Vector Store 재구축
-        print(f"'{MD_FOLDER_PATH}'에서 모든 문서를 로드하여 Vector Store 재구축 중...")
+        logger.info("'%s'에서 모든 문서를 로드하여 Vector Store 재구축 중...", MD_FOLDER_PATH)
         embeddings = get_embeddings()
-        documents = load_md_documents(MD_FOLDER_PATH)
+        documents = await asyncio.to_thread(load_md_documents, MD_FOLDER_PATH)
 
         if not documents:
             # 유일한 문서가 파싱 실패한 경우
             request.app.state.vector_store = None
-            print("재구축할 문서가 없습니다. Vector Store를 비웁니다.")
+            logger.warning("재구축할 문서가 없습니다. Vector Store를 비웁니다.")
             return {"filename": file.filename, "detail": "문서 파싱에 성공했으나, Vector Store에 추가할 콘텐츠가 없습니다."}
 
-        # 기존 Vector Store가 있다면 삭제 후 새로 생성
-        if os.path.exists(VECTOR_STORE_PATH):
-            shutil.rmtree(VECTOR_STORE_PATH)
-
-        new_vector_store = build_persistent_vector_store(documents, VECTOR_STORE_PATH, embeddings)
+        # 새 버전 디렉터리에 구축하고 CURRENT.json 포인터를 교체합니다.
+        # (다른 워커들은 포인터 변경을 감지하여 새 버전을 다시 로드합니다)
+        # 샤드를 쓰면 업로드한 문서가 속한 샤드만 다시 임베딩합니다.
+        # 이 워커의 감시자가 포인터 교체 직후 같은 버전을 다시 로드하지 않도록 교체 전에 버전을 기록합니다.
+        new_vector_store, index_info = await asyncio.to_thread(
+            publish_vector_store, documents, embeddings, shards=shards_for_sources([md_filename]),
+            on_publish=request.app.state.index_watcher.mark_loaded,
+        )
 
         # 4. 앱 상태(메모리)의 Vector Store 업데이트
         request.app.state.vector_store = new_vector_store
-        print("Vector Store 재구축 및 앱 상태 업데이트 완료.")
+        request.app.state.index_version = index_info["version"]
+        await asyncio.to_thread(record_ingested, stored, file.filename, md_filename)
+        DOCUMENT_UPLOADS.inc(result="indexed")
+        logger.info("Vector Store 재구축 및 앱 상태 업데이트 완료.")
 
         # 5. LangGraph 재컴파일
         try:
             get_compiled_graph(new_vector_store)
-            print("LangGraph가 새 Vector Store로 재컴파일되었습니다.")
+            logger.info("LangGraph가 새 Vector Store로 재컴파일되었습니다.")
         except Exception as e:
-            print(f"LangGraph 재컴파일 중 오류 발생: {e}")
+            logger.exception("LangGraph 재컴파일 중 오류 발생: %s", e)
             # 오류가 발생해도 일단 업로드는 성공으로 처리하되, 로깅
             pass
-        return {"filename": file.filename, "md_path": md_path, "detail": "업로드 및 Vector Store 재구축 성공"}
-
+        return {
+            "filename": file.filename,
+            "md_path": md_path,
+            "sha256": stored.sha256,
+            "duplicate": False,
+            "detail": "업로드 및 Vector Store 재구축 성공",
+        }
+
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"파일 업로드 처리 중 오류 발생: {e}")
+        logger.exception("파일 업로드 처리 중 오류 발생: %s", e)
         raise HTTPException(status_code=500, detail=f"파일 처리 중 오류: {str(e)}")
 
 
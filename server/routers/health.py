@@ -0,0 +1,33 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from utils import components
+
+# 상태 확인(헬스 체크) 라우터
+router = APIRouter(
+    prefix="/health",
+    tags=["health"],
+)
+
+
+@router.get("/live", summary="Liveness 확인")
+async def liveness():
+    """
+    프로세스가 살아 있고 이벤트 루프가 응답하는지만 확인합니다.
+    무거운 컴포넌트의 로딩 여부와 관계없이 즉시 응답합니다.
+    """
+    return {"status": "alive"}
+
+
+@router.get("/ready", summary="Readiness 확인")
+async def readiness():
+    """
+    DB, Vector Store, LangGraph 초기화가 끝나 요청을 처리할 준비가 되었는지 확인합니다.
+    준비되지 않았다면 503을 반환합니다. (로드 밸런서가 트래픽을 보내지 않도록)
+    """
+    body = {
+        "status": "ready" if components.is_ready() else "starting",
+        "checks": components.readiness(),
+        "components": components.status(),
+    }
+    return JSONResponse(status_code=200 if components.is_ready() else 503, content=body)
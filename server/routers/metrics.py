@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from utils import metrics
+
+# Prometheus 스크레이프용 라우터
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", summary="Prometheus 메트릭", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    노드별 소요 시간, LLM 토큰/TTFT, 검색/Rerank 후보 수, 캐시 적중, DB 지연 시간 등
+    프로세스 내 메트릭을 Prometheus 텍스트 포맷으로 반환합니다.
+    (멀티 워커 모드에서는 요청을 처리한 워커의 값입니다)
+    """
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,107 @@
+"""
+서버 모듈 import 시간 예산 검사 스크립트
+
+`python -X importtime`으로 서버 진입 모듈(main)을 새 프로세스에서 import 하여
+- 전체 누적 import 시간이 예산(--budget-ms)을 넘는지
+- torch, sentence_transformers 등 지연 로딩해야 할 무거운 모듈이 import 시점에 로드되는지
+를 검사합니다. 위반 시 종료 코드 1을 반환하므로 CI에서 그대로 사용할 수 있습니다.
+
+사용법 (server 디렉터리에서):
+    python -m tools.check_import_time --budget-ms 1500
+"""
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 서버 import 시점에 로드되면 안 되는 모듈 (각 기능이 처음 사용될 때 import 되어야 함)
+FORBIDDEN_MODULES = [
+    "torch",
+    "sentence_transformers",
+    "transformers",
+    "pymupdf4llm",
+    "unstructured",
+    "faiss",
+    "sklearn",
+    "langchain_openai",
+    "streamlit",
+]
+
+# Settings의 필수 환경 변수 (.env가 없는 CI 환경에서 import만 검사하기 위한 더미 값)
+DUMMY_ENV = {
+    "AOAI_API_KEY": "dummy",
+    "AOAI_ENDPOINT": "https://dummy.openai.azure.com/",
+    "AOAI_DEPLOY_GPT4O": "dummy",
+    "AOAI_DEPLOY_EMBED_3_LARGE": "dummy",
+    "AOAI_API_VERSION": "2024-10-21",
+    "LANGFUSE": "false",
+    "LANGFUSE_PUBLIC_KEY": "dummy",
+    "LANGFUSE_SECRET_KEY": "dummy",
+    "LANGFUSE_BASE_URL": "http://localhost",
+    "API_BASE_URL": "http://localhost:8000/api/v1",
+}
+
+_LINE_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure_imports(module: str):
+    """새 인터프리터에서 module을 import 하고 (모듈명, self_us, cumulative_us, depth) 목록을 반환합니다."""
+    env = dict(DUMMY_ENV)
+    env.update(os.environ)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SERVER_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        # importtime 출력 외의 실제 오류 메시지만 보여줍니다.
+        errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"'{module}' import 실패:\n" + "\n".join(errors))
+
+    entries = []
+    for line in result.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return entries
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="서버 import 시간 예산 검사")
+    parser.add_argument("--module", default="main", help="검사할 진입 모듈 (기본값: main)")
+    parser.add_argument("--budget-ms", type=float, default=1500.0, help="누적 import 시간 예산(ms)")
+    parser.add_argument("--top", type=int, default=15, help="출력할 느린 모듈 개수")
+    args = parser.parse_args()
+
+    entries = measure_imports(args.module)
+    imported = {name for name, _, _, _ in entries}
+    # -X importtime은 최상위 import(들여쓰기 0)의 누적 시간을 각각 출력합니다.
+    total_ms = sum(cumulative for _, _, cumulative, depth in entries if depth == 0) / 1000
+
+    print(f"'{args.module}' import 누적 시간: {total_ms:.1f}ms (예산: {args.budget_ms:.0f}ms)")
+    print(f"느린 모듈 상위 {args.top}개 (누적 기준):")
+    for name, _, cumulative, _ in sorted(entries, key=lambda e: e[2], reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:8.1f}ms  {name}")
+
+    failed = False
+    loaded_forbidden = [m for m in FORBIDDEN_MODULES if m in imported]
+    if loaded_forbidden:
+        failed = True
+        print(f"실패: import 시점에 로드되면 안 되는 모듈이 로드되었습니다: {', '.join(loaded_forbidden)}")
+    if total_ms > args.budget_ms:
+        failed = True
+        print(f"실패: import 시간이 예산을 초과했습니다. ({total_ms:.1f}ms > {args.budget_ms:.0f}ms)")
+
+    if not failed:
+        print("통과")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
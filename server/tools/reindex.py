@@ -0,0 +1,98 @@
+"""
+인덱스 재구축 스크립트
+
+청크 분할/임베딩 설정을 바꾼 뒤 업로드된 PDF 전체로 Vector Store를 다시 만듭니다.
+- data/pdf/manifest.json에 기록된 PDF를 변환 캐시(data/parse_cache)를 거쳐 Markdown으로 다시 만들고
+  (PDF 내용, pymupdf4llm 버전, 변환 옵션이 같으면 PDF 변환을 다시 실행하지 않음)
+- MD 폴더 전체로 새 버전의 인덱스를 게시합니다. (실행 중인 워커는 CURRENT.json 변경을 감지하여 다시 로드)
+
+사용법 (server 디렉터리에서):
+    python -m tools.reindex
+    python -m tools.reindex --prune-cache   # 더 이상 쓰지 않거나 버전이 맞지 않는 캐시 항목 정리
+    python -m tools.reindex --skip-index    # Markdown만 다시 만들기
+    python -m tools.reindex --shard shard-03 --shard shard-07   # INDEX_SHARDS > 1일 때 지정한 샤드만 재구축
+    python -m tools.reindex --source 모집요강.md                 # 파일이 속한 샤드만 재구축
+"""
+import os
+import sys
+import time
+import argparse
+
+
+def regenerate_markdown(md_folder: str) -> dict:
+    """manifest의 PDF마다 변환 캐시를 거쳐 MD 파일을 다시 씁니다."""
+    from parse_cache import parse_pdf
+    from pdf_store import pdf_path_for, read_manifest
+
+    os.makedirs(md_folder, exist_ok=True)
+    stats = {"pdfs": 0, "cache_hits": 0, "converted": 0, "missing": 0}
+    for sha256, entry in read_manifest().items():
+        pdf_path = pdf_path_for(sha256)
+        if not os.path.exists(pdf_path):
+            print(f"  PDF 없음, 건너뜀: {entry['filename']} ({sha256[:12]})")
+            stats["missing"] += 1
+            continue
+        parsed = parse_pdf(pdf_path, sha256)
+        with open(os.path.join(md_folder, entry["md_filename"]), "w", encoding="utf-8") as f:
+            f.write(parsed.markdown)
+        stats["pdfs"] += 1
+        stats["cache_hits" if parsed.cached else "converted"] += 1
+        print(f"  {entry['md_filename']}: {parsed.pages}페이지 ({'캐시' if parsed.cached else '변환'})")
+    return stats
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="업로드된 PDF로 인덱스 재구축")
+    parser.add_argument("--skip-index", action="store_true", help="Markdown만 다시 만들고 인덱스는 재구축하지 않음")
+    parser.add_argument("--prune-cache", action="store_true", help="manifest에 없거나 버전이 맞지 않는 변환 캐시 삭제")
+    parser.add_argument("--shard", action="append", help="이 샤드만 다시 구축 (여러 번 지정 가능, INDEX_SHARDS > 1)")
+    parser.add_argument("--source", action="append", help="이 MD 파일이 속한 샤드만 다시 구축 (여러 번 지정 가능)")
+    parser.add_argument("--log-level", default="WARNING")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    from utils.logging_config import configure_logging
+
+    configure_logging(args.log_level)
+
+    from processing import MD_FOLDER_PATH, load_md_documents
+    from pdf_store import read_manifest
+
+    started = time.perf_counter()
+    print("Markdown 재생성 중...")
+    stats = regenerate_markdown(MD_FOLDER_PATH)
+    print(f"PDF {stats['pdfs']}개 (캐시 {stats['cache_hits']}, 변환 {stats['converted']}, 누락 {stats['missing']}), "
+          f"{time.perf_counter() - started:.1f}초")
+
+    if args.prune_cache:
+        import parse_cache
+
+        removed = parse_cache.prune(keep=set(read_manifest()))
+        print(f"변환 캐시 항목 {removed}개 삭제")
+
+    if args.skip_index:
+        return 0
+
+    from retrieval.index_registry import publish_vector_store, shards_for_sources
+    from utils.config import get_embeddings
+
+    documents = load_md_documents(MD_FOLDER_PATH)
+    if not documents:
+        print("인덱싱할 문서가 없습니다.")
+        return 1
+    shards = None
+    if args.shard or args.source:
+        shards = set(args.shard or []) | (shards_for_sources(args.source or []) or set())
+    started = time.perf_counter()
+    _, info = publish_vector_store(documents, get_embeddings(), shards=shards)
+    print(f"인덱스 버전 {info['version']} 게시 (청크 {len(documents)}개, {time.perf_counter() - started:.1f}초)")
+    if info.get("shards"):
+        print(f"샤드 {len(info['shards'])}개 중 재구축: {', '.join(info['rebuilt_shards']) or '없음'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
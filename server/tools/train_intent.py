@@ -0,0 +1,218 @@
+"""
+로컬 의도 분류 모델 학습/평가 스크립트
+
+LLM 분류 로그(INTENT_LOG_PATH)와 라벨 파일로 문자 n-gram 로지스틱 회귀 모델을 학습하고,
+검증 세트에서 규칙 / 모델 / 로컬(규칙 + 확신 있는 모델) / LLM / 하이브리드의 정확도와 지연 시간을 비교한 뒤
+전체 데이터로 다시 학습한 모델을 INTENT_MODEL_PATH에 저장합니다. (서버 재시작 시 적용)
+- 로그의 라벨은 LLM 분류 결과이므로, 로그만으로 평가한 정확도는 LLM과의 일치율입니다.
+  사람이 라벨링한 세트가 있으면 --data로 함께 넣으세요. (벤치마크 questions.jsonl 형식)
+
+사용법 (server 디렉터리에서):
+    python -m tools.train_intent
+    python -m tools.train_intent --data ../fixtures/questions.jsonl --compare-llm
+    python -m tools.train_intent --synthetic 50 --no-save   # 로그 없이 합성 질문으로 동작 확인
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from typing import Dict, List, Optional
+
+
+def load_samples(log_path: Optional[str], data_paths: List[str], synthetic: int, seed: int) -> List[Dict[str, str]]:
+    """로그, 라벨 파일, 합성 질문을 합칩니다. 같은 질문은 뒤에 읽은 라벨을 사용합니다."""
+    from workflow.intent import read_labels
+
+    samples: Dict[str, str] = {}
+    if synthetic:
+        from benchmarks.corpus import generate_corpus
+
+        with tempfile.TemporaryDirectory() as corpus_dir:
+            for question in generate_corpus(corpus_dir, universities=synthetic, general_questions=synthetic, seed=seed):
+                samples[question.question] = question.intent
+    for path in ([log_path] if log_path and os.path.exists(log_path) else []) + data_paths:
+        for entry in read_labels(path):
+            samples[entry["question"]] = entry["intent"]
+    return [{"question": question, "intent": intent} for question, intent in samples.items()]
+
+
+def split_samples(samples: List[Dict[str, str]], test_size: float, seed: int):
+    """의도별 비율을 유지하여 학습/검증 세트로 나눕니다."""
+    rng = random.Random(seed)
+    train, test = [], []
+    for label in sorted({s["intent"] for s in samples}):
+        group = [s for s in samples if s["intent"] == label]
+        rng.shuffle(group)
+        cut = max(1, round(len(group) * test_size)) if len(group) > 1 else 0
+        test.extend(group[:cut])
+        train.extend(group[cut:])
+    return train, test
+
+
+def fit(samples: List[Dict[str, str]]):
+    from workflow.intent import LinearIntentModel, build_model
+
+    pipeline = build_model()
+    pipeline.fit([s["question"] for s in samples], [s["intent"] for s in samples])
+    return LinearIntentModel.from_pipeline(pipeline)
+
+
+def _accuracy(pairs) -> Optional[float]:
+    pairs = list(pairs)
+    return sum(predicted == expected for predicted, expected in pairs) / len(pairs) if pairs else None
+
+
+def _latency_ms(values: List[float]) -> Dict[str, Optional[float]]:
+    from benchmarks.report import summarize
+
+    summary = summarize([value * 1000 for value in values])
+    return {key: summary[key] for key in ("mean", "p50", "p95", "max")}
+
+
+def evaluate(model, test: List[Dict[str, str]], threshold: float, compare_llm: bool) -> Dict[str, Dict]:
+    """검증 세트에서 분류 방식별 정확도(accuracy), 처리 비율(coverage), 질문당 지연 시간(ms)을 구합니다."""
+    from workflow.intent import classify_local, classify_rules, predict_model
+
+    rows = []
+    model_seconds, local_seconds = [], []
+    for sample in test:
+        question = sample["question"]
+        started = time.perf_counter()
+        prediction = predict_model(model, question)
+        model_seconds.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        local = classify_local(question, model)
+        local_seconds.append(time.perf_counter() - started)
+        rows.append({"expected": sample["intent"], "rule": classify_rules(question), "model": prediction, "local": local})
+
+    confident = [r for r in rows if r["local"].confidence >= threshold]
+    report = {
+        "rule": {
+            "coverage": sum(r["rule"] is not None for r in rows) / len(rows),
+            "accuracy": _accuracy((r["rule"].intent, r["expected"]) for r in rows if r["rule"] is not None),
+        },
+        "model": {
+            "coverage": 1.0,
+            "accuracy": _accuracy((r["model"].intent, r["expected"]) for r in rows),
+            "latency_ms": _latency_ms(model_seconds),
+        },
+        "local": {
+            # 임계값 이상만 로컬에서 결정 (나머지는 LLM으로 넘어감)
+            "coverage": len(confident) / len(rows),
+            "accuracy": _accuracy((r["local"].intent, r["expected"]) for r in confident),
+            "latency_ms": _latency_ms(local_seconds),
+        },
+    }
+
+    if compare_llm:
+        from workflow.nodes import classify_intent_with_llm
+
+        llm_seconds = []
+        for row, sample in zip(rows, test):
+            started = time.perf_counter()
+            try:
+                row["llm"] = classify_intent_with_llm(sample["question"])
+            except Exception as e:
+                print(f"  LLM 분류 실패: {e}")
+                row["llm"] = "admission_question"
+            llm_seconds.append(time.perf_counter() - started)
+        report["llm"] = {
+            "coverage": 1.0,
+            "accuracy": _accuracy((r["llm"], r["expected"]) for r in rows),
+            "latency_ms": _latency_ms(llm_seconds),
+        }
+        hybrid_seconds = [
+            local if row["local"].confidence >= threshold else local + llm
+            for row, local, llm in zip(rows, local_seconds, llm_seconds)
+        ]
+        report["hybrid"] = {
+            "coverage": 1.0,
+            "accuracy": _accuracy(
+                (r["local"].intent if r["local"].confidence >= threshold else r["llm"], r["expected"]) for r in rows
+            ),
+            "latency_ms": _latency_ms(hybrid_seconds),
+            "llm_call_rate": 1 - len(confident) / len(rows),
+        }
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="로컬 의도 분류 모델 학습/평가")
+    parser.add_argument("--log", default=None, help="LLM 분류 로그 경로 (기본: INTENT_LOG_PATH)")
+    parser.add_argument("--data", action="append", default=[], help='추가 라벨 파일 ({"question", "intent"} JSONL, 여러 번 지정 가능)')
+    parser.add_argument("--synthetic", type=int, default=0, help="합성 코퍼스 질문을 만들 대학 수 (0이면 사용 안 함)")
+    parser.add_argument("--test-size", type=float, default=0.2, help="검증 세트 비율")
+    parser.add_argument("--threshold", type=float, default=None, help="로컬 결정 확률 임계값 (기본: INTENT_CONFIDENCE_THRESHOLD)")
+    parser.add_argument("--compare-llm", action="store_true", help="검증 세트를 LLM 분류기로도 분류하여 비교 (Azure OpenAI 호출)")
+    parser.add_argument("--model-path", default=None, help="모델 저장 경로 (기본: INTENT_MODEL_PATH)")
+    parser.add_argument("--no-save", action="store_true", help="평가만 하고 모델은 저장하지 않음")
+    parser.add_argument("--output", help="평가 결과 JSON 저장 경로")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--log-level", default="WARNING")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    if not args.compare_llm:
+        # LLM을 호출하지 않으므로 .env 없이도 실행 가능
+        from tools.check_import_time import DUMMY_ENV
+
+        for key, value in DUMMY_ENV.items():
+            os.environ.setdefault(key, value)
+
+    from utils.logging_config import configure_logging
+    from utils.config import settings
+
+    configure_logging(args.log_level)
+
+    from benchmarks.report import environment_info, format_table, write_json
+    from workflow.intent import INTENTS, save_model
+
+    threshold = args.threshold if args.threshold is not None else settings.INTENT_CONFIDENCE_THRESHOLD
+    samples = load_samples(args.log or settings.INTENT_LOG_PATH, args.data, args.synthetic, args.seed)
+    counts = {label: sum(s["intent"] == label for s in samples) for label in INTENTS}
+    print(f"학습 데이터 {len(samples)}개 {counts}")
+    if min(counts.values()) < 2:
+        print("의도별로 최소 2개 이상의 질문이 필요합니다. (--data 또는 --synthetic으로 추가)")
+        return 1
+
+    train, test = split_samples(samples, args.test_size, args.seed)
+    started = time.perf_counter()
+    report = evaluate(fit(train), test, threshold, args.compare_llm)
+    print(f"검증 {len(test)}개, 임계값 {threshold} ({time.perf_counter() - started:.1f}초)")
+    print(format_table(
+        [{"classifier": name, **{k: v for k, v in values.items() if k != "latency_ms"},
+          **{f"{k}_ms": v for k, v in values.get("latency_ms", {}).items()}}
+         for name, values in report.items()],
+        ["classifier", "coverage", "accuracy", "mean_ms", "p50_ms", "p95_ms", "llm_call_rate"],
+    ))
+
+    if args.output:
+        write_json(args.output, {
+            "samples": counts, "test_samples": len(test), "threshold": threshold,
+            "report": report, "environment": environment_info(),
+        })
+
+    if args.no_save:
+        return 0
+
+    from importlib.metadata import version
+
+    # 검증이 끝났으므로 전체 데이터로 다시 학습하여 저장
+    model_path = args.model_path or settings.INTENT_MODEL_PATH
+    save_model(fit(samples), model_path, info={
+        "samples": len(samples),
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "sklearn": version("scikit-learn"),
+        "validation_accuracy": report["model"]["accuracy"],
+    })
+    print(f"모델 저장: {model_path} (서버 재시작 후 적용)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
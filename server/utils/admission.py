@@ -0,0 +1,173 @@
+import time
+import asyncio
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+from utils import metrics
+
+# 승인 결과 메트릭 (result: admitted / queued / rejected_session / rejected_queue_full / timeout)
+ADMISSIONS = metrics.counter("chat_admission_total", "채팅 스트림 승인 결과", ["result"])
+ADMISSION_ACTIVE = metrics.gauge("chat_admission_active", "실행 중인 채팅 스트림 수")
+ADMISSION_QUEUE_DEPTH = metrics.gauge("chat_admission_queue_depth", "실행 슬롯을 기다리는 요청 수")
+ADMISSION_WAIT = metrics.histogram("chat_admission_wait_seconds", "실행 슬롯을 얻기까지 대기한 시간")
+
+
+class AdmissionLease:
+    """
+    승인된 요청이 보유하는 실행 슬롯입니다.
+    스트림이 끝나거나 취소되면 release()로 반납합니다. (여러 번 호출해도 안전)
+    """
+
+    def __init__(self, controller: "AdmissionController", session_key: str, waited: float):
+        self._controller = controller
+        self.session_key = session_key
+        self.waited = waited
+        self._released = False
+
+    def release(self):
+        if self._released:
+            return
+        self._released = True
+        self._controller._release(self.session_key)
+
+
+class AdmissionController:
+    """
+    채팅 스트림 엔드포인트의 동시 실행 수를 제한하는 승인 제어기입니다.
+
+    - max_concurrency: 전체 동시 실행 스트림 수 (DB 세션, Reranker CPU, Azure 할당량 보호)
+    - max_per_session: 한 채팅 세션이 동시에 점유(실행 + 대기)할 수 있는 요청 수 (세션 간 공정성)
+    - max_queue / queue_timeout: 슬롯이 없을 때 FIFO로 대기할 수 있는 요청 수와 최대 대기 시간
+
+    세션 한도 초과는 429, 대기열 포화/대기 시간 초과는 503으로 즉시 거절하며
+    두 경우 모두 Retry-After 헤더를 포함합니다.
+    """
+
+    def __init__(
+            self,
+            max_concurrency: int,
+            max_per_session: int,
+            max_queue: int,
+            queue_timeout: float,
+            retry_after: int = 2,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_per_session = max_per_session
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+        self._active = 0
+        self._per_session: Dict[str, int] = {}
+        self._waiters: Deque[Tuple[str, asyncio.Future]] = deque()
+
+        # 대기 시간 통계 (누적)
+        self._admitted_total = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    def _reject(self, status_code: int, detail: str, result: str):
+        ADMISSIONS.inc(result=result)
+        raise HTTPException(
+            status_code=status_code,
+            detail=detail,
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+    def _update_gauges(self):
+        ADMISSION_ACTIVE.set(self._active)
+        ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+
+    def _record_wait(self, waited: float):
+        ADMISSION_WAIT.observe(waited)
+        self._admitted_total += 1
+        self._wait_time_total += waited
+        self._wait_time_max = max(self._wait_time_max, waited)
+
+    async def acquire(self, session_key: str) -> AdmissionLease:
+        """실행 슬롯을 요청합니다. 즉시 또는 대기 후 승인되거나, HTTPException으로 거절됩니다."""
+        if self._per_session.get(session_key, 0) >= self.max_per_session:
+            self._reject(429, "이 채팅 세션에서 이미 처리 중인 요청이 있습니다. 잠시 후 다시 시도하세요.", "rejected_session")
+
+        # 대기 중인 요청이 있으면 새 요청이 새치기하지 않도록 빈 슬롯이 있어도 대기열 뒤에 섭니다.
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            self._per_session[session_key] = self._per_session.get(session_key, 0) + 1
+            self._record_wait(0.0)
+            self._update_gauges()
+            ADMISSIONS.inc(result="admitted")
+            return AdmissionLease(self, session_key, 0.0)
+
+        if len(self._waiters) >= self.max_queue:
+            self._reject(503, "서버가 혼잡합니다. 잠시 후 다시 시도하세요.", "rejected_queue_full")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        entry = (session_key, future)
+        self._waiters.append(entry)
+        self._per_session[session_key] = self._per_session.get(session_key, 0) + 1
+        started = time.perf_counter()
+        self._update_gauges()
+
+        try:
+            # 슬롯이 반납될 때 _release()가 future를 완료시키며, 그 시점에 _active가 이미 증가되어 있습니다.
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # 타임아웃과 동시에 슬롯을 넘겨받은 경우: 받은 슬롯을 다시 반납
+                self._release(session_key)
+            else:
+                future.cancel()
+                self._remove_waiter(entry)
+                self._decrement_session(session_key)
+            self._update_gauges()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self._reject(503, "대기 시간이 초과되었습니다. 잠시 후 다시 시도하세요.", "timeout")
+
+        waited = time.perf_counter() - started
+        self._record_wait(waited)
+        ADMISSIONS.inc(result="queued")
+        return AdmissionLease(self, session_key, waited)
+
+    def _remove_waiter(self, entry):
+        try:
+            self._waiters.remove(entry)
+        except ValueError:
+            pass
+
+    def _decrement_session(self, session_key: str):
+        count = self._per_session.get(session_key, 0) - 1
+        if count > 0:
+            self._per_session[session_key] = count
+        else:
+            self._per_session.pop(session_key, None)
+
+    def _release(self, session_key: str):
+        """슬롯을 반납하고, 대기열의 다음 요청에게 슬롯을 넘깁니다."""
+        self._decrement_session(session_key)
+        self._active -= 1
+        while self._waiters:
+            _, future = self._waiters.popleft()
+            if future.done():
+                continue
+            self._active += 1
+            future.set_result(None)
+            break
+        self._update_gauges()
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """대기열 깊이, 대기 시간 등 현재 상태를 반환합니다."""
+        return {
+            "active": self._active,
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": len(self._waiters),
+            "max_queue": self.max_queue,
+            "active_sessions": len(self._per_session),
+            "admitted_total": self._admitted_total,
+            "avg_wait_seconds": (self._wait_time_total / self._admitted_total) if self._admitted_total else None,
+            "max_wait_seconds": self._wait_time_max,
+            "results": {",".join(key): value for key, value in ADMISSIONS.samples().items()},
+        }
@@ -0,0 +1,105 @@
+import logging
+import time
+import threading
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# --- 지연 초기화(Lazy) 컴포넌트 레지스트리 ---
+# Reranker(torch), LLM/Embeddings 클라이언트처럼 import/로딩 비용이 큰 객체를
+# 서버 import 시점이 아니라 처음 사용하는 시점에 한 번만 생성하여 공유합니다.
+
+
+class LazyComponent:
+    """팩토리를 최초 get() 호출 시 한 번만 실행하고, 이후에는 같은 인스턴스를 반환합니다."""
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.name = name
+        self.factory = factory
+        self.load_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self._instance: Any = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def get(self) -> Any:
+        if self._loaded:
+            return self._instance
+        with self._lock:
+            if not self._loaded:
+                started = time.perf_counter()
+                try:
+                    self._instance = self.factory()
+                except Exception as e:
+                    self.error = str(e)
+                    raise
+                self.load_seconds = time.perf_counter() - started
+                self.error = None
+                self._loaded = True
+                logger.info("컴포넌트 로드 완료", extra={"component": self.name, "load_seconds": round(self.load_seconds, 3)})
+        return self._instance
+
+    def override(self, instance: Any):
+        """테스트/벤치마크용으로 인스턴스를 직접 지정합니다."""
+        with self._lock:
+            self._instance = instance
+            self._loaded = True
+            self.load_seconds = 0.0
+            self.error = None
+
+    def reset(self):
+        """다음 get() 호출 시 팩토리를 다시 실행하도록 초기화합니다."""
+        with self._lock:
+            self._instance = None
+            self._loaded = False
+            self.load_seconds = None
+
+
+REGISTRY: Dict[str, LazyComponent] = {}
+
+
+def register(name: str, factory: Callable[[], Any]) -> LazyComponent:
+    """컴포넌트를 등록합니다. 이미 등록된 이름이면 팩토리만 교체합니다."""
+    if name in REGISTRY:
+        REGISTRY[name].factory = factory
+    else:
+        REGISTRY[name] = LazyComponent(name, factory)
+    return REGISTRY[name]
+
+
+def get(name: str) -> Any:
+    return REGISTRY[name].get()
+
+
+def override(name: str, instance: Any):
+    REGISTRY[name].override(instance)
+
+
+def status() -> Dict[str, Dict[str, Any]]:
+    """등록된 컴포넌트의 로드 여부와 로드 소요 시간을 반환합니다."""
+    return {
+        name: {"loaded": component.loaded, "load_seconds": component.load_seconds, "error": component.error}
+        for name, component in REGISTRY.items()
+    }
+
+
+# --- 시작(Readiness) 상태 ---
+# 서버 프로세스가 살아있는지(liveness)와 요청을 처리할 준비가 되었는지(readiness)를 구분합니다.
+_readiness: Dict[str, Dict[str, Any]] = {}
+
+
+def set_readiness(check: str, ready: bool, detail: Optional[str] = None):
+    """시작 단계(check)의 준비 상태를 기록합니다. (예: 'database', 'vector_store', 'graph')"""
+    _readiness[check] = {"ready": ready, "detail": detail, "updated_at": time.time()}
+
+
+def readiness() -> Dict[str, Dict[str, Any]]:
+    return dict(_readiness)
+
+
+def is_ready() -> bool:
+    return bool(_readiness) and all(check["ready"] for check in _readiness.values())
@@ -1,8 +1,20 @@
 import os
+import logging
+import threading
+import importlib.util
+from typing import Any, Literal, Optional
+
+import httpx
 from dotenv import load_dotenv
+from pydantic import PrivateAttr
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
-from sentence_transformers import CrossEncoder
+
+from utils import components
+
+# 주의: langchain_openai, sentence_transformers(torch)는 import 비용이 크므로
+# 모듈 최상단이 아니라 실제로 인스턴스를 만드는 메서드 안에서 import 합니다.
+
+logger = logging.getLogger(__name__)
 
 # .env 파일에서 환경 변수 로드
 load_dotenv()
@@ -16,6 +28,17 @@ class Settings(BaseSettings):
     AOAI_DEPLOY_EMBED_3_LARGE: str
     AOAI_API_VERSION: str
 
+    # Azure OpenAI HTTP 클라이언트(커넥션 풀) 설정
+    # LLM/Embeddings 인스턴스가 이 클라이언트를 공유하여 TLS 핸드셰이크와 연결 수립을 재사용합니다.
+    AOAI_HTTP2: bool = True  # h2 패키지가 설치된 경우에만 적용
+    AOAI_MAX_CONNECTIONS: int = 100
+    AOAI_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    AOAI_KEEPALIVE_EXPIRY: float = 30.0  # 유휴 연결 유지 시간(초)
+    AOAI_CONNECT_TIMEOUT: float = 5.0
+    AOAI_TIMEOUT: float = 60.0  # 읽기/쓰기 타임아웃(초)
+    AOAI_CONNECT_RETRIES: int = 1  # 연결 실패 시 전송 계층 재시도 횟수
+    AOAI_MAX_RETRIES: int = 2  # OpenAI SDK 수준 재시도 횟수 (429/5xx 등)
+
     # Langfuse 설정
     LANGFUSE: bool
     LANGFUSE_PUBLIC_KEY: str
@@ -26,6 +49,68 @@ class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     PROJECT_NAME: str = "Debate Arena API"
 
+    # 멀티 워커 배포 설정
+    WORKERS: int = 1  # python main.py 실행 시 uvicorn 워커 수
+    INDEX_WATCH_INTERVAL: float = 2.0  # 인덱스 버전(CURRENT.json) 확인 주기(초), 0이면 감시 안 함
+    INDEX_USE_MMAP: bool = True  # FAISS 인덱스를 mmap으로 로드하여 워커 간 메모리 공유
+    WARMUP_MODELS: bool = True  # 워커 시작 시 Reranker 등 모델 미리 로드
+
+    # 임베딩 설정
+    EMBEDDING_BACKEND: Literal["azure", "local"] = "azure"  # local: CPU에서 로컬 문장 임베딩 모델 실행
+    LOCAL_EMBEDDING_MODEL: str = "local_models/multilingual-e5-small"  # 로컬 경로 또는 Hugging Face 모델 ID
+    LOCAL_EMBEDDING_RUNTIME: Literal["torch", "onnx"] = "torch"  # onnx는 optimum[onnxruntime] 필요
+    LOCAL_EMBEDDING_QUANTIZE: bool = True  # torch 런타임에서 int8 동적 양자화
+    LOCAL_EMBEDDING_ONNX_FILE: Optional[str] = None  # 예: onnx/model_qint8_avx512_vnni.onnx
+    LOCAL_EMBEDDING_QUERY_PREFIX: str = "query: "  # e5 계열 모델의 질문 접두어
+    LOCAL_EMBEDDING_DOCUMENT_PREFIX: str = "passage: "  # e5 계열 모델의 문서 접두어
+    LOCAL_EMBEDDING_THREADS: Optional[int] = None  # torch 스레드 수 (None이면 기본값)
+    # 벡터 차원 축소 (Matryoshka): text-embedding-3 계열은 dimensions 요청, 로컬 모델은 앞쪽 차원만 사용
+    EMBEDDING_DIMENSIONS: Optional[int] = None  # 예: 1024, 256 (None이면 모델 기본 차원)
+    INDEX_QUANTIZATION: Literal["flat", "fp16", "sq8"] = "flat"  # FAISS 저장 형식 (fp16: 1/2, sq8: 1/4 크기)
+    # 1보다 크면 source(파일명) 해시 버킷별 샤드로 나눠 저장하고 스레드 풀에서 병렬 검색 (변경된 샤드만 재구축)
+    INDEX_SHARDS: int = 1
+    INDEX_SEARCH_THREADS: Optional[int] = None  # 샤드 검색 스레드 수 (None이면 min(샤드 수, CPU 수))
+
+    # 검색 설정
+    QUERY_EMBEDDING_CACHE_SIZE: int = 1024  # 쿼리 임베딩 LRU 캐시 크기 (0이면 사용 안 함)
+    QUERY_EMBEDDING_BATCH_WINDOW: float = 0.01  # 동시 쿼리 임베딩 요청을 모으는 시간(초)
+    QUERY_EMBEDDING_MAX_BATCH: int = 16  # 한 번의 임베딩 호출로 묶을 최대 쿼리 수
+    # 쿼리 변환 중 원래 질문으로 미리 검색/Rerank (off / first_turn: 채팅 이력이 없는 첫 질문만 / always)
+    SPECULATIVE_RETRIEVAL: Literal["off", "first_turn", "always"] = "first_turn"
+    SPECULATIVE_MIN_SIMILARITY: float = 0.9  # 원래 질문과 변환된 쿼리의 문자열 유사도가 이 이상이면 추측 결과 사용
+    RETRIEVE_K: int = 10  # 처음 Rerank할 후보 수
+    RETRIEVE_MAX_K: int = 40  # 통과 문서가 없을 때 넓혀 갈 최대 후보 수 (FAISS에서 한 번에 가져옴)
+    RERANK_THRESHOLD: float = 0.7  # 최종 문서로 사용할 Cross-Encoder 점수 하한
+    RERANK_TOP_N: int = 5  # 최종 문서 수
+    RERANK_BATCH_SIZE: int = 4  # Cross-Encoder 배치 크기
+    RERANK_EARLY_EXIT_SCORE: float = 0.9  # 확신도 높은 문서로 보는 점수
+    RERANK_EARLY_EXIT_COUNT: int = 3  # 확신도 높은 문서가 이만큼 모이면 Rerank 조기 종료
+    RERANK_PRUNE_MARGIN: Optional[float] = 0.15  # 벡터 유사도가 (최고 - margin) 미만인 후보는 Rerank 생략
+    RAG_CONTEXT_TOKEN_BUDGET: int = 3000  # 답변 생성 프롬프트에 넣을 참고 문서 최대 토큰 수
+    RAG_TOKEN_ENCODING: str = "o200k_base"  # 토큰 수 계산용 tiktoken 인코딩 (gpt-4o 계열)
+
+    # 의도 분류 설정
+    # hybrid: 규칙/로컬 모델이 확신하지 못할 때만 LLM 호출, local: LLM 호출 안 함, llm: 항상 LLM으로 분류
+    INTENT_CLASSIFIER: Literal["hybrid", "local", "llm"] = "hybrid"
+    INTENT_MODEL_PATH: str = "data/intent/intent_model.joblib"  # python -m tools.train_intent로 생성
+    INTENT_CONFIDENCE_THRESHOLD: float = 0.85  # 로컬 모델 확률이 이 이상이면 LLM 호출 생략
+    INTENT_LOG_PATH: Optional[str] = "data/intent/llm_labels.jsonl"  # LLM 분류 결과 기록 (학습 데이터, 비우면 기록 안 함)
+
+    # 로깅 설정
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = False  # True면 로그 수집기용 JSON 한 줄 포맷으로 출력
+
+    # 디버그/프로파일링 설정
+    LOOP_MONITOR: bool = False  # 이벤트 루프 지연 측정 및 블로킹 호출 스택 캡처
+    LOOP_MONITOR_INTERVAL: float = 0.05  # 하트비트 주기(초)
+    LOOP_BLOCK_THRESHOLD: float = 0.1  # 이 시간(초) 이상 루프를 막으면 블로킹으로 기록
+    ADMIN_TOKEN: Optional[str] = None  # 설정 시 /admin 엔드포인트에 X-Admin-Token 헤더 필요
+    TRACING: bool = False  # 요청별 트레이스(span 타임라인) 기록
+    TRACE_DIR: str = "data/traces"  # 트레이스 JSONL / Chrome trace / 프로파일 저장 위치
+    TRACE_SAMPLE_RATE: float = 1.0  # 트레이스를 기록할 요청 비율 (0~1)
+    TRACE_SLOW_THRESHOLD: float = 5.0  # 이 시간(초) 이상 걸린 요청은 Chrome trace 파일로도 저장
+    TRACE_PROFILE_SAMPLE_RATE: float = 0.0  # cProfile을 함께 수집할 요청 비율 (느린 요청만 저장)
+
     # CORS 설정
     BACKEND_CORS_ORIGINS: list[str] = ["*"]
 
@@ -33,31 +118,164 @@ class Settings(BaseSettings):
     DB_PATH: str = "history.db"
     SQLALCHEMY_DATABASE_URI: str = f"sqlite:///./{DB_PATH}"
 
+    # LangGraph 체크포인터 설정 (thread별 대화 상태 저장)
+    CHECKPOINTER: Literal["sqlite", "memory", "none"] = "sqlite"  # sqlite는 langgraph-checkpoint-sqlite, aiosqlite 필요
+    CHECKPOINT_DB_PATH: str = "data/checkpoints.db"
+
+    # 문서 업로드 설정
+    UPLOAD_MAX_BYTES: int = 50 * 1024 * 1024  # PDF 업로드 최대 크기 (초과 시 413)
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # 업로드를 디스크에 쓰는 청크 크기
+
+    # SSE 스트리밍 설정
+    SSE_FLUSH_INTERVAL: float = 0.05  # 토큰을 합쳐서 보낼 시간 창(초)
+    SSE_MAX_BUFFER_BYTES: int = 512  # 시간 창과 무관하게 즉시 전송할 버퍼 크기
+    SSE_HEARTBEAT_INTERVAL: float = 15.0  # 유휴 시 하트비트 전송 간격(초)
+
+    # 채팅 스트림 승인 제어(Admission Control) 설정
+    CHAT_MAX_CONCURRENCY: int = 32  # 전체 동시 실행 스트림 수
+    CHAT_MAX_PER_SESSION: int = 1  # 채팅 세션당 동시 처리(실행 + 대기) 요청 수
+    CHAT_MAX_QUEUE: int = 64  # 슬롯 대기열 최대 길이
+    CHAT_QUEUE_TIMEOUT: float = 10.0  # 대기열 최대 대기 시간(초)
+    CHAT_RETRY_AFTER: int = 2  # 거절 시 Retry-After 헤더 값(초)
+
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=True)
 
+    # 프로세스 내에서 공유하는 클라이언트 인스턴스 (최초 사용 시 생성)
+    _http_client: Optional[httpx.Client] = PrivateAttr(default=None)
+    _async_http_client: Optional[httpx.AsyncClient] = PrivateAttr(default=None)
+    _llm: Optional[Any] = PrivateAttr(default=None)
+    _embeddings: Optional[Any] = PrivateAttr(default=None)
+    _client_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def _http2_enabled(self) -> bool:
+        if self.AOAI_HTTP2 and importlib.util.find_spec("h2") is None:
+            logger.warning("h2 패키지가 없어 HTTP/1.1 keep-alive로 동작합니다.")
+            return False
+        return self.AOAI_HTTP2
+
+    def _http_client_options(self) -> dict:
+        limits = httpx.Limits(
+            max_connections=self.AOAI_MAX_CONNECTIONS,
+            max_keepalive_connections=self.AOAI_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=self.AOAI_KEEPALIVE_EXPIRY,
+        )
+        timeout = httpx.Timeout(self.AOAI_TIMEOUT, connect=self.AOAI_CONNECT_TIMEOUT)
+        return {"limits": limits, "timeout": timeout, "http2": self._http2_enabled()}
+
+    def get_http_client(self) -> httpx.Client:
+        """동기 호출(invoke, embed_query 등)에 공유되는 커넥션 풀 클라이언트를 반환합니다."""
+        with self._client_lock:
+            if self._http_client is None:
+                options = self._http_client_options()
+                transport = httpx.HTTPTransport(
+                    limits=options["limits"], http2=options["http2"], retries=self.AOAI_CONNECT_RETRIES
+                )
+                self._http_client = httpx.Client(timeout=options["timeout"], transport=transport)
+            return self._http_client
+
+    def get_async_http_client(self) -> httpx.AsyncClient:
+        """비동기 호출(ainvoke, astream 등)에 공유되는 커넥션 풀 클라이언트를 반환합니다."""
+        with self._client_lock:
+            if self._async_http_client is None:
+                options = self._http_client_options()
+                transport = httpx.AsyncHTTPTransport(
+                    limits=options["limits"], http2=options["http2"], retries=self.AOAI_CONNECT_RETRIES
+                )
+                self._async_http_client = httpx.AsyncClient(timeout=options["timeout"], transport=transport)
+            return self._async_http_client
+
+    async def aclose_http_clients(self):
+        """서버 종료 시 공유 HTTP 클라이언트의 연결을 정리합니다."""
+        with self._client_lock:
+            http_client, self._http_client = self._http_client, None
+            async_http_client, self._async_http_client = self._async_http_client, None
+            self._llm = None
+            self._embeddings = None
+        if http_client is not None:
+            http_client.close()
+        if async_http_client is not None:
+            await async_http_client.aclose()
+
     def get_reranker(self):
+        from sentence_transformers import CrossEncoder
+
         # RAG Reranking에 널리 사용되는 경량 모델
         model_name = 'local_models/ms-marco-reranker'
         return CrossEncoder(model_name)
 
     def get_llm(self):
-        """Azure OpenAI LLM 인스턴스를 반환합니다."""
-        return AzureChatOpenAI(
-            openai_api_key=self.AOAI_API_KEY,
-            azure_endpoint=self.AOAI_ENDPOINT,
-            azure_deployment=self.AOAI_DEPLOY_GPT4O,
-            api_version=self.AOAI_API_VERSION,
-            temperature=0.7,
-            streaming=True,  # 스트리밍 활성화
-        )
+        """
+        Azure OpenAI LLM 인스턴스를 반환합니다.
+        모든 노드가 하나의 인스턴스(및 공유 HTTP 커넥션 풀)를 재사용합니다.
+        """
+        from langchain_openai import AzureChatOpenAI
+
+        http_client = self.get_http_client()
+        async_http_client = self.get_async_http_client()
+        with self._client_lock:
+            if self._llm is None:
+                self._llm = AzureChatOpenAI(
+                    openai_api_key=self.AOAI_API_KEY,
+                    azure_endpoint=self.AOAI_ENDPOINT,
+                    azure_deployment=self.AOAI_DEPLOY_GPT4O,
+                    api_version=self.AOAI_API_VERSION,
+                    temperature=0.7,
+                    streaming=True,  # 스트리밍 활성화
+                    stream_usage=True,  # 스트리밍 응답에도 토큰 사용량 포함 (메트릭 집계용)
+                    max_retries=self.AOAI_MAX_RETRIES,
+                    http_client=http_client,
+                    http_async_client=async_http_client,
+                )
+            return self._llm
+
+    def embedding_signature(self) -> str:
+        """인덱스를 만든 임베딩 모델 식별자 (모델이 바뀌면 기존 인덱스를 쓰지 않도록 CURRENT.json에 기록)"""
+        if self.EMBEDDING_BACKEND == "local":
+            signature = f"local:{self.LOCAL_EMBEDDING_MODEL}"
+        else:
+            signature = f"azure:{self.AOAI_DEPLOY_EMBED_3_LARGE}"
+        # 차원을 줄이면 벡터 공간이 달라지므로 식별자에 포함
+        return f"{signature}@{self.EMBEDDING_DIMENSIONS}" if self.EMBEDDING_DIMENSIONS else signature
 
     def get_embeddings(self):
-        """Azure OpenAI Embeddings 인스턴스를 반환합니다."""
-        return AzureOpenAIEmbeddings(
-            model=self.AOAI_DEPLOY_EMBED_3_LARGE,
-            openai_api_version=self.AOAI_API_VERSION,
-            api_key=self.AOAI_API_KEY,
-            azure_endpoint=self.AOAI_ENDPOINT,
+        """EMBEDDING_BACKEND 설정에 따라 Azure OpenAI 또는 로컬 임베딩 인스턴스를 반환합니다."""
+        if self.EMBEDDING_BACKEND == "local":
+            return self.get_local_embeddings()
+        return self.get_azure_embeddings()
+
+    def get_azure_embeddings(self):
+        """Azure OpenAI Embeddings 인스턴스를 반환합니다. (공유 HTTP 커넥션 풀 사용)"""
+        from langchain_openai import AzureOpenAIEmbeddings
+
+        http_client = self.get_http_client()
+        async_http_client = self.get_async_http_client()
+        with self._client_lock:
+            if self._embeddings is None:
+                self._embeddings = AzureOpenAIEmbeddings(
+                    model=self.AOAI_DEPLOY_EMBED_3_LARGE,
+                    openai_api_version=self.AOAI_API_VERSION,
+                    api_key=self.AOAI_API_KEY,
+                    azure_endpoint=self.AOAI_ENDPOINT,
+                    max_retries=self.AOAI_MAX_RETRIES,
+                    dimensions=self.EMBEDDING_DIMENSIONS,
+                    http_client=http_client,
+                    http_async_client=async_http_client,
+                )
+            return self._embeddings
+
+    def get_local_embeddings(self):
+        """로컬 CPU 임베딩 인스턴스를 반환합니다. (모델은 첫 임베딩 호출 시 로드)"""
+        from retrieval.local_embeddings import LocalEmbeddings
+
+        return LocalEmbeddings(
+            self.LOCAL_EMBEDDING_MODEL,
+            runtime=self.LOCAL_EMBEDDING_RUNTIME,
+            quantize=self.LOCAL_EMBEDDING_QUANTIZE,
+            onnx_file=self.LOCAL_EMBEDDING_ONNX_FILE,
+            query_prefix=self.LOCAL_EMBEDDING_QUERY_PREFIX,
+            document_prefix=self.LOCAL_EMBEDDING_DOCUMENT_PREFIX,
+            num_threads=self.LOCAL_EMBEDDING_THREADS,
+            truncate_dim=self.EMBEDDING_DIMENSIONS,
         )
 
 
@@ -66,16 +284,22 @@ class Settings(BaseSettings):
 settings = Settings()
 
 
+# 지연 초기화 컴포넌트 등록 (최초 사용 시 생성되어 프로세스 내에서 공유됨)
+components.register("llm", settings.get_llm)
+components.register("embeddings", settings.get_embeddings)
+components.register("reranker", settings.get_reranker)
+
+
 # 편의를 위한 함수들, 하위 호환성을 위해 유지
 def get_llm():
-    return settings.get_llm()
+    return components.get("llm")
 
 
 def get_embeddings():
-    return settings.get_embeddings()
+    return components.get("embeddings")
 
 def get_reranker():
-    return settings.get_reranker()
+    return components.get("reranker")
 
 
 if __name__ == "__main__":
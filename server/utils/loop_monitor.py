@@ -0,0 +1,221 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# --- 이벤트 루프 지연(lag) / 블로킹 호출 감지 ---
+# 이벤트 루프 안에서 동기 SQLAlchemy, reranker.predict, pymupdf4llm, FAISS 구축 같은 블로킹 호출이 실행되면
+# 그동안 다른 모든 요청이 멈춥니다. 이 모듈은 두 가지 방법으로 이를 측정합니다.
+#   1. 하트비트 태스크: interval마다 깨어나 예정보다 늦게 깨어난 시간(lag)을 기록
+#   2. 감시(watchdog) 스레드: 하트비트가 threshold 이상 멈추면 그 순간 루프 스레드의 스택을 캡처하여
+#      블로킹 위치(코드 위치)별로 횟수/누적 시간/최대 시간을 집계
+
+EVENT_LOOP_LAG = metrics.histogram(
+    "event_loop_lag_seconds", "이벤트 루프 지연 시간 (하트비트가 예정보다 늦게 실행된 시간)",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+EVENT_LOOP_BLOCKS = metrics.counter("event_loop_blocks_total", "threshold 이상 이벤트 루프를 막은 호출 수")
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _percentile(ordered: List[float], q: float) -> Optional[float]:
+    if not ordered:
+        return None
+    index = min(int(round((len(ordered) - 1) * q / 100)), len(ordered) - 1)
+    return ordered[index]
+
+
+def _describe(frame: traceback.FrameSummary) -> str:
+    filename = frame.filename
+    if filename.startswith(SERVER_DIR):
+        filename = os.path.relpath(filename, SERVER_DIR)
+    return f"{filename}:{frame.lineno} ({frame.name})"
+
+
+def blocking_location(stack: traceback.StackSummary) -> Tuple[str, str]:
+    """
+    캡처한 스택에서 (서버 코드 위치, 가장 안쪽 호출 위치)를 반환합니다.
+    서버 코드 위치는 블로킹 호출을 일으킨 이 저장소 코드의 가장 안쪽 프레임입니다.
+    (예: workflow/nodes.py:170 (node_rerank_documents) -> 가장 안쪽은 torch 내부)
+    """
+    leaf = _describe(stack[-1])
+    for frame in reversed(stack):
+        if frame.filename.startswith(SERVER_DIR) and frame.filename != __file__ and "site-packages" not in frame.filename:
+            return _describe(frame), leaf
+    return leaf, leaf
+
+
+class _BlockStats:
+    def __init__(self, location: str, leaf: str, stack: List[str]):
+        self.location = location
+        self.leaves: Dict[str, int] = {}
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_stack = stack
+        self.last_seen = time.time()
+        self.add_leaf(leaf)
+
+    def add_leaf(self, leaf: str):
+        self.leaves[leaf] = self.leaves.get(leaf, 0) + 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "location": self.location,
+            "count": self.count,
+            "total_seconds": round(self.total_seconds, 4),
+            "max_seconds": round(self.max_seconds, 4),
+            "leaves": dict(sorted(self.leaves.items(), key=lambda item: -item[1])[:5]),
+            "last_seen": self.last_seen,
+            "last_stack": self.last_stack,
+        }
+
+
+class LoopMonitor:
+    """
+    이벤트 루프 지연을 지속적으로 측정하고, threshold 이상 루프를 막은 호출의 스택을 위치별로 집계합니다.
+
+    - interval: 하트비트 주기(초). 작을수록 정밀하지만 루프에 깨어나는 작업이 늘어납니다.
+    - threshold: 이 시간(초) 이상 하트비트가 멈추면 블로킹으로 보고 스택을 캡처합니다.
+    - window: 지연 시간 백분위수 계산에 사용할 최근 샘플 수
+    """
+
+    def __init__(self, interval: float = 0.05, threshold: float = 0.1, window: int = 2000, stack_limit: int = 20):
+        self.interval = interval
+        self.threshold = threshold
+        self.stack_limit = stack_limit
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._locations: Dict[str, _BlockStats] = {}
+        self._lock = threading.Lock()
+
+        self._last_beat = time.perf_counter()
+        self._beat_seq = 0
+        self._captured_seq = -1
+        self._pending: Optional[_BlockStats] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.started_at: Optional[float] = None
+
+    # --- 하트비트 (이벤트 루프) ---
+
+    async def _heartbeat(self):
+        while True:
+            self._last_beat = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(time.perf_counter() - self._last_beat - self.interval, 0.0)
+            self._beat_seq += 1
+            self._samples.append(lag)
+            EVENT_LOOP_LAG.observe(lag)
+
+            pending, self._pending = self._pending, None
+            if pending is not None:
+                # 감시 스레드가 캡처한 블로킹 구간의 실제 길이를 반영
+                with self._lock:
+                    pending.total_seconds += lag
+                    pending.max_seconds = max(pending.max_seconds, lag)
+
+    # --- 감시 스레드 ---
+
+    def _capture(self, beat_seq: int, stalled: float):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        stack = traceback.extract_stack(frame)[-self.stack_limit:]
+        location, leaf = blocking_location(stack)
+        formatted = [_describe(entry) + (f": {entry.line}" if entry.line else "") for entry in stack]
+
+        with self._lock:
+            stats = self._locations.get(location)
+            if stats is None:
+                stats = self._locations[location] = _BlockStats(location, leaf, formatted)
+            else:
+                stats.add_leaf(leaf)
+                stats.last_stack = formatted
+            stats.count += 1
+            stats.last_seen = time.time()
+        self._captured_seq = beat_seq
+        self._pending = stats
+        EVENT_LOOP_BLOCKS.inc()
+        logger.warning("이벤트 루프 블로킹 감지", extra={"location": location, "leaf": leaf, "stalled_seconds": round(stalled, 3)})
+
+    def _watch(self):
+        check_interval = max(self.threshold / 2, 0.01)
+        while not self._stop.wait(check_interval):
+            beat_seq = self._beat_seq
+            stalled = time.perf_counter() - self._last_beat - self.interval
+            # 같은 블로킹 구간은 한 번만 캡처
+            if stalled >= self.threshold and beat_seq != self._captured_seq:
+                self._capture(beat_seq, stalled)
+
+    # --- 시작 / 종료 ---
+
+    def start(self):
+        """실행 중인 이벤트 루프에서 호출합니다. (startup 이벤트)"""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self.started_at = time.time()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._thread.start()
+        logger.info("이벤트 루프 모니터 시작", extra={"interval": self.interval, "threshold": self.threshold})
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def reset(self):
+        with self._lock:
+            self._locations.clear()
+            self._samples.clear()
+            self._pending = None
+
+    # --- 보고 ---
+
+    def report(self, top: int = 20) -> Dict[str, Any]:
+        """최근 지연 시간 분포와 블로킹 위치별 집계(누적 시간 순)를 반환합니다."""
+        ordered = sorted(self._samples)
+        with self._lock:
+            locations = sorted(self._locations.values(), key=lambda stats: -stats.total_seconds)
+            blocks = [stats.as_dict() for stats in locations[:top]]
+            total_blocks = sum(stats.count for stats in locations)
+            total_blocked = sum(stats.total_seconds for stats in locations)
+        return {
+            "running": self._task is not None,
+            "interval": self.interval,
+            "threshold": self.threshold,
+            "started_at": self.started_at,
+            "lag": {
+                "samples": len(ordered),
+                "p50": _percentile(ordered, 50),
+                "p95": _percentile(ordered, 95),
+                "p99": _percentile(ordered, 99),
+                "max": ordered[-1] if ordered else None,
+            },
+            "blocks": total_blocks,
+            "blocked_seconds": round(total_blocked, 4),
+            "locations": blocks,
+        }
@@ -0,0 +1,201 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# --- 프로세스 내 메트릭 레지스트리 ---
+# Prometheus 텍스트 포맷(/metrics)으로 내보낼 수 있는 최소한의 Counter / Gauge / Histogram 구현입니다.
+# 값 갱신은 라벨 튜플 조회 + 덧셈 수준이라 요청 경로에서 사용해도 오버헤드가 무시할 만합니다.
+# 주의: 값은 프로세스(워커)별로 집계됩니다.
+REGISTRY: Dict[str, "_Metric"] = {}
+_registry_lock = threading.Lock()
+
+# 지연 시간(초)용 기본 버킷
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape_label(value) -> str:
+    """Prometheus 라벨 값 이스케이프 (역슬래시, 큰따옴표, 줄바꿈)"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name}: 라벨이 일치하지 않습니다. (기대값: {self.labelnames})")
+        try:
+            return tuple(str(labels[name]) for name in self.labelnames)
+        except KeyError:
+            raise ValueError(f"{self.name}: 라벨이 일치하지 않습니다. (기대값: {self.labelnames})")
+
+    def _format_labels(self, key: Tuple[str, ...], extra: Optional[Dict[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.extend(extra.items())
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + "}"
+
+    def expose(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """
+    단조 증가하는 카운터 메트릭입니다.
+    라벨 조합별로 값을 따로 누적합니다. (예: status="cancelled")
+    """
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("Counter는 감소할 수 없습니다.")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+    def expose(self) -> List[str]:
+        return [f"{self.name}{self._format_labels(key)} {value}" for key, value in self.samples().items()]
+
+
+class Gauge(Counter):
+    """증가/감소하거나 직접 설정할 수 있는 현재 값 메트릭입니다. (예: 대기열 깊이)"""
+
+    type_name = "gauge"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """관측값 분포를 누적 버킷으로 집계하는 메트릭입니다. (예: 노드별 소요 시간)"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 라벨 -> [버킷별 개수..., +Inf 개수], 합계, 전체 개수
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """with 블록의 실행 시간을 관측합니다."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def summary(self, **labels) -> Dict[str, float]:
+        key = self._key(labels)
+        with self._lock:
+            count = sum(self._counts.get(key, []))
+            total = self._sums.get(key, 0.0)
+        return {"count": count, "sum": total, "avg": (total / count) if count else 0.0}
+
+    def expose(self) -> List[str]:
+        lines = []
+        with self._lock:
+            items = [(key, list(counts), self._sums[key]) for key, counts in self._counts.items()]
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._format_labels(key, {'le': repr(float(bound))})} {cumulative}")
+            cumulative += counts[-1]
+            lines.append(f"{self.name}_bucket{self._format_labels(key, {'le': '+Inf'})} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {cumulative}")
+        return lines
+
+
+def _register(metric_class, name: str, *args, **kwargs):
+    with _registry_lock:
+        if name not in REGISTRY:
+            REGISTRY[name] = metric_class(name, *args, **kwargs)
+        return REGISTRY[name]
+
+
+def counter(name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+    """카운터를 생성하여 레지스트리에 등록합니다. (같은 이름이면 기존 인스턴스 반환)"""
+    return _register(Counter, name, documentation, labelnames)
+
+
+def gauge(name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+    """게이지를 생성하여 레지스트리에 등록합니다. (같은 이름이면 기존 인스턴스 반환)"""
+    return _register(Gauge, name, documentation, labelnames)
+
+
+def histogram(name: str, documentation: str, labelnames: Iterable[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    """히스토그램을 생성하여 레지스트리에 등록합니다. (같은 이름이면 기존 인스턴스 반환)"""
+    return _register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+
+def snapshot() -> Dict[str, Dict[str, float]]:
+    """카운터/게이지의 현재 값을 {메트릭명: {라벨값: 값}} 형태로 반환합니다."""
+    result = {}
+    for name, metric in REGISTRY.items():
+        if isinstance(metric, Counter):
+            result[name] = {",".join(key) or "_": value for key, value in metric.samples().items()}
+    return result
+
+
+def render_prometheus() -> str:
+    """레지스트리의 모든 메트릭을 Prometheus 텍스트 포맷(0.0.4)으로 직렬화합니다."""
+    lines = []
+    for name, metric in sorted(REGISTRY.items()):
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.type_name}")
+        lines.extend(metric.expose())
+    return "\n".join(lines) + "\n"
+
+
+# --- 여러 모듈에서 공유하는 공통 메트릭 ---
+# 캐시 조회 결과 (cache: 캐시 이름, result: hit / miss)
+CACHE_REQUESTS = counter("cache_requests_total", "캐시 조회 결과", ["cache", "result"])
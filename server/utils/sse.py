@@ -0,0 +1,270 @@
+import logging
+import json
+import time
+import asyncio
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, Tuple
+
+from utils import metrics, tracing
+
+logger = logging.getLogger(__name__)
+
+# --- 미리 직렬화된(pre-serialized) SSE 프레임 ---
+# 토큰 프레임은 매번 dict를 만들고 json.dumps 하지 않고,
+# 고정된 앞/뒤 바이트 사이에 content 문자열만 인코딩하여 끼워 넣습니다.
+_UPDATE_PREFIX = b'data: {"type":"update","data":{"content":'
+_UPDATE_SUFFIX = b"}}\n\n"
+# SSE 주석(':'으로 시작) 라인은 클라이언트가 무시하므로 연결 유지용 하트비트로 사용합니다.
+HEARTBEAT_FRAME = b": keep-alive\n\n"
+
+# 스트림 소스가 yield하는 이벤트: (이벤트 타입, 데이터)
+# 'token' 타입은 버퍼에 모았다가 'update' 프레임으로 합쳐서(coalescing) 전송합니다.
+StreamEvent = Tuple[str, Any]
+
+_END = object()
+
+SSE_TTFB = metrics.histogram("sse_ttfb_seconds", "SSE 요청 시작부터 첫 바이트 전송까지 걸린 시간")
+SSE_TOKENS_PER_SECOND = metrics.histogram(
+    "sse_tokens_per_second", "SSE 스트림의 초당 토큰 전송 수",
+    buckets=(1, 5, 10, 20, 40, 80, 160, 320),
+)
+SSE_STREAMS = metrics.counter("sse_streams_total", "SSE 스트림 종료 결과", ["result"])
+
+
+def encode_event(event_type: str, data: Any) -> bytes:
+    """임의의 이벤트를 프론트엔드가 이해하는 SSE 프레임(bytes)으로 직렬화합니다."""
+    payload = json.dumps({"type": event_type, "data": data}, ensure_ascii=False, separators=(",", ":"))
+    return b"data: " + payload.encode("utf-8") + b"\n\n"
+
+
+def encode_update(content: str) -> bytes:
+    """토큰(텍스트) 조각을 미리 직렬화된 'update' 프레임으로 인코딩합니다."""
+    return _UPDATE_PREFIX + json.dumps(content, ensure_ascii=False).encode("utf-8") + _UPDATE_SUFFIX
+
+
+@dataclass
+class StreamStats:
+    """스트림 한 건의 전송 통계 (TTFB, 초당 토큰 수 측정용)"""
+    started_at: float
+    first_byte_at: Optional[float] = None
+    first_token_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    token_count: int = 0
+    frame_count: int = 0
+    heartbeat_count: int = 0
+    bytes_sent: int = 0
+    disconnected: bool = False
+
+    @property
+    def ttfb(self) -> Optional[float]:
+        """요청 시작부터 첫 바이트 전송까지 걸린 시간(초)"""
+        if self.first_byte_at is None:
+            return None
+        return self.first_byte_at - self.started_at
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """첫 토큰 이후 종료 시점까지의 초당 토큰 수"""
+        if self.first_token_at is None or self.finished_at is None:
+            return None
+        elapsed = self.finished_at - self.first_token_at
+        if elapsed <= 0:
+            return float(self.token_count)
+        return self.token_count / elapsed
+
+    def as_dict(self) -> dict:
+        return {
+            "ttfb": self.ttfb,
+            "tokens": self.token_count,
+            "tokens_per_second": self.tokens_per_second,
+            "frames": self.frame_count,
+            "heartbeats": self.heartbeat_count,
+            "bytes": self.bytes_sent,
+            "disconnected": self.disconnected,
+        }
+
+
+class SSEStreamEncoder:
+    """
+    이벤트 소스(async iterator)를 SSE 바이트 스트림으로 변환하는 인코더입니다.
+
+    - 토큰은 시간 창(flush_interval) 또는 크기(max_buffer_bytes) 기준으로 합쳐서 전송합니다.
+      (첫 토큰은 TTFB를 위해 즉시 전송)
+    - 소스는 별도 태스크에서 크기가 제한된 큐로 펌핑되므로,
+      클라이언트가 느리면 큐가 차서 소스(LLM 스트림)도 자연스럽게 대기합니다. (backpressure)
+    - 유휴 상태가 heartbeat_interval 동안 이어지면 하트비트를 보냅니다.
+    - disconnect_check_interval 마다 클라이언트 연결 종료 여부를 확인하고,
+      종료되었으면 소스 태스크를 취소합니다. (그래프 실행 및 LLM 스트림까지 취소 전파)
+    - trace가 주어지면 소스 태스크에서 해당 트레이스를 사용하도록 활성화하고,
+      프레임 전송(flush)마다 span을 기록한 뒤 스트림 종료 시 트레이스를 마무리합니다.
+    """
+
+    def __init__(
+            self,
+            flush_interval: float = 0.05,
+            max_buffer_bytes: int = 512,
+            heartbeat_interval: float = 15.0,
+            queue_size: int = 256,
+            is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+            disconnect_check_interval: float = 1.0,
+            trace: Optional[tracing.Trace] = None,
+    ):
+        self.flush_interval = flush_interval
+        self.max_buffer_bytes = max_buffer_bytes
+        self.heartbeat_interval = heartbeat_interval
+        self.queue_size = queue_size
+        self.is_disconnected = is_disconnected
+        self.disconnect_check_interval = disconnect_check_interval
+        self._last_disconnect_check = time.perf_counter()
+        self.trace = trace
+        self.stats = StreamStats(started_at=time.perf_counter())
+
+    async def _pump(self, source: AsyncIterator[StreamEvent], queue: asyncio.Queue):
+        """소스 이벤트를 큐에 옮깁니다. 큐가 가득 차면 소비자가 따라올 때까지 대기합니다."""
+        try:
+            async for event in source:
+                await queue.put(event)
+        except Exception as e:
+            logger.exception("SSE 소스 처리 중 오류 발생: %s", e)
+            await queue.put(("error", f"스트리밍 실패: {e}"))
+        finally:
+            # 큐에 넣으려고 대기하던 중 취소된 경우 소스는 yield 지점에 멈춰 있으므로
+            # 명시적으로 닫아 소스 쪽 정리(취소 처리) 코드가 실행되도록 합니다.
+            aclose = getattr(source, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        # 취소된 경우에는 여기까지 오지 않습니다.
+        await queue.put(_END)
+
+    async def _client_gone(self, force: bool = False) -> bool:
+        """일정 간격으로 클라이언트 연결 종료 여부를 확인합니다."""
+        if self.is_disconnected is None:
+            return False
+        now = time.perf_counter()
+        if not force and now - self._last_disconnect_check < self.disconnect_check_interval:
+            return False
+        self._last_disconnect_check = now
+        if await self.is_disconnected():
+            self.stats.disconnected = True
+            logger.info("SSE 클라이언트 연결 종료 감지. 스트림을 중단합니다.")
+            return True
+        return False
+
+    def _frame(self, frame: bytes) -> bytes:
+        """전송 직전 통계를 갱신합니다."""
+        now = time.perf_counter()
+        if self.stats.first_byte_at is None:
+            self.stats.first_byte_at = now
+        self.stats.frame_count += 1
+        self.stats.bytes_sent += len(frame)
+        return frame
+
+    def _record_metrics(self):
+        if self.stats.ttfb is not None:
+            SSE_TTFB.observe(self.stats.ttfb)
+        if self.stats.tokens_per_second is not None:
+            SSE_TOKENS_PER_SECOND.observe(self.stats.tokens_per_second)
+        SSE_STREAMS.inc(result="disconnected" if self.stats.disconnected else "completed")
+
+    def stream(self, source: AsyncIterator[StreamEvent]) -> AsyncIterator[bytes]:
+        if self.trace is None:
+            return self._encode(source)
+        return self._traced(self._encode(source))
+
+    async def _traced(self, frames: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """프레임이 클라이언트로 전송되는 구간(yield ~ 다음 요청)을 sse_flush span으로 기록합니다."""
+        trace = self.trace
+        # 소스 태스크(_pump)는 _encode 첫 실행 시 생성되므로 그 전에 활성화해야 컨텍스트가 복사됩니다.
+        tracing.activate(trace)
+        try:
+            async with aclosing(frames):
+                async for frame in frames:
+                    flush = trace.start_span("sse_flush", "sse", trace.root, bytes=len(frame))
+                    yield frame
+                    trace.end_span(flush)
+        finally:
+            tracing.finish_trace(trace, **self.stats.as_dict())
+
+    async def _encode(self, source: AsyncIterator[StreamEvent]) -> AsyncIterator[bytes]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        producer = asyncio.create_task(self._pump(source, queue))
+
+        buffer = []
+        buffered_bytes = 0
+        flush_deadline = None
+        last_sent = time.perf_counter()
+
+        try:
+            while True:
+                now = time.perf_counter()
+                if buffer:
+                    timeout = max(flush_deadline - now, 0)
+                else:
+                    timeout = max(self.heartbeat_interval - (now - last_sent), 0)
+
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    if buffer:
+                        # 시간 창이 끝났으므로 모인 토큰을 한 번에 전송
+                        yield self._frame(encode_update("".join(buffer)))
+                        buffer, buffered_bytes, flush_deadline = [], 0, None
+                    else:
+                        if await self._client_gone(force=True):
+                            break
+                        self.stats.heartbeat_count += 1
+                        yield self._frame(HEARTBEAT_FRAME)
+                    last_sent = time.perf_counter()
+                    continue
+
+                if item is _END:
+                    break
+                if await self._client_gone():
+                    break
+
+                event_type, data = item
+                if event_type == "token":
+                    if not data:
+                        continue
+                    self.stats.token_count += 1
+                    if self.stats.first_token_at is None:
+                        # 첫 토큰은 지연 없이 바로 전송 (TTFB 최소화)
+                        self.stats.first_token_at = time.perf_counter()
+                        yield self._frame(encode_update(data))
+                        last_sent = time.perf_counter()
+                        continue
+
+                    buffer.append(data)
+                    buffered_bytes += len(data.encode("utf-8"))
+                    if flush_deadline is None:
+                        flush_deadline = time.perf_counter() + self.flush_interval
+                    if buffered_bytes >= self.max_buffer_bytes:
+                        yield self._frame(encode_update("".join(buffer)))
+                        buffer, buffered_bytes, flush_deadline = [], 0, None
+                        last_sent = time.perf_counter()
+                    continue
+
+                # 토큰 외 이벤트는 순서 보장을 위해 버퍼를 먼저 비운 뒤 즉시 전송
+                if buffer:
+                    yield self._frame(encode_update("".join(buffer)))
+                    buffer, buffered_bytes, flush_deadline = [], 0, None
+                yield self._frame(encode_event(event_type, data))
+                last_sent = time.perf_counter()
+
+            if buffer:
+                yield self._frame(encode_update("".join(buffer)))
+        except asyncio.CancelledError:
+            # 서버(Starlette)가 연결 종료를 감지해 응답 태스크를 취소한 경우
+            self.stats.disconnected = True
+            raise
+        finally:
+            if not producer.done():
+                producer.cancel()
+            try:
+                await producer
+            except (asyncio.CancelledError, Exception):
+                pass
+            self.stats.finished_at = time.perf_counter()
+            self._record_metrics()
+            logger.info("SSE 스트림 통계", extra=self.stats.as_dict())
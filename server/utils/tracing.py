@@ -0,0 +1,369 @@
+import os
+import json
+import time
+import uuid
+import queue
+import random
+import logging
+import cProfile
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from utils.config import settings
+from workflow.instrumentation import extract_usage
+
+logger = logging.getLogger(__name__)
+
+# --- 요청 단위 트레이스(span tree) ---
+# 채팅 한 턴(chat turn)을 루트 span으로 하고 DB 조회/저장, 그래프 노드, LLM·임베딩·Rerank 호출,
+# SSE 전송(flush)을 자식 span으로 기록합니다. 현재 트레이스/부모 span은 contextvars로 전달되므로
+# 그래프가 만드는 태스크/스레드에서도 같은 트리에 이어서 기록됩니다.
+# 완료된 트레이스는 로컬 파일(JSONL, Chrome trace)로 내보내므로 외부 서비스 없이도 확인할 수 있습니다.
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+# cProfile은 스레드당 하나만 활성화할 수 있으므로 동시에 한 요청만 프로파일링합니다.
+_profile_lock = threading.Lock()
+
+
+class Span:
+    """트레이스 안의 구간 하나 (시작/종료 시각은 트레이스 시작 기준 초)"""
+
+    __slots__ = ("span_id", "parent_id", "name", "category", "start", "end", "depth", "attributes")
+
+    def __init__(self, span_id: int, parent: Optional["Span"], name: str, category: str, start: float,
+                 attributes: Dict[str, Any]):
+        self.span_id = span_id
+        self.parent_id = parent.span_id if parent else None
+        self.depth = parent.depth + 1 if parent else 0
+        self.name = name
+        self.category = category
+        self.start = start
+        self.end: Optional[float] = None
+        self.attributes = attributes
+
+    @property
+    def duration(self) -> Optional[float]:
+        return None if self.end is None else self.end - self.start
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.span_id,
+            "parent": self.parent_id,
+            "name": self.name,
+            "category": self.category,
+            "start_ms": round(self.start * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3) if self.end is not None else None,
+            "attributes": self.attributes,
+        }
+
+
+class Trace:
+    """채팅 한 턴의 span 트리"""
+
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.started_at = time.time()
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.spans: List[Span] = []
+        self.profiler: Optional[cProfile.Profile] = None
+        self.root = self.start_span(name, "request", None, **(attributes or {}))
+
+    def _now(self) -> float:
+        return time.perf_counter() - self._origin
+
+    def start_span(self, name: str, category: str, parent: Optional[Span], **attributes) -> Span:
+        with self._lock:
+            span = Span(self._next_id, parent, name, category, self._now(), attributes)
+            self._next_id += 1
+            self.spans.append(span)
+        return span
+
+    def end_span(self, span: Span, **attributes):
+        if span.end is None:
+            span.end = self._now()
+        span.attributes.update(attributes)
+
+    @property
+    def duration(self) -> Optional[float]:
+        return self.root.duration
+
+    def finish(self, **attributes):
+        """열려 있는 span을 모두 닫고 루트 span을 종료합니다."""
+        for span in self.spans:
+            if span.end is None and span is not self.root:
+                self.end_span(span, unfinished=True)
+        self.end_span(self.root, **attributes)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "spans": len(self.spans),
+            "attributes": self.root.attributes,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**self.summary(), "spans": [span.as_dict() for span in self.spans]}
+
+    def to_chrome(self) -> Dict[str, Any]:
+        """
+        Chrome trace 이벤트 형식(chrome://tracing, Perfetto, speedscope에서 열 수 있음)으로 변환합니다.
+        병렬로 실행된 span이 잘못 중첩되어 보이지 않도록 트리 깊이를 tid(행)로 사용합니다.
+        """
+        base_us = self.started_at * 1_000_000
+        events = []
+        for span in self.spans:
+            if span.end is None:
+                continue
+            events.append({
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": base_us + span.start * 1_000_000,
+                "dur": span.duration * 1_000_000,
+                "pid": os.getpid(),
+                "tid": span.depth,
+                "args": {key: _json_safe(value) for key, value in span.attributes.items()},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"trace_id": self.trace_id}}
+
+
+def _json_safe(value: Any) -> Any:
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+# --- 현재 트레이스 / span ---
+
+def start_trace(name: str, **attributes) -> Optional[Trace]:
+    """
+    새 트레이스를 만듭니다. TRACING이 꺼져 있거나 샘플링되지 않으면 None을 반환합니다.
+    """
+    if not settings.TRACING or random.random() >= settings.TRACE_SAMPLE_RATE:
+        return None
+    return Trace(name, attributes)
+
+
+def activate(trace: Optional[Trace]):
+    """
+    현재 컨텍스트(및 이후 생성되는 태스크/스레드)에서 trace를 사용하도록 설정합니다.
+    TRACE_PROFILE_SAMPLE_RATE 확률로 cProfile 수집도 여기서 시작하며, finish_trace()에서 종료합니다.
+    """
+    if trace is None:
+        return
+    _current_trace.set(trace)
+    _current_span.set(trace.root)
+    if random.random() < settings.TRACE_PROFILE_SAMPLE_RATE and _profile_lock.acquire(blocking=False):
+        # 이벤트 루프 스레드 전체를 프로파일링하므로 같은 시간대의 다른 요청도 함께 기록됩니다.
+        trace.profiler = cProfile.Profile()
+        trace.profiler.enable()
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, category: str = "internal", **attributes):
+    """
+    현재 트레이스에 자식 span을 기록합니다. 활성 트레이스가 없으면 아무것도 하지 않습니다.
+    (with 블록 안에서 yield/await로 다른 컨텍스트로 넘어가지 않는 구간에 사용)
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    parent = _current_span.get() or trace.root
+    current = trace.start_span(name, category, parent, **attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        trace.end_span(current)
+
+
+def finish_trace(trace: Optional[Trace], **attributes):
+    """트레이스를 종료하고 내보냅니다. 느린 요청이면 Chrome trace와 프로파일도 저장합니다."""
+    if trace is None:
+        return
+    trace.finish(**attributes)
+
+    profile = None
+    if trace.profiler is not None:
+        trace.profiler.disable()
+        _profile_lock.release()
+        if trace.duration >= settings.TRACE_SLOW_THRESHOLD:
+            profile = trace.profiler
+        trace.profiler = None
+
+    get_exporter().submit(trace, profile)
+
+
+# --- 내보내기 ---
+
+class TraceExporter:
+    """
+    완료된 트레이스를 백그라운드 스레드에서 파일로 씁니다. (요청 경로에서 파일 I/O를 하지 않도록)
+    - traces-YYYYMMDD.jsonl: 모든 트레이스 (한 줄에 하나, span 목록 포함)
+    - <trace_id>.trace.json: TRACE_SLOW_THRESHOLD 이상 걸린 트레이스의 Chrome trace
+    - <trace_id>.prof: 프로파일 샘플링된 느린 요청의 cProfile 통계 (pstats / snakeviz로 확인)
+    최근 트레이스는 메모리에도 보관하여 /admin/traces 에서 조회할 수 있습니다.
+    """
+
+    def __init__(self, directory: str, slow_threshold: float, keep_recent: int = 100):
+        self.directory = directory
+        self.slow_threshold = slow_threshold
+        self.recent: Deque[Trace] = deque(maxlen=keep_recent)
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, trace: Trace, profile: Optional[cProfile.Profile] = None):
+        self.recent.append(trace)
+        self._queue.put((trace, profile))
+
+    def find(self, trace_id: str) -> Optional[Trace]:
+        return next((trace for trace in reversed(self.recent) if trace.trace_id == trace_id), None)
+
+    def _write(self, trace: Trace, profile: Optional[cProfile.Profile]):
+        os.makedirs(self.directory, exist_ok=True)
+        day = time.strftime("%Y%m%d", time.localtime(trace.started_at))
+        with open(os.path.join(self.directory, f"traces-{day}.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(trace.to_dict(), ensure_ascii=False, default=str) + "\n")
+
+        if trace.duration is not None and trace.duration >= self.slow_threshold:
+            with open(os.path.join(self.directory, f"{trace.trace_id}.trace.json"), "w", encoding="utf-8") as f:
+                json.dump(trace.to_chrome(), f, ensure_ascii=False)
+        if profile is not None:
+            profile.dump_stats(os.path.join(self.directory, f"{trace.trace_id}.prof"))
+
+    def _run(self):
+        while True:
+            trace, profile = self._queue.get()
+            try:
+                self._write(trace, profile)
+            except Exception as e:
+                logger.warning("트레이스 내보내기 실패: %s", e)
+
+
+_exporter: Optional[TraceExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter() -> TraceExporter:
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                _exporter = TraceExporter(settings.TRACE_DIR, settings.TRACE_SLOW_THRESHOLD)
+    return _exporter
+
+
+# --- LangChain 콜백 (그래프 노드 / LLM 호출 span) ---
+
+class TracingCallback(BaseCallbackHandler):
+    """
+    그래프 실행 config의 callbacks로 전달되어 노드 실행과 LLM 호출을 트레이스에 span으로 기록합니다.
+    노드 span은 현재 span(contextvar)으로도 설정되어, 노드 안에서 span()으로 기록한
+    임베딩/FAISS 검색/Rerank 구간이 해당 노드의 자식이 됩니다.
+    """
+
+    run_inline = True
+
+    def __init__(self, trace: Trace):
+        self.trace = trace
+        self._spans: Dict[UUID, Span] = {}
+        self._parents: Dict[UUID, Optional[UUID]] = {}
+
+    def _parent_span(self, parent_run_id: Optional[UUID]) -> Span:
+        while parent_run_id is not None:
+            if parent_run_id in self._spans:
+                return self._spans[parent_run_id]
+            parent_run_id = self._parents.get(parent_run_id)
+        return self.trace.root
+
+    def _end(self, run_id: UUID, **attributes):
+        self._parents.pop(run_id, None)
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            self.trace.end_span(span, **attributes)
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                       metadata=None, **kwargs):
+        self._parents[run_id] = parent_run_id
+        name = kwargs.get("name")
+        if name and (metadata or {}).get("langgraph_node") == name:
+            span = self.trace.start_span(f"node:{name}", "node", self._parent_span(parent_run_id))
+            self._spans[run_id] = span
+            _current_span.set(span)
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._end(run_id, error=type(error).__name__)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                            metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node", "unknown")
+        self._parents[run_id] = parent_run_id
+        self._spans[run_id] = self.trace.start_span(f"llm:{node}", "llm", self._parent_span(parent_run_id))
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs):
+        span = self._spans.get(run_id)
+        if span is not None and "first_token_ms" not in span.attributes:
+            span.attributes["first_token_ms"] = round((self.trace._now() - span.start) * 1000, 3)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        usage = extract_usage(response)
+        self._end(run_id, **{key: value for key, value in usage.items() if key in ("input_tokens", "output_tokens")})
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._end(run_id, error=type(error).__name__)
+
+
+# --- Langfuse (선택) ---
+
+_langfuse_ready: Optional[bool] = None
+
+
+def get_langfuse_handler():
+    """
+    LANGFUSE=true이면 Langfuse LangChain 콜백 핸들러를 반환합니다. (비활성/미설치 시 None)
+    클라이언트는 처음 호출될 때 한 번만 초기화합니다.
+    """
+    global _langfuse_ready
+    if not settings.LANGFUSE or _langfuse_ready is False:
+        return None
+    try:
+        from langfuse import Langfuse
+        from langfuse.langchain import CallbackHandler
+    except ImportError:
+        logger.warning("LANGFUSE=true 이지만 langfuse 패키지를 불러올 수 없습니다.")
+        _langfuse_ready = False
+        return None
+    if _langfuse_ready is None:
+        Langfuse(
+            public_key=settings.LANGFUSE_PUBLIC_KEY,
+            secret_key=settings.LANGFUSE_SECRET_KEY,
+            host=settings.LANGFUSE_BASE_URL,
+        )
+        _langfuse_ready = True
+    return CallbackHandler()
@@ -0,0 +1,122 @@
+import logging
+import sqlite3
+from typing import Any, Optional
+
+from utils import metrics
+from utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+# --- LangGraph 체크포인터 (대화 상태 영속화) ---
+# thread_id(= 채팅 세션 ID)별로 그래프 상태(대화 이력)를 저장하여
+# 다음 턴에는 DB에서 새로 추가된 메시지만 읽어 이어 붙입니다. (chat_workflow.load_turn_messages 참고)
+#   - sqlite: AsyncSqliteSaver (langgraph-checkpoint-sqlite, aiosqlite 필요). 워커 간 공유, 재시작 후에도 유지
+#   - memory: InMemorySaver. 워커별, 재시작하면 사라짐 (sqlite 패키지가 없을 때의 대체 수단)
+#   - none: 체크포인터 없이 매 턴 전체 이력을 DB에서 읽음
+
+CHECKPOINT_HISTORY = metrics.counter(
+    "chat_checkpoint_history_total", "체크포인트 기반 대화 이력 로드 결과 (incremental / full)", ["result"]
+)
+
+_checkpointer: Optional[Any] = None
+_connection: Optional[Any] = None
+
+
+async def open_checkpointer() -> Optional[Any]:
+    """설정(CHECKPOINTER)에 따라 체크포인터를 만듭니다. 서버 시작 시 한 번 호출합니다."""
+    global _checkpointer, _connection
+    if settings.CHECKPOINTER == "none":
+        _checkpointer = None
+        return None
+
+    if settings.CHECKPOINTER == "sqlite":
+        try:
+            import aiosqlite
+            from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+            _connection = await aiosqlite.connect(settings.CHECKPOINT_DB_PATH)
+            # 여러 워커가 같은 파일에 쓰므로 WAL 모드 사용
+            await _connection.execute("PRAGMA journal_mode=WAL")
+            saver = AsyncSqliteSaver(_connection)
+            await saver.setup()
+            _checkpointer = saver
+            logger.info("SQLite 체크포인터 사용: %s", settings.CHECKPOINT_DB_PATH)
+            return _checkpointer
+        except ImportError as e:
+            logger.warning("langgraph-checkpoint-sqlite/aiosqlite가 없어 메모리 체크포인터를 사용합니다: %s", e)
+
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    _checkpointer = InMemorySaver()
+    return _checkpointer
+
+
+async def close_checkpointer():
+    global _checkpointer, _connection
+    if _connection is not None:
+        await _connection.close()
+    _checkpointer = _connection = None
+
+
+def get_checkpointer() -> Optional[Any]:
+    return _checkpointer
+
+
+def _is_sqlite() -> bool:
+    return _connection is not None
+
+
+async def prune_thread(thread_id: str):
+    """
+    thread의 최신 체크포인트만 남기고 이전 체크포인트를 지웁니다.
+    그래프는 노드(step)마다 체크포인트를 남기지만, 다음 턴에 필요한 것은 마지막 상태뿐입니다.
+    """
+    if _is_sqlite():
+        latest = "SELECT MAX(checkpoint_id) FROM checkpoints WHERE thread_id = ?"
+        # 같은 연결을 쓰는 체크포인터의 쓰기/커밋과 섞이지 않도록 체크포인터의 잠금 안에서 실행
+        async with _checkpointer.lock:
+            await _connection.execute(
+                f"DELETE FROM writes WHERE thread_id = ? AND checkpoint_id < ({latest})", (thread_id, thread_id)
+            )
+            await _connection.execute(
+                f"DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_id < ({latest})", (thread_id, thread_id)
+            )
+            await _connection.commit()
+    elif _checkpointer is not None:
+        _prune_memory_thread(thread_id)
+
+
+def _prune_memory_thread(thread_id: str):
+    """
+    InMemorySaver는 이전 체크포인트만 골라 지우는 API가 없으므로,
+    최신 체크포인트를 읽어 thread를 지운 뒤 다시 저장합니다. (await 없이 실행되어 중간 상태가 보이지 않음)
+    그래프에 하위 그래프가 없으므로 기본 네임스페이스("")만 다룹니다.
+    """
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    latest = _checkpointer.get_tuple(config)
+    if latest is None:
+        return
+    _checkpointer.delete_thread(thread_id)
+    saved = _checkpointer.put(
+        config, latest.checkpoint, latest.metadata, latest.checkpoint["channel_versions"]
+    )
+    writes_by_task = {}
+    for task_id, channel, value in latest.pending_writes or []:
+        writes_by_task.setdefault(task_id, []).append((channel, value))
+    for task_id, writes in writes_by_task.items():
+        _checkpointer.put_writes(saved, writes, task_id)
+
+
+def delete_thread(thread_id: str):
+    """채팅 세션 삭제 시 해당 thread의 체크포인트를 모두 지웁니다. (동기 라우터에서 호출)"""
+    if _is_sqlite():
+        # 이벤트 루프의 aiosqlite 연결 대신 별도 연결로 삭제 (WAL이라 동시 접근 가능)
+        conn = sqlite3.connect(settings.CHECKPOINT_DB_PATH, timeout=10)
+        try:
+            with conn:
+                conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+                conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+        finally:
+            conn.close()
+    elif _checkpointer is not None and hasattr(_checkpointer, "delete_thread"):
+        _checkpointer.delete_thread(thread_id)
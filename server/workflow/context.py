@@ -0,0 +1,194 @@
+import logging
+import functools
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+# --- RAG 참고 문서(Context) 조립 ---
+# 청크 분할 시 chunk_overlap만큼 앞뒤 청크가 겹치고, 같은 출처의 인접 청크가 함께 검색되는 경우가 많습니다.
+# 그대로 이어 붙이면 같은 문장이 반복되어 프롬프트 토큰(= 답변 생성 지연 시간과 비용)이 늘어나므로
+#   1. 같은 출처에서 겹치거나 맞닿은 청크를 원문 위치(start_index) 기준으로 하나의 구간으로 합치고
+#      (start_index가 없는 이전 인덱스는 앞 청크의 끝과 뒤 청크의 시작이 같은 문자열인지로 판단)
+#   2. 다른 구간에 이미 포함된 청크는 제외한 뒤
+#   3. Rerank 순서대로 토큰 예산(token_budget) 안에 들어가는 만큼만 담습니다.
+
+CONTEXT_HEADER = "--- 참고 문서 시작 ---\n"
+CONTEXT_FOOTER = "--- 참고 문서 끝 ---"
+# start_index가 없을 때 텍스트로 겹침을 판단하는 최소 길이 (우연히 같은 짧은 문자열은 무시)
+MIN_TEXT_OVERLAP = 20
+# 마지막 구간을 잘라서라도 넣을 최소 남은 토큰 수
+MIN_PARTIAL_TOKENS = 64
+
+
+@functools.lru_cache(maxsize=4)
+def _encoding(name: str):
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        # tiktoken이 없거나 오프라인이라 BPE 파일을 받을 수 없는 경우 근사치 사용
+        logger.warning("tiktoken 인코딩을 불러올 수 없어 토큰 수를 근사합니다: %s", e)
+        return None
+
+
+def count_tokens(text: str, encoding_name: str = "o200k_base") -> int:
+    encoding = _encoding(encoding_name)
+    if encoding is None:
+        # UTF-8 3바이트(한글 1자)를 1토큰으로 보는 보수적인 근사
+        return (len(text.encode("utf-8")) + 2) // 3
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, encoding_name: str = "o200k_base") -> str:
+    encoding = _encoding(encoding_name)
+    if encoding is None:
+        total = count_tokens(text, encoding_name)
+        return text if total <= max_tokens else text[:len(text) * max_tokens // max(total, 1)]
+    tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+
+
+@dataclass
+class _Block:
+    """같은 출처에서 하나로 합친 원문 구간"""
+    source: str
+    text: str
+    rank: int  # 구성 청크 중 가장 높은 Rerank 순위
+    start: Optional[int] = None
+    chunks: List[int] = field(default_factory=list)
+
+    @property
+    def end(self) -> Optional[int]:
+        return None if self.start is None else self.start + len(self.text)
+
+
+def _text_overlap(left: str, right: str, max_overlap: int) -> int:
+    """left의 끝과 right의 시작이 겹치는 가장 긴 길이 (MIN_TEXT_OVERLAP 미만이면 0)"""
+    for size in range(min(len(left), len(right), max_overlap), MIN_TEXT_OVERLAP - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _merge_offsets(block: _Block, start: int, text: str, adjacent_gap: int) -> bool:
+    """원문 위치로 겹치거나 맞닿은 청크를 구간에 합칩니다. 합쳤으면 True"""
+    end = start + len(text)
+    if start > block.end + adjacent_gap or end < block.start - adjacent_gap:
+        return False
+    if start >= block.start and end <= block.end:
+        return True  # 이미 포함됨
+    if start < block.start:
+        # 앞쪽으로 확장 (사이 공백은 줄바꿈으로 채움)
+        joiner = "" if end >= block.start else "\n"
+        block.text = text[:max(block.start - start, 0)] + joiner + block.text
+        block.start = start
+    if end > block.end:
+        joiner = "" if start <= block.end else "\n"
+        block.text = block.text + joiner + text[max(block.end - start, 0):]
+    return True
+
+
+def _merge_text(block: _Block, text: str, max_overlap: int) -> bool:
+    """원문 위치가 없을 때 문자열 겹침으로 합칩니다. 합쳤으면 True"""
+    if text in block.text:
+        return True
+    overlap = _text_overlap(block.text, text, max_overlap)
+    if overlap:
+        block.text += text[overlap:]
+        return True
+    overlap = _text_overlap(text, block.text, max_overlap)
+    if overlap:
+        block.text = text + block.text[overlap:]
+        return True
+    return False
+
+
+def merge_chunks(documents: List[Document], adjacent_gap: int = 1, max_text_overlap: int = 300) -> List[_Block]:
+    """Rerank 순서의 청크를 출처별 구간으로 합치고, 가장 높은 순위 기준으로 정렬하여 반환합니다."""
+    blocks: List[_Block] = []
+    for rank, doc in enumerate(documents):
+        source = doc.metadata.get("source", "알 수 없음")
+        start = doc.metadata.get("start_index")
+        text = doc.page_content
+        merged_into = None
+        for block in blocks:
+            if block.source != source:
+                continue
+            if start is not None and block.start is not None:
+                merged = _merge_offsets(block, start, text, adjacent_gap)
+            else:
+                merged = _merge_text(block, text, max_text_overlap)
+            if merged:
+                block.chunks.append(rank)
+                merged_into = block
+                break
+        if merged_into is None:
+            blocks.append(_Block(source=source, text=text, rank=rank, start=start, chunks=[rank]))
+            continue
+
+        # 새 청크로 넓어진 구간이 같은 출처의 다른 구간과 이어질 수 있으므로 다시 합침
+        for other in [b for b in blocks if b is not merged_into and b.source == source]:
+            if merged_into.start is not None and other.start is not None:
+                merged = _merge_offsets(merged_into, other.start, other.text, adjacent_gap)
+            else:
+                merged = _merge_text(merged_into, other.text, max_text_overlap)
+            if merged:
+                merged_into.rank = min(merged_into.rank, other.rank)
+                merged_into.chunks.extend(other.chunks)
+                blocks.remove(other)
+    return sorted(blocks, key=lambda block: block.rank)
+
+
+@dataclass
+class RagContext:
+    text: str
+    tokens: int
+    raw_tokens: int  # 합치기/예산 적용 전 청크를 그대로 이어 붙였을 때의 토큰 수
+    chunks: int
+    blocks: int
+    dropped_chunks: int = 0
+    truncated: bool = False
+
+
+def _format_block(index: int, block: _Block) -> str:
+    return f"[문서 {index} (출처: {block.source})]\n{block.text}\n\n"
+
+
+def build_rag_context(documents: List[Document], token_budget: int, encoding_name: str = "o200k_base") -> RagContext:
+    """Rerank 순서의 문서로 토큰 예산 안에 들어가는 참고 문서 문자열을 만듭니다."""
+    raw_tokens = sum(count_tokens(doc.page_content, encoding_name) for doc in documents)
+    blocks = merge_chunks(documents)
+
+    remaining = token_budget - count_tokens(CONTEXT_HEADER + CONTEXT_FOOTER, encoding_name)
+    parts, used_chunks, truncated = [], 0, False
+    for block in blocks:
+        formatted = _format_block(len(parts) + 1, block)
+        tokens = count_tokens(formatted, encoding_name)
+        if tokens <= remaining:
+            parts.append(formatted)
+            remaining -= tokens
+            used_chunks += len(block.chunks)
+            continue
+        # 예산을 넘는 구간은 남은 예산이 충분하면 잘라서 넣고, 이후 구간은 넣지 않습니다.
+        header_tokens = count_tokens(_format_block(len(parts) + 1, _Block(block.source, "", block.rank)), encoding_name)
+        if remaining - header_tokens >= MIN_PARTIAL_TOKENS or not parts:
+            block.text = truncate_to_tokens(block.text, max(remaining - header_tokens, 0), encoding_name)
+            parts.append(_format_block(len(parts) + 1, block))
+            used_chunks += len(block.chunks)
+            truncated = True
+        break
+
+    text = CONTEXT_HEADER + "".join(parts) + CONTEXT_FOOTER
+    return RagContext(
+        text=text,
+        tokens=count_tokens(text, encoding_name),
+        raw_tokens=raw_tokens,
+        chunks=len(documents),
+        blocks=len(parts),
+        dropped_chunks=len(documents) - used_chunks,
+        truncated=truncated,
+    )
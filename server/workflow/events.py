@@ -0,0 +1,123 @@
+from typing import Any, AsyncIterator, Dict, Literal, Optional, Tuple, TypedDict
+
+# --- 스트림 이벤트 프로토콜 ---
+# 라우터와 SSE 인코더가 주고받는 이벤트는 (이벤트 타입, 데이터) 튜플입니다.
+#   - "stage": 그래프 진행 단계 알림 (StageEvent)
+#   - "token": 답변 토큰 조각 (str). SSE 인코더가 합쳐서 "update" 프레임으로 전송
+#   - "error": 오류 메시지 (str)
+#   - "end":   스트림 종료 (EndEvent)
+EventType = Literal["stage", "token", "error", "end"]
+StreamEvent = Tuple[EventType, Any]
+
+# 토큰을 클라이언트로 전달할 답변 생성 노드
+ANSWER_NODES = {"generate_rag_answer", "generate_normal_answer"}
+
+
+class StageEvent(TypedDict, total=False):
+    """그래프 진행 단계 이벤트의 데이터"""
+    stage: Literal["classified", "query_transformed", "retrieved", "reranked", "generating"]
+    node: str
+    intent: str  # classified
+    query: str  # query_transformed
+    count: int  # retrieved / reranked
+
+
+class EndEvent(TypedDict):
+    """스트림 종료 이벤트의 데이터"""
+    full_response: str
+
+
+def build_stage_event(node: str, update: Optional[Dict[str, Any]]) -> Optional[StageEvent]:
+    """노드의 상태 업데이트(stream_mode="updates")를 단계 이벤트로 변환합니다."""
+    update = update or {}
+    if node == "classify_intent":
+        return {"stage": "classified", "node": node, "intent": update.get("intent")}
+    if node == "transform_query":
+        return {"stage": "query_transformed", "node": node, "query": update.get("transformed_query")}
+    if node == "retrieve_documents":
+        return {"stage": "retrieved", "node": node, "count": len(update.get("documents") or [])}
+    if node == "rerank_documents":
+        return {"stage": "reranked", "node": node, "count": len(update.get("documents") or [])}
+    return None
+
+
+class GraphEventStream:
+    """
+    컴파일된 그래프를 메시지(토큰) 단위 + 노드 업데이트 단위로 함께 스트리밍하여
+    StreamEvent로 변환합니다.
+
+    - stream_mode="messages": 답변 노드 안의 LLM 토큰을 그대로 전달 (문자열 비교/누적 없음)
+    - stream_mode="updates": 각 노드 완료 시 단계 이벤트를 전달 (검색 단계 진행 상황 표시)
+
+    반복이 끝나면 self.answer에 답변 노드가 상태에 기록한 최종 답변이 담깁니다.
+    반복 도중 취소되면 aclose()로 그래프 스트림(및 진행 중인 LLM 호출)을 닫고,
+    partial_answer로 그때까지 전달된 토큰을 확인할 수 있습니다.
+    speculation_id에는 이번 턴에 시작된 추측 검색 ID가 담깁니다. (취소/실패 시 정리용)
+    """
+
+    def __init__(self, graph, state: Dict[str, Any], config: Dict[str, Any]):
+        self.graph = graph
+        self.state = state
+        self.config = config
+        self.answer = ""
+        self.token_count = 0
+        self.speculation_id = None
+        self._tokens = []
+        self._iterator = None
+
+    @property
+    def partial_answer(self) -> str:
+        """지금까지 클라이언트로 전달된 토큰을 이어 붙인 (미완성일 수 있는) 답변"""
+        return self.answer or "".join(self._tokens)
+
+    def __aiter__(self) -> AsyncIterator[StreamEvent]:
+        if self._iterator is None:
+            self._iterator = self._iterate()
+        return self._iterator
+
+    async def aclose(self):
+        """그래프 스트림을 닫습니다. 실행 중인 노드 태스크와 LLM 스트림이 함께 취소됩니다."""
+        if self._iterator is not None:
+            await self._iterator.aclose()
+
+    def _on_token(self, content: str) -> StreamEvent:
+        self.token_count += 1
+        self._tokens.append(content)
+        return "token", content
+
+    async def _iterate(self) -> AsyncIterator[StreamEvent]:
+        generating_announced = False
+        graph_stream = self.graph.astream(
+            self.state, config=self.config, stream_mode=["messages", "updates"]
+        )
+
+        try:
+            async for mode, chunk in graph_stream:
+                if mode == "messages":
+                    message, metadata = chunk
+                    if metadata.get("langgraph_node") not in ANSWER_NODES:
+                        # 의도 분류 / 쿼리 변환 노드의 LLM 출력은 클라이언트에 보내지 않음
+                        continue
+                    if not generating_announced:
+                        generating_announced = True
+                        yield "stage", {"stage": "generating", "node": metadata["langgraph_node"]}
+                    if message.content:
+                        yield self._on_token(message.content)
+
+                elif mode == "updates":
+                    for node, update in chunk.items():
+                        if node in ANSWER_NODES:
+                            answer = (update or {}).get("answer") or ""
+                            # LLM이 토큰 스트리밍을 하지 않은 경우, 최종 답변을 한 번에 전달
+                            if answer and not self._tokens:
+                                yield self._on_token(answer)
+                            self.answer = answer
+                            continue
+                        if (update or {}).get("speculation_id"):
+                            self.speculation_id = update["speculation_id"]
+                        stage = build_stage_event(node, update)
+                        if stage:
+                            yield "stage", stage
+        finally:
+            # 소비자가 중간에 멈춰도(클라이언트 이탈) 그래프 스트림을 확실히 닫습니다.
+            await graph_stream.aclose()
@@ -1,33 +1,42 @@
+import logging
 from functools import partial
 from langgraph.graph import StateGraph, END
 
 from workflow.state import GraphState
 from workflow.nodes import node_classify_intent, node_transform_query, node_retrieve_documents, node_rerank_documents, edge_grade_documents, node_generate_rag_answer, node_generate_normal_answer
+from workflow.instrumentation import instrument_node
+from workflow.checkpointer import get_checkpointer
 
+logger = logging.getLogger(__name__)
 
-def build_graph(vector_store: any):
+
+def build_graph(vector_store: any, checkpointer: any = None):
     """
     LangGraph 워크플로우를 구축하고 컴파일합니다.
     Vector Store를 인자로 받아 node_retrieve_documents에 바인딩합니다.
+    checkpointer가 주어지면 thread_id별 상태를 저장/로드합니다.
     """
 
     workflow = StateGraph(GraphState)
 
     # --- 1. 노드 정의 ---
-    workflow.add_node("classify_intent", node_classify_intent)
-    workflow.add_node("transform_query", node_transform_query)
+    # 모든 노드는 instrument_node로 감싸 노드별 실행 시간을 메트릭으로 기록합니다.
+    workflow.add_node("classify_intent", instrument_node("classify_intent", node_classify_intent))
+    # 쿼리 변환 중 원래 질문으로 추측 검색을 시작하므로 Vector Store 바인딩
+    transform_partial = partial(node_transform_query, vector_store=vector_store)
+    workflow.add_node("transform_query", instrument_node("transform_query", transform_partial))
 
     # Vector Store 바인딩
     retrieve_partial = partial(node_retrieve_documents, vector_store=vector_store)
-    workflow.add_node("retrieve_documents", retrieve_partial)
+    workflow.add_node("retrieve_documents", instrument_node("retrieve_documents", retrieve_partial))
 
     # Reranker 바인딩
     rerank_partial = partial(node_rerank_documents)
-    workflow.add_node("rerank_documents", rerank_partial)
+    workflow.add_node("rerank_documents", instrument_node("rerank_documents", rerank_partial))
 
     # 답변 생성 노드
-    workflow.add_node("generate_rag_answer", node_generate_rag_answer)
-    workflow.add_node("generate_normal_answer", node_generate_normal_answer)
+    workflow.add_node("generate_rag_answer", instrument_node("generate_rag_answer", node_generate_rag_answer))
+    workflow.add_node("generate_normal_answer", instrument_node("generate_normal_answer", node_generate_normal_answer))
 
 
     # --- 2. 엣지(흐름) 정의 ---
@@ -64,9 +73,9 @@ def build_graph(vector_store: any):
     workflow.add_edge("generate_normal_answer", END)
 
     # --- 3. 그래프 컴파일 ---
-    print("LangGraph 컴파일 중...")
-    app = workflow.compile()
-    print("LangGraph 컴파일 완료.")
+    logger.debug("LangGraph 컴파일 중...")
+    app = workflow.compile(checkpointer=checkpointer)
+    logger.info("LangGraph 컴파일 완료.")
     return app
 
 
@@ -83,15 +92,15 @@ def get_compiled_graph(vector_store: any):
     (Vector Store가 업데이트되면 다시 호출될 수 있도록 수정)
     """
     global compiled_graph
-    print("컴파일된 LangGraph 인스턴스 생성/업데이트 중...")
-    compiled_graph = build_graph(vector_store)
+    logger.debug("컴파일된 LangGraph 인스턴스 생성/업데이트 중...")
+    compiled_graph = build_graph(vector_store, get_checkpointer())
     return compiled_graph
 
 
 def get_graph_app():
     """라우터에서 사용할 컴파일된 그래프 인스턴스를 반환합니다."""
     if compiled_graph is None:
-        print("경고: 그래프가 아직 컴파일되지 않았습니다. (Vector Store 로딩 전일 수 있음)")
+        logger.warning("그래프가 아직 컴파일되지 않았습니다. (Vector Store 로딩 전일 수 있음)")
         # 임시로 빈 그래프라도 반환하거나 (이 경우 vector_store가 None)
         # 아니면 에러를 발생시켜야 하지만, 우선 로딩 중임을 가정
         return None
@@ -0,0 +1,127 @@
+import time
+import inspect
+import logging
+import functools
+from typing import Any, Callable, Dict
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# --- 워크플로우 메트릭 ---
+NODE_DURATION = metrics.histogram("rag_node_duration_seconds", "LangGraph 노드별 실행 시간", ["node"])
+NODE_ERRORS = metrics.counter("rag_node_errors_total", "LangGraph 노드 실행 중 발생한 예외 수", ["node"])
+
+LLM_DURATION = metrics.histogram("llm_request_duration_seconds", "LLM 호출 전체 소요 시간", ["node"])
+LLM_TTFT = metrics.histogram("llm_time_to_first_token_seconds", "LLM 첫 토큰까지의 시간", ["node"])
+LLM_TOKENS = metrics.counter("llm_tokens_total", "LLM 토큰 사용량", ["node", "kind"])
+
+_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 10, 15, 20, 30, 50)
+RETRIEVED_DOCUMENTS = metrics.histogram(
+    "rag_retrieved_documents", "검색 단계의 후보 문서 수", buckets=_COUNT_BUCKETS)
+RERANKED_DOCUMENTS = metrics.histogram(
+    "rag_reranked_documents", "Rerank 후 남은 문서 수", buckets=_COUNT_BUCKETS)
+RERANK_FILTER_RATE = metrics.histogram(
+    "rag_rerank_filter_rate", "Rerank 단계에서 걸러진 후보 비율",
+    buckets=(0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0))
+RERANK_PAIRS = metrics.histogram(
+    "rag_rerank_pairs", "질문 하나당 Cross-Encoder로 평가한 (질문, 문서) 쌍 수", buckets=_COUNT_BUCKETS)
+RERANK_OUTCOMES = metrics.counter(
+    "rag_rerank_outcomes_total", "단계적 Rerank 종료 방식 (early_exit / expanded / completed)", ["outcome"])
+RAG_CONTEXT_TOKENS = metrics.histogram(
+    "rag_context_tokens", "참고 문서 토큰 수 (raw: 청크를 그대로 이어 붙인 경우, final: 합치기/예산 적용 후)", ["kind"],
+    buckets=(250, 500, 1000, 1500, 2000, 3000, 4000, 6000, 8000))
+
+
+def instrument_node(name: str, func: Callable) -> Callable:
+    """
+    노드 함수의 실행 시간을 rag_node_duration_seconds 에 기록하는 래퍼를 반환합니다.
+    동기/비동기 노드를 모두 지원하며, LangGraph가 시그니처(config 인자 등)를 그대로 인식하도록
+    functools.wraps로 원본 정보를 유지합니다.
+    """
+    target = func.func if isinstance(func, functools.partial) else func
+
+    if inspect.iscoroutinefunction(target):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                NODE_ERRORS.inc(node=name)
+                raise
+            finally:
+                NODE_DURATION.observe(time.perf_counter() - started, node=name)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            NODE_ERRORS.inc(node=name)
+            raise
+        finally:
+            NODE_DURATION.observe(time.perf_counter() - started, node=name)
+
+    return wrapper
+
+
+def extract_usage(response) -> Dict[str, int]:
+    """스트리밍(usage_metadata) / 비스트리밍(llm_output.token_usage) 응답 모두에서 토큰 사용량을 추출합니다."""
+    for generations in response.generations or []:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            usage = getattr(message, "usage_metadata", None)
+            if usage:
+                return usage
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    if token_usage:
+        return {
+            "input_tokens": token_usage.get("prompt_tokens", 0),
+            "output_tokens": token_usage.get("completion_tokens", 0),
+        }
+    return {}
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """
+    그래프 실행 config의 callbacks로 전달되어 모든 LLM 호출의
+    소요 시간, 첫 토큰까지의 시간(TTFT), 토큰 사용량을 노드별로 기록합니다.
+    """
+
+    # 값 기록만 하므로 스레드 풀을 거치지 않고 이벤트 루프에서 바로 실행
+    run_inline = True
+
+    def __init__(self):
+        self._runs: Dict[UUID, Dict[str, Any]] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node", "unknown")
+        self._runs[run_id] = {"node": node, "started": time.perf_counter(), "first_token": False}
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs):
+        run = self._runs.get(run_id)
+        if run is not None and not run["first_token"]:
+            run["first_token"] = True
+            LLM_TTFT.observe(time.perf_counter() - run["started"], node=run["node"])
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        node = run["node"]
+        LLM_DURATION.observe(time.perf_counter() - run["started"], node=node)
+
+        usage = extract_usage(response)
+        if usage:
+            LLM_TOKENS.inc(usage.get("input_tokens", 0), node=node, kind="prompt")
+            LLM_TOKENS.inc(usage.get("output_tokens", 0), node=node, kind="completion")
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._runs.pop(run_id, None)
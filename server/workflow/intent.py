@@ -0,0 +1,217 @@
+import os
+import re
+import json
+import math
+import time
+import logging
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from utils import components, metrics
+from utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+# --- 로컬 의도 분류기 ---
+# 질문마다 GPT-4o(JSON 모드)로 의도를 분류하면 답변 첫 토큰 전에 LLM 왕복이 한 번 더 생깁니다.
+#   1. 키워드/정규식 규칙: 입시 요강에만 쓰이는 표현이 들어간 질문, 짧은 인사/감사 같은 잡담을 바로 분류
+#   2. 문자 n-gram TF-IDF + 로지스틱 회귀: 로그에 쌓인 (질문, LLM 분류 결과)로 학습 (python -m tools.train_intent)
+#      예측은 sklearn을 거치지 않고 n-gram 가중치 dict로 직접 계산 (질문당 수십 µs)
+#   3. 규칙에 걸리지 않고 모델 확률도 INTENT_CONFIDENCE_THRESHOLD 미만이면 기존 LLM 분류기 호출
+# LLM이 분류한 질문은 INTENT_LOG_PATH에 기록되어 다음 학습 데이터가 됩니다.
+# 주의: scikit-learn/joblib은 모델을 처음 로드할 때 import 합니다. (저장된 n-gram 분석기가 sklearn 함수)
+
+INTENTS = ("admission_question", "general_chat")
+
+# 입시 요강 질문으로 볼 표현 (하나라도 있으면 admission_question)
+# 입시 밖에서도 흔한 단어(대학교, 학과, 전공, 면접, 합격, 장학, 기숙사 등)는 넣지 않습니다.
+# 예: "서울대학교 맛집 추천해줘", "학과 친구랑 싸웠어" → 규칙 대신 모델(없거나 확신이 없으면 LLM)이 분류
+# 일상어와 겹치는 표현(전형적인, 수시로, 정시 퇴근, 원서로 읽기)은 입시 문맥일 때만 매칭합니다.
+ADMISSION_PATTERN = re.compile(
+    r"모집\s*요강|모집\s*인원|입학\s*전형|전형(?!적)|입시|(수시|정시)\s*(모집|전형|원서|지원|합격|선발|인원|\d)|"
+    r"원서\s*(접수|마감|제출)|지원\s*자격|수능\s*최저|최저\s*학력|내신\s*(등급|성적|반영)|학생부|생기부|"
+    r"자기소개서|교사\s*추천서|편입학|충원\s*(합격|인원|율)|예비\s*번호|추가\s*합격|커트라인|반영\s*비율|경쟁률"
+)
+# 잡담으로 볼 시작 표현 (입시 키워드가 없고 짧은 문장일 때만 적용)
+GENERAL_CHAT_PATTERN = re.compile(
+    r"^\s*(안녕|하이|반가|고마|감사|땡큐|수고|잘\s*자|좋은\s*(하루|아침|밤|저녁)|ㅎㅇ|ㅋㅋ|ㅎㅎ|"
+    r"너는?\s*누구|넌\s*누구|이름이\s*뭐|hi\b|hello|hey|thanks|thank\s*you)",
+    re.IGNORECASE,
+)
+GENERAL_CHAT_MAX_LENGTH = 30
+
+INTENT_DECISIONS = metrics.counter(
+    "rag_intent_decisions_total", "의도 분류 결정 주체 (rule / model / llm / default)", ["source"]
+)
+INTENT_LOCAL_DURATION = metrics.histogram(
+    "rag_intent_local_seconds", "로컬 의도 분류(규칙 + 모델) 소요 시간",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05),
+)
+
+_log_lock = threading.Lock()
+
+
+@dataclass
+class IntentPrediction:
+    intent: str
+    confidence: float
+    source: str  # rule / model / llm / default
+    matched: Optional[str] = None  # 규칙으로 분류한 경우 매칭된 표현 (로그 확인용)
+
+
+def classify_rules(question: str) -> Optional[IntentPrediction]:
+    """키워드/정규식 규칙으로 분류합니다. 규칙에 걸리지 않으면 None"""
+    match = ADMISSION_PATTERN.search(question)
+    if match:
+        return IntentPrediction("admission_question", 1.0, "rule", match.group(0))
+    if len(question.strip()) <= GENERAL_CHAT_MAX_LENGTH:
+        match = GENERAL_CHAT_PATTERN.search(question)
+        if match:
+            return IntentPrediction("general_chat", 1.0, "rule", match.group(0).strip())
+    return None
+
+
+def build_model():
+    """학습 전 분류 모델 (한국어 형태소 분석 없이 쓸 수 있도록 문자 n-gram 사용)"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+
+    return make_pipeline(
+        TfidfVectorizer(analyzer="char_wb", ngram_range=(1, 3), sublinear_tf=True),
+        LogisticRegression(max_iter=1000, class_weight="balanced"),
+    )
+
+
+class LinearIntentModel:
+    """
+    학습한 TF-IDF + 로지스틱 회귀 파이프라인을 질문 하나씩 예측하도록 펼친 모델입니다.
+    sklearn의 predict_proba는 희소 행렬 생성/입력 검증 비용 때문에 질문 하나에 1ms 이상 걸리므로,
+    n-gram별 (idf, 가중치)를 dict로 들고 같은 계산(sublinear tf, l2 정규화, 시그모이드)을 직접 합니다.
+    """
+
+    def __init__(self, analyzer: Callable[[str], List[str]], weights: Dict[str, Tuple[float, float]],
+                 intercept: float, classes: Sequence[str]):
+        self.analyzer = analyzer
+        self.weights = weights
+        self.intercept = intercept
+        self.classes = tuple(str(label) for label in classes)
+
+    @classmethod
+    def from_pipeline(cls, pipeline: Any) -> "LinearIntentModel":
+        vectorizer, classifier = pipeline.steps[0][1], pipeline.steps[-1][1]
+        coef = classifier.coef_[0]
+        weights = {
+            term: (float(vectorizer.idf_[index]), float(coef[index]))
+            for term, index in vectorizer.vocabulary_.items()
+        }
+        return cls(vectorizer.build_analyzer(), weights, float(classifier.intercept_[0]), classifier.classes_)
+
+    def predict(self, question: str) -> Tuple[str, float]:
+        """(의도, 확률)을 반환합니다."""
+        dot = squared = 0.0
+        for term, count in Counter(self.analyzer(question)).items():
+            weight = self.weights.get(term)
+            if weight is None:
+                continue
+            value = (1 + math.log(count)) * weight[0]
+            squared += value * value
+            dot += value * weight[1]
+        z = (dot / math.sqrt(squared) if squared else 0.0) + self.intercept
+        positive = 1 / (1 + math.exp(-z))
+        # 이진 로지스틱 회귀의 양성 클래스는 classes[1]
+        return (self.classes[1], positive) if positive >= 0.5 else (self.classes[0], 1 - positive)
+
+
+def save_model(model: LinearIntentModel, path: str, info: Optional[Dict[str, Any]] = None):
+    """학습한 모델을 joblib으로 저장합니다. (임시 파일에 쓴 뒤 교체)"""
+    import joblib
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump({"model": model, "info": info or {}}, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def load_model(path: Optional[str] = None) -> Optional[LinearIntentModel]:
+    """저장된 모델을 읽습니다. 파일이 없으면 None (규칙 + LLM으로만 분류)"""
+    path = path or settings.INTENT_MODEL_PATH
+    if not os.path.exists(path):
+        logger.info("의도 분류 모델이 없어 규칙과 LLM으로 분류합니다: %s", path)
+        return None
+    import joblib
+
+    saved = joblib.load(path)
+    logger.info("의도 분류 모델 로드", extra={"path": path, **saved.get("info", {})})
+    return saved["model"]
+
+
+# 모델은 최초 사용 시 한 번 로드 (다시 학습한 모델은 서버 재시작 후 적용)
+components.register("intent_model", load_model)
+
+
+def predict_model(model: LinearIntentModel, question: str) -> IntentPrediction:
+    intent, confidence = model.predict(question)
+    return IntentPrediction(intent, confidence, "model")
+
+
+def classify_local(question: str, model: Optional[LinearIntentModel] = None) -> Optional[IntentPrediction]:
+    """
+    규칙 → 모델 순서로 분류합니다. 모델이 없으면 규칙 결과만 반환합니다. (둘 다 없으면 None)
+    model을 주지 않으면 등록된 intent_model 컴포넌트를 사용합니다.
+    """
+    started = time.perf_counter()
+    try:
+        prediction = classify_rules(question)
+        if prediction is not None:
+            return prediction
+        model = model if model is not None else components.get("intent_model")
+        return predict_model(model, question) if model is not None else None
+    finally:
+        INTENT_LOCAL_DURATION.observe(time.perf_counter() - started)
+
+
+def record_decision(source: str):
+    INTENT_DECISIONS.inc(source=source)
+
+
+def log_llm_label(question: str, intent: str, local: Optional[IntentPrediction] = None):
+    """LLM이 분류한 질문을 학습 데이터로 기록합니다. (INTENT_LOG_PATH가 없으면 기록 안 함)"""
+    path = settings.INTENT_LOG_PATH
+    if not path:
+        return
+    entry = {"question": question, "intent": intent, "ts": time.time()}
+    if local is not None:
+        # 로컬 분류기가 확신하지 못했던 결과 (평가 시 LLM과의 불일치 분석용)
+        entry.update(local_intent=local.intent, local_confidence=round(local.confidence, 4))
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with _log_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    except OSError as e:
+        logger.warning("의도 분류 로그 기록 실패: %s", e)
+
+
+def read_labels(path: str) -> List[Dict[str, str]]:
+    """
+    {"question", "intent"} JSONL을 읽습니다. (LLM 분류 로그, 벤치마크 questions.jsonl 모두 사용 가능)
+    같은 질문이 여러 번 있으면 마지막 라벨을 사용합니다.
+    """
+    labels: Dict[str, str] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry.get("intent") in INTENTS and entry.get("question"):
+                labels[entry["question"].strip()] = entry["intent"]
+    return [{"question": question, "intent": intent} for question, intent in labels.items()]
+
+
+def warm_up():
+    """모델(및 scikit-learn)을 미리 로드합니다."""
+    model = components.get("intent_model")
+    if model is not None:
+        model.predict("워밍업")
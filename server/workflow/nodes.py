@@ -1,5 +1,8 @@
 import json
-from typing import List, Literal
+import asyncio
+import logging
+from functools import partial
+from typing import Callable, List, Literal, Optional, Tuple
 
 from langchain_core.documents import Document
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
@@ -9,10 +12,19 @@ from langchain_core.runnables import RunnablePassthrough
 from pydantic import BaseModel, Field
 
 # --- 기존 코드에서 Import ---
-from utils.config import get_llm, get_reranker
-from retrieval.vector_store import search_vector_store
+from utils import tracing
+from utils.config import get_llm, get_reranker, settings
+from retrieval import speculative
+from retrieval.cascade import CascadeConfig, CascadeResult, cascade_rerank
+from retrieval.vector_store import asearch_with_scores
+from workflow import intent
 from workflow.state import GraphState
+from workflow.context import build_rag_context
+from workflow.instrumentation import (
+    RAG_CONTEXT_TOKENS, RETRIEVED_DOCUMENTS, RERANKED_DOCUMENTS, RERANK_FILTER_RATE, RERANK_OUTCOMES, RERANK_PAIRS,
+)
 
+logger = logging.getLogger(__name__)
 
 # --- 1. 의도 분류 노드 ---
 
@@ -23,10 +35,8 @@ class IntentClassifier(BaseModel):
     )
 
 
-def node_classify_intent(state: GraphState):
-    """사용자의 최신 질문을 분석하여 의도를 분류합니다."""
-    print("--- 1. 의도 분류 노드 ---")
-
+def classify_intent_with_llm(question: str) -> str:
+    """LLM(JSON 모드)으로 질문의 의도를 분류합니다. 실패하면 예외를 그대로 전달합니다."""
     llm = get_llm()
     # Pydantic 모델을 JSON 스키마로 변환하여 LLM에 주입 (JSON 모드)
     structured_llm = llm.with_structured_output(IntentClassifier, method="json_mode")
@@ -40,22 +50,61 @@ def node_classify_intent(state: GraphState):
     ])
 
     chain = prompt | structured_llm
+    return chain.invoke({"question": question}).intent
+
+
+def node_classify_intent(state: GraphState):
+    """
+    사용자의 최신 질문을 분석하여 의도를 분류합니다.
+    규칙/로컬 모델이 확신하면 바로 결정하고, 아니면 LLM으로 분류합니다. (workflow.intent 참고)
+    """
+    logger.debug("--- 1. 의도 분류 노드 ---")
+
+    question = state["original_query"]
+    local = None
+    if settings.INTENT_CLASSIFIER != "llm":
+        try:
+            local = intent.classify_local(question)
+        except Exception as e:
+            logger.warning("로컬 의도 분류 실패, LLM으로 분류합니다: %s", e)
+        if local is not None and (
+                local.confidence >= settings.INTENT_CONFIDENCE_THRESHOLD or settings.INTENT_CLASSIFIER == "local"):
+            intent.record_decision(local.source)
+            logger.info("의도 분류 완료", extra={
+                "intent": local.intent, "source": local.source, "confidence": round(local.confidence, 4),
+                "matched": local.matched})
+            return {"intent": local.intent}
+        if settings.INTENT_CLASSIFIER == "local":
+            # LLM을 쓰지 않는 설정에서 규칙/모델 모두 결과가 없으면 RAG 경로로 보냄
+            intent.record_decision("default")
+            return {"intent": "admission_question"}
 
     try:
-        result = chain.invoke({"question": state["original_query"]})
-        print(f"의도 분류 결과: {result.intent}")
-        return {"intent": result.intent}
+        result = classify_intent_with_llm(question)
+        intent.record_decision("llm")
+        intent.log_llm_label(question, result, local)
+        logger.info("의도 분류 완료", extra={"intent": result, "source": "llm"})
+        return {"intent": result}
     except Exception as e:
-        print(f"의도 분류 실패 (기본값 'admission_question'): {e}")
+        logger.warning("의도 분류 실패 (기본값 'admission_question'): %s", e)
+        intent.record_decision("default")
         # 실패 시 기본적으로 RAG 경로를 타도록 설정
         return {"intent": "admission_question"}
 
 
 # --- 2. 쿼리 변환 노드 ---
 
-def node_transform_query(state: GraphState):
-    """채팅 이력을 바탕으로 사용자의 마지막 질문을 RAG 검색에 적합한 독립적인 질문으로 재작성합니다."""
-    print("--- 2. 쿼리 변환 노드 ---")
+def _should_speculate(state: GraphState) -> bool:
+    mode = settings.SPECULATIVE_RETRIEVAL
+    return mode == "always" or (mode == "first_turn" and len(state["messages"]) <= 1)
+
+
+async def node_transform_query(state: GraphState, vector_store: any = None):
+    """
+    채팅 이력을 바탕으로 사용자의 마지막 질문을 RAG 검색에 적합한 독립적인 질문으로 재작성합니다.
+    재작성(LLM 호출)하는 동안 원래 질문으로 검색/Rerank를 미리 시작합니다. (retrieval.speculative 참고)
+    """
+    logger.debug("--- 2. 쿼리 변환 노드 ---")
 
     system_prompt = """당신은 쿼리 재작성 전문 AI입니다. 
     채팅 이력을 바탕으로, 사용자의 마지막 질문을 VectorDB 검색에 적합하도록 명확하고 독립적인 단일 질문으로 재작성하세요.
@@ -83,85 +132,164 @@ def node_transform_query(state: GraphState):
     human_query = state["original_query"]
     history = state["messages"][:-1]  # 마지막 질문 제외
 
-    transformed_query = chain.invoke({
-        "question": human_query,
-        "history": history
-    })
+    speculation_id = None
+    if vector_store is not None and _should_speculate(state):
+        speculation_id = speculative.start(
+            human_query, partial(search_candidates, vector_store=vector_store), rerank_candidates
+        )
+
+    try:
+        transformed_query = await chain.ainvoke({
+            "question": human_query,
+            "history": history
+        })
+    except BaseException:
+        speculative.discard(speculation_id, result="aborted")
+        raise
 
-    print(f"쿼리 변환:\n  - 원본: {human_query}\n  - 변환: {transformed_query}")
-    return {"transformed_query": transformed_query}
+    logger.info("쿼리 변환 완료", extra={"original_query": human_query, "transformed_query": transformed_query})
+    return {"transformed_query": transformed_query, "speculation_id": speculation_id}
 
 
 # --- 3. 문서 검색 노드 ---
 
-def node_retrieve_documents(state: GraphState, vector_store: any):
-    """변환된 쿼리를 사용하여 Vector Store에서 문서를 검색합니다."""
-    print("--- 3. 문서 검색 노드 ---")
+async def search_candidates(query: str, vector_store: any) -> Tuple[List[Document], List[float]]:
+    """Rerank 후보 문서와 벡터 유사도를 검색합니다."""
+    # 평면(flat) 인덱스는 k와 관계없이 전체를 훑으므로, 확장에 쓸 후보(RETRIEVE_MAX_K)까지 한 번에 가져옵니다.
+    # 실제로 Cross-Encoder에 넘길 범위는 Rerank 노드가 단계적으로 정합니다.
+    k = max(settings.RETRIEVE_K, settings.RETRIEVE_MAX_K)
+    results = await asearch_with_scores(query=query, vector_store=vector_store, k=k)
+    return [doc for doc, _ in results], [score for _, score in results]
+
+
+async def _take_speculative_retrieval(state: GraphState, query: str) -> Optional[dict]:
+    """변환된 쿼리가 원래 질문과 충분히 비슷하면 추측 검색 결과를, 아니면 None을 반환합니다. (추측은 버림)"""
+    speculation_id = state.get("speculation_id")
+    speculation = speculative.get(speculation_id)
+    if speculation is None:
+        return None
+    if not speculative.queries_match(speculation.query, query, settings.SPECULATIVE_MIN_SIMILARITY):
+        logger.info("변환된 쿼리가 달라 추측 검색 결과를 버립니다.")
+        speculative.discard(speculation_id)
+        return None
+
+    speculation.claim()
+    try:
+        documents, scores = await speculation.retrieval
+    except Exception as e:
+        logger.warning("추측 검색 실패, 다시 검색합니다: %s", e)
+        speculative.discard(speculation_id, result="failed")
+        return None
+    return {"documents": documents, "retrieval_scores": scores, "speculation_id": speculation_id}
+
+
+async def node_retrieve_documents(state: GraphState, vector_store: any):
+    """변환된 쿼리를 사용하여 Vector Store에서 문서를 검색합니다. (쿼리 임베딩은 캐시/배치 처리)"""
+    logger.debug("--- 3. 문서 검색 노드 ---")
 
     query = state.get("transformed_query")
     if not query:
-        print("오류: 변환된 쿼리가 없습니다.")
-        return {"documents": []}
+        logger.error("변환된 쿼리가 없습니다.")
+        speculative.discard(state.get("speculation_id"))
+        return {"documents": [], "speculation_id": None}
 
     if not vector_store:
-        print("경고: Vector Store가 준비되지 않았습니다.")
-        return {"documents": []}
+        logger.warning("Vector Store가 준비되지 않았습니다.")
+        return {"documents": [], "speculation_id": None}
+
+    speculated = await _take_speculative_retrieval(state, query)
+    if speculated is not None:
+        RETRIEVED_DOCUMENTS.observe(len(speculated["documents"]))
+        logger.info("문서 검색 완료 (추측 검색 결과 사용)", extra={"retrieved": len(speculated["documents"])})
+        return speculated
 
     try:
-        # 기존 retrieval/vector_store.py의 함수 사용
-        documents = search_vector_store(query=query, vector_store=vector_store, k=10)
-        print(f"문서 {len(documents)}개 검색됨")
-        return {"documents": documents}
+        documents, scores = await search_candidates(query, vector_store)
+        RETRIEVED_DOCUMENTS.observe(len(documents))
+        logger.info("문서 검색 완료", extra={"retrieved": len(documents)})
+        return {"documents": documents, "retrieval_scores": scores, "speculation_id": None}
     except Exception as e:
-        print(f"문서 검색 실패: {e}")
-        return {"documents": []}
+        logger.exception("문서 검색 실패: %s", e)
+        return {"documents": [], "speculation_id": None}
 
 
 # --- 4. [신규] Rerank 노드 ---
-def node_rerank_documents(state: GraphState):
+def rerank_candidates(query: str, documents: List[Document], scores: Optional[List[float]],
+                      should_stop: Optional[Callable[[], bool]] = None) -> CascadeResult:
+    """
+    후보 문서를 단계적으로 Rerank합니다. (추측 검색에서도 사용)
+    should_stop이 주어지면 Cross-Encoder 배치마다 확인하여 True면 중단합니다.
+    """
+    reranker = get_reranker()
+    predict = reranker.predict if should_stop is None else speculative.stop_if_discarded(reranker.predict, should_stop)
+    config = CascadeConfig(
+        threshold=settings.RERANK_THRESHOLD,
+        top_n=settings.RERANK_TOP_N,
+        initial_k=settings.RETRIEVE_K,
+        batch_size=settings.RERANK_BATCH_SIZE,
+        early_exit_score=settings.RERANK_EARLY_EXIT_SCORE,
+        early_exit_count=settings.RERANK_EARLY_EXIT_COUNT,
+        prune_margin=settings.RERANK_PRUNE_MARGIN,
+    )
+    # Reranker는 (query, document_text) 쌍의 리스트를 입력으로 받습니다.
+    with tracing.span("rerank.predict", "rerank") as rerank_span:
+        result = cascade_rerank(query, documents, predict, config, scores)
+        if rerank_span is not None:
+            rerank_span.attributes.update(pairs=result.pairs, expansions=result.expansions)
+    return result
+
+
+async def _rerank(state: GraphState, query: str, documents: List[Document]) -> CascadeResult:
+    """추측 검색 결과를 사용 중이면 미리 실행한 Rerank 결과를, 아니면 새로 Rerank한 결과를 반환합니다."""
+    speculation = speculative.finish(state.get("speculation_id"))
+    if speculation is not None:
+        try:
+            result = await speculation.rerank
+            speculative.SPECULATIONS.inc(result="hit")
+            speculative.SPECULATION_SAVED.observe(speculation.saved_seconds())
+            return result
+        except Exception as e:
+            logger.warning("추측 Rerank 실패, 다시 Rerank합니다: %s", e)
+            speculative.SPECULATIONS.inc(result="failed")
+    # Cross-Encoder 추론은 CPU 작업이므로 이벤트 루프를 막지 않도록 스레드에서 실행
+    return await asyncio.to_thread(rerank_candidates, query, documents, state.get("retrieval_scores"))
+
+
+async def node_rerank_documents(state: GraphState):
     """
     검색된(Retrieve) 문서들을 Reranker(Cross-Encoder)를 사용해
     쿼리와의 관련성 점수를 다시 매기고, 관련성 높은 순으로 정렬합니다.
+    벡터 유사도로 후보를 줄이고, 작은 배치로 점수를 매기다 확신도 높은 문서가 충분하면 조기 종료하며,
+    통과한 문서가 없을 때만 후보 범위를 넓힙니다. (retrieval.cascade 참고)
     """
-    print("--- 4. Rerank 노드 ---")
+    logger.debug("--- 4. Rerank 노드 ---")
 
-    reranker = get_reranker()
     query = state.get("transformed_query")
     documents = state.get("documents")
 
     if not documents:
-        print("Rerank: 문서 없음. 단계를 건너뜁니다.")
+        logger.info("Rerank: 문서 없음. 단계를 건너뜁니다.")
+        speculative.discard(state.get("speculation_id"), result="unused")
         return {"documents": []}
 
     try:
-        # Reranker는 (query, document_text) 쌍의 리스트를 입력으로 받습니다.
-        pairs = [(query, doc.page_content) for doc in documents]
-
-        # Reranker 모델로 점수 계산
-        scores = reranker.predict(pairs)
-
-        # (점수, 문서) 쌍으로 묶은 뒤, 점수가 높은 순(내림차순)으로 정렬
-        reranked_docs_with_scores = sorted(
-            zip(scores, documents),
-            key=lambda x: x[0],
-            reverse=True
-        )
-
-        # 일정 점수(Threshold) 이상의 문서만 필터링
-        threshold = 0.7
-        final_documents = [
-            doc for score, doc in reranked_docs_with_scores if score > threshold
-        ]
-
-        # 점수가 높은 상위 5개 문서만 사용
-        final_documents = final_documents[:5]
-
-        print(f"Rerank 완료: {len(documents)}개 -> {len(final_documents)}개 필터링됨 (Threshold: {threshold})")
+        result = await _rerank(state, query, documents)
+
+        final_documents = result.documents
+        RERANK_PAIRS.observe(result.pairs)
+        RERANK_OUTCOMES.inc(outcome="early_exit" if result.early_exit else "expanded" if result.expansions else "completed")
+        RERANKED_DOCUMENTS.observe(len(final_documents))
+        RERANK_FILTER_RATE.observe(1 - len(final_documents) / len(documents))
+        logger.info("Rerank 완료", extra={
+            "candidates": result.candidates, "pruned": result.pruned, "pairs": result.pairs,
+            "expansions": result.expansions, "early_exit": result.early_exit,
+            "kept": len(final_documents), "threshold": settings.RERANK_THRESHOLD,
+        })
 
         return {"documents": final_documents}
 
     except Exception as e:
-        print(f"Rerank 중 오류 발생: {e}")
+        logger.exception("Rerank 중 오류 발생: %s", e)
         return {"documents": []}  # 오류 시 빈 리스트 반환
 
 # --- 5. 문서 검증 노드 (조건부 엣지용) ---
@@ -169,21 +297,21 @@ def edge_grade_documents(state: GraphState) -> Literal["generate_rag", "generate
     """
     Rerank 노드를 거친 후, 최종적으로 질문에 사용할 문서가 남아있는지 확인합니다.
     """
-    print("--- 5. 문서 검증 엣지 (Rerank 후) ---")
+    logger.debug("--- 5. 문서 검증 엣지 (Rerank 후) ---")
 
     if state.get("documents"):
-        print("검증: 관련성 높은 문서 있음 -> RAG 답변")
+        logger.debug("검증: 관련성 높은 문서 있음 -> RAG 답변")
         return "generate_rag"
     else:
-        print("검증: 관련성 높은 문서 없음 -> 일반 답변")
+        logger.debug("검증: 관련성 높은 문서 없음 -> 일반 답변")
         return "generate_normal"
 
 
 # --- 6. 답변 생성 노드 (RAG) ---
 
-async def node_generate_rag_answer(state: GraphState):  # 'async def'로 변경
-    """문서(Context)와 채팅 이력을 바탕으로 최종 답변을 스트리밍 생성합니다."""
-    print("--- 6a. RAG 답변 생성 노드 ---")
+async def node_generate_rag_answer(state: GraphState):
+    """문서(Context)와 채팅 이력을 바탕으로 최종 답변을 생성합니다. (토큰은 messages 스트림으로 전달)"""
+    logger.debug("--- 6a. RAG 답변 생성 노드 ---")
 
     # ... (기존 system_prompt 및 context 포맷팅 코드) ...
     system_prompt = """
@@ -196,46 +324,37 @@ async def node_generate_rag_answer(state: GraphState):  # 'async def'로 변경
     """
 
     # RAG Context 포맷팅
-    context = "--- 참고 문서 시작 ---\n"
-    if state.get("documents"):
-        for i, doc in enumerate(state["documents"]):
-            source = doc.metadata.get("source", "알 수 없음")
-            content = doc.page_content
-            context += f"[문서 {i + 1} (출처: {source})]\n{content}\n\n"
-    context += "--- 참고 문서 끝 ---"
+    # 겹치거나 맞닿은 청크는 합치고, Rerank 순서대로 토큰 예산 안에서만 담습니다. (workflow.context 참고)
+    context = build_rag_context(
+        state.get("documents") or [], settings.RAG_CONTEXT_TOKEN_BUDGET, settings.RAG_TOKEN_ENCODING)
+    RAG_CONTEXT_TOKENS.observe(context.raw_tokens, kind="raw")
+    RAG_CONTEXT_TOKENS.observe(context.tokens, kind="final")
+    logger.info("참고 문서 조립 완료", extra={
+        "chunks": context.chunks, "blocks": context.blocks, "dropped_chunks": context.dropped_chunks,
+        "raw_tokens": context.raw_tokens, "tokens": context.tokens, "truncated": context.truncated,
+    })
 
     # LLM에 전달할 메시지 재구성
     messages = [
         SystemMessage(content=system_prompt),
-        SystemMessage(content=context),  # RAG Context 주입
+        SystemMessage(content=context.text),  # RAG Context 주입
     ]
     # 채팅 이력 추가
     messages.extend(state["messages"])
 
     llm = get_llm()
 
-    # .astream()을 호출하여 청크 스트림을 생성
-    stream = llm.astream(messages)
-
-    # --- 수정된 부분: 스트림을 'return'하는 대신 'yield'합니다 ---
-    full_response = ""
-    async for chunk in stream:
-        if chunk.content:
-            full_response += chunk.content
-            # 각 청크를 'answer' 키를 가진 dict로 yield하여 스트리밍
-            yield {"answer": chunk.content}
-
-    # 마지막으로 전체 응답을 'answer' 키로 yield하여 상태를 최종 업데이트
-    # (LangGraph v0.3+ 에서는 마지막 yield가 최종 상태 업데이트로 간주됨)
-    yield {"answer": full_response}
-    # --- 수정 완료 ---
+    # 토큰 스트리밍은 그래프의 stream_mode="messages"가 LLM 콜백을 통해 직접 전달하므로,
+    # 노드는 최종 답변만 상태에 기록합니다.
+    response = await llm.ainvoke(messages)
+    return {"answer": response.content}
 
 
 # --- 6. 답변 생성 노드 (일반) ---
 
-async def node_generate_normal_answer(state: GraphState):  # 'async def'로 변경
-    """문서 없이 채팅 이력만으로 일반 답변(잡담 또는 정보 없음)을 스트리밍 생성합니다."""
-    print("--- 6b. 일반 답변 생성 노드 ---")
+async def node_generate_normal_answer(state: GraphState):
+    """문서 없이 채팅 이력만으로 일반 답변(잡담 또는 정보 없음)을 생성합니다. (토큰은 messages 스트림으로 전달)"""
+    logger.debug("--- 6b. 일반 답변 생성 노드 ---")
 
     # ... (기존 system_prompt 코드) ...
     system_prompt = """
@@ -249,16 +368,5 @@ async def node_generate_normal_answer(state: GraphState):  # 'async def'로 변
     messages.extend(state["messages"])  # 채팅 이력만 추가
 
     llm = get_llm()
-    stream = llm.astream(messages)
-
-    # --- 수정된 부분: 스트림을 'return'하는 대신 'yield'합니다 ---
-    full_response = ""
-    async for chunk in stream:
-        if chunk.content:
-            full_response += chunk.content
-            # 각 청크를 'answer' 키를 가진 dict로 yield하여 스트리밍
-            yield {"answer": chunk.content}
-
-    # 마지막으로 전체 응답을 'answer' 키로 yield하여 상태를 최종 업데이트
-    yield {"answer": full_response}
-    # --- 수정 완료 ---
\ No newline at end of file
+    response = await llm.ainvoke(messages)
+    return {"answer": response.content}
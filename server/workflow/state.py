@@ -1,6 +1,7 @@
-from typing import List, TypedDict, Optional
+from typing import Annotated, List, TypedDict, Optional
 from langchain_core.messages import BaseMessage
 from langchain_core.documents import Document
+from langgraph.channels.untracked_value import UntrackedValue
 
 
 class GraphState(TypedDict):
@@ -20,6 +21,12 @@ class GraphState(TypedDict):
     # 의도 분류 노드에서 생성 ('admission_question' 또는 'general_chat')
     intent: Optional[str] = None
     # 문서 검색 노드에서 생성
-    documents: Optional[List[Document]] = None
-    # 최종 답변 (스트리밍 청크가 누적됨)
+    # 검색 결과(최대 RETRIEVE_MAX_K개 문서)는 이번 턴에만 쓰이므로 체크포인트에 저장하지 않습니다. (UntrackedValue)
+    # 노드(step)마다 저장되는 체크포인트에는 대화 이력과 작은 값들만 남습니다.
+    documents: Annotated[Optional[List[Document]], UntrackedValue(list)] = None
+    # documents와 같은 순서의 벡터 유사도(1차 점수). Rerank 후보 가지치기에 사용
+    retrieval_scores: Annotated[Optional[List[float]], UntrackedValue(list)] = None
+    # 쿼리 변환 중 시작한 추측 검색의 ID (retrieval.speculative 레지스트리 키, 사용하지 않으면 None)
+    speculation_id: Optional[str] = None
+    # 최종 답변 (토큰 자체는 stream_mode="messages"로 별도 전달됨)
     answer: str = ""